@@ -0,0 +1,163 @@
+import os
+import sys
+import json
+import time
+import platform
+import tracemalloc
+
+# Results faster than this are dominated by timer noise and never reported as regressions
+MIN_SECONDS = 1e-3
+
+
+def best_of(func, repeat=3, setup=None):
+    """
+    Time a function, keeping the fastest run. The minimum is the run least disturbed by other processes.
+
+    :param func: Function to be timed. Receives the ``setup`` result, if any
+    :param int repeat: Number of runs
+    :param setup: Function called before every run, out of the timed block
+    :return: Fastest run seconds and the result of the last run
+    :rtype: tuple
+    """
+    best = None
+    result = None
+    for _ in range(repeat):
+        args = (setup(),) if setup is not None else ()
+        start = time.perf_counter()
+        result = func(*args)
+        seconds = time.perf_counter() - start
+        best = seconds if best is None else min(best, seconds)
+    return best, result
+
+
+def peak_memory(func):
+    """
+    Peak python memory allocated by a function, traced with ``tracemalloc``.
+
+    :param func: Function without arguments
+    :return int: Size in bytes
+    """
+    started = not tracemalloc.is_tracing()
+    if started:
+        tracemalloc.start()
+    try:
+        baseline = tracemalloc.get_traced_memory()[0]
+        tracemalloc.reset_peak()
+        func()
+        return tracemalloc.get_traced_memory()[1] - baseline
+    finally:
+        if started:
+            tracemalloc.stop()
+
+
+def environment():
+    """
+    :return dict: Machine and interpreter the benchmark ran on
+    """
+    return {
+        'python': platform.python_version(),
+        'implementation': platform.python_implementation(),
+        'platform': platform.platform(),
+        'machine': platform.machine(),
+        'cpus': os.cpu_count(),
+        'time': time.time()
+    }
+
+
+def write_results(filepath, benchmark, results, summary=None, **options):
+    """
+    Write benchmark results as JSON.
+
+    :param str filepath: Results file path
+    :param str benchmark: Benchmark name
+    :param list results: Result rows. Every row has an unique ``name`` and its ``seconds``
+    :param list summary: Rows derived from results, if any
+    :param options: Benchmark options, recorded as they are
+    :return str: Results file path
+    """
+    with open(filepath, 'w+') as fd:
+        json.dump({
+            'benchmark': benchmark,
+            'environment': environment(),
+            'options': options,
+            'results': results,
+            'summary': summary
+        }, fd, indent=2, default=str)
+    return filepath
+
+
+def load_results(filepath):
+    """
+    Load benchmark results written by :func:`write_results`.
+
+    :param str filepath: Results file path
+    :return dict: Benchmark results
+    """
+    with open(filepath, 'r') as fd:
+        return json.load(fd)
+
+
+def compare(results, baseline, tolerance=0.25, min_seconds=MIN_SECONDS, key='seconds'):
+    """
+    Find results slower than a baseline. Rows are matched by ``name``; rows missing on any side are ignored.
+
+    :param list results: Result rows
+    :param list baseline: Baseline result rows
+    :param float tolerance: Allowed slowdown ratio over the baseline
+    :param float min_seconds: Results faster than this are never regressions
+    :param str key: Row field compared. Higher values are worse
+    :return list: Regressions with ``name``, ``value``, ``baseline`` and ``ratio``, worst first
+    """
+    previous = {row['name']: row[key] for row in baseline if row.get(key) is not None}
+    regressions = []
+    for row in results:
+        value = row.get(key)
+        if value is None or row['name'] not in previous or value < min_seconds:
+            continue
+        ratio = value / previous[row['name']] if previous[row['name']] > 0 else float('inf')
+        if ratio > 1 + tolerance:
+            regressions.append({'name': row['name'], 'value': value, 'baseline': previous[row['name']],
+                                'ratio': ratio})
+    return sorted(regressions, key=lambda elm: elm['ratio'], reverse=True)
+
+
+def format_table(rows, columns, fd=None):
+    """
+    Print rows as a plain text table.
+
+    :param list rows: Rows as dicts
+    :param List[str] columns: Columns to be printed
+    :param fd: File to print to. Defaults to stdout
+    """
+    fd = sys.stdout if fd is None else fd
+
+    def fmt(value):
+        if isinstance(value, float):
+            return f'{value:.6g}'
+        return '' if value is None else str(value)
+
+    cells = [[fmt(row.get(column)) for column in columns] for row in rows]
+    widths = [max([len(column)] + [len(line[i]) for line in cells]) for i, column in enumerate(columns)]
+    print('  '.join(column.ljust(width) for column, width in zip(columns, widths)), file=fd)
+    for line in cells:
+        print('  '.join(cell.ljust(width) for cell, width in zip(line, widths)), file=fd)
+
+
+def check_baseline(results, baseline_path, tolerance, fd=None):
+    """
+    Compare results with a stored baseline, printing any regression.
+
+    :param list results: Result rows
+    :param str baseline_path: Baseline results file, as written by :func:`write_results`
+    :param float tolerance: Allowed slowdown ratio over the baseline
+    :param fd: File to print to. Defaults to stdout
+    :return list: Regressions. See :func:`compare`
+    """
+    fd = sys.stdout if fd is None else fd
+    regressions = compare(results, load_results(baseline_path)['results'], tolerance=tolerance)
+    if regressions:
+        print(f"\n{len(regressions)} regressions over {tolerance:.0%} against {baseline_path}", file=fd)
+        format_table(regressions, ['name', 'value', 'baseline', 'ratio'], fd=fd)
+    else:
+        print(f"\nNo regressions over {tolerance:.0%} against {baseline_path}", file=fd)
+    return regressions
@@ -0,0 +1,201 @@
+"""
+Executor scaling benchmark across worker counts and task granularities.
+
+Runs a fixed fan out and fan in DAG of CPU bound, I/O bound (sleep) and mixed tasks of several durations on every
+executor and number of workers. Reports speedup and efficiency over the local executor, the overhead per task and,
+for every executor configuration, the shortest task duration at which it beats the local executor:
+
+.. code-block:: bash
+
+    python -m cd4ml.benchmarks.scaling --workers 1 2 4 8 --durations 0 0.001 0.01 0.1 --output scaling.json
+"""
+import os
+import sys
+import time
+import argparse
+import functools
+
+from cd4ml.task import Task
+from cd4ml.workflow import Workflow
+from cd4ml.executor import LocalExecutor, ProcessExecutor
+from cd4ml.benchmarks.harness import best_of, write_results, check_baseline, format_table
+
+KINDS = ['cpu', 'io', 'mixed']
+DURATIONS = [0.0, 0.001, 0.01, 0.1]
+EXECUTORS = ['local', 'process']
+COLUMNS = ['kind', 'duration', 'executor', 'workers', 'tasks', 'seconds', 'ideal', 'speedup', 'efficiency',
+           'overhead_per_task']
+
+
+def default_workers():
+    """
+    :return List[int]: Powers of two up to twice the number of CPUs, so I/O bound oversubscription is measured too,
+        and the number of CPUs
+    """
+    cpus = os.cpu_count() or 1
+    return sorted({2 ** i for i in range(cpus.bit_length() + 1) if 2 ** i <= 2 * cpus} | {cpus})
+
+
+def spin(seconds):
+    """Keep the CPU busy for some seconds of CPU time, so tasks competing for cores take longer"""
+    end = time.thread_time() + seconds
+    while time.thread_time() < end:
+        pass
+
+
+def work(kind, duration, **outputs):
+    """Task of a given kind running for ``duration`` seconds. Mixed tasks spin half of the time and sleep the rest"""
+    if kind == 'cpu':
+        spin(duration)
+    elif kind == 'io':
+        time.sleep(duration)
+    else:
+        spin(duration / 2)
+        time.sleep(duration / 2)
+    return None
+
+
+def noop(**outputs):
+    return None
+
+
+def build(kind, duration, tasks):
+    """
+    Build a workflow with a source task fanning out to ``tasks`` tasks, joined by a sink task. Source and sink are
+    no-ops.
+
+    :param str kind: Task kind. See :data:`KINDS`
+    :param float duration: Seconds every task runs
+    :param int tasks: Number of parallel tasks
+    :return: Workflow and its run configuration
+    :rtype: tuple
+    """
+    names = [f'work{i}' for i in range(tasks)]
+    w = Workflow()
+    w.add_tasks([Task(name='source', task=noop)] +
+                [(Task(name=name, task=functools.partial(work, kind, duration)), 'source') for name in names] +
+                [(Task(name='sink', task=noop), names)])
+    run_config = {name: {'params': {}, 'output': name} for name in ['source', 'sink'] + names}
+    return w, run_config
+
+
+def ideal_seconds(kind, duration, tasks, workers, cpus=None):
+    """
+    Run time of the parallel tasks without any overhead. CPU time can't run on more workers than CPUs.
+
+    :param str kind: Task kind
+    :param float duration: Seconds every task runs
+    :param int tasks: Number of parallel tasks
+    :param int workers: Number of workers
+    :param int cpus: Number of CPUs. Defaults to the CPUs of this machine
+    :return float: Seconds
+    """
+    cores = min(workers, cpus or os.cpu_count() or 1)
+    cpu = {'cpu': duration, 'io': 0.0, 'mixed': duration / 2}[kind]
+    return max(tasks * duration / workers, tasks * cpu / cores)
+
+
+def get_executor(executor, workers):
+    """
+    :param str executor: Executor name. See :data:`EXECUTORS`
+    :param int workers: Number of workers. The local executor always runs one task at a time
+    :return: New executor
+    """
+    if executor == 'local':
+        return LocalExecutor()
+    if executor == 'process':
+        return ProcessExecutor(max_workers=workers)
+    raise ValueError(f"Invalid executor {executor}. Available executors: {EXECUTORS}")
+
+
+def run_benchmark(kinds=None, durations=None, executors=None, workers=None, tasks=32, repeat=3):
+    """
+    Run the scaling benchmark. Executors are created for every run, so process pool startup is part of the measure,
+    as it is on :meth:`Workflow.run`.
+
+    :param List[str] kinds: Task kinds. See :data:`KINDS`. Defaults to all kinds
+    :param List[float] durations: Seconds every task runs. Defaults to :data:`DURATIONS`
+    :param List[str] executors: Executors. Defaults to :data:`EXECUTORS`. The local executor is always run, as the
+        reference of speedup
+    :param List[int] workers: Number of workers of parallel executors. Defaults to :func:`default_workers`
+    :param int tasks: Number of parallel tasks in the DAG
+    :param int repeat: Runs of every measure. The fastest is kept
+    :return list: Result rows with the :data:`COLUMNS` keys. See :func:`ideal_seconds`
+    """
+    kinds = KINDS if kinds is None else kinds
+    durations = DURATIONS if durations is None else durations
+    executors = EXECUTORS if executors is None else executors
+    workers = default_workers() if workers is None else workers
+
+    results = []
+    for kind in kinds:
+        for duration in durations:
+            w, run_config = build(kind, duration, tasks)
+            reference = None
+            for executor in ['local'] + [elm for elm in executors if elm != 'local']:
+                for count in [1] if executor == 'local' else workers:
+                    seconds, _ = best_of(lambda: w.run(run_config, executor=get_executor(executor, count)),
+                                         repeat=repeat)
+                    reference = seconds if reference is None else reference
+                    ideal = ideal_seconds(kind, duration, tasks, count)
+                    speedup = reference / seconds
+                    results.append({
+                        'name': '/'.join([kind, str(duration), executor, str(count)]),
+                        'kind': kind, 'duration': duration, 'executor': executor, 'workers': count,
+                        'tasks': tasks, 'seconds': seconds, 'ideal': ideal, 'speedup': speedup,
+                        'efficiency': speedup / count, 'overhead_per_task': (seconds - ideal) / tasks
+                    })
+    return results
+
+
+def break_even(results):
+    """
+    Find the shortest task duration at which every executor configuration is faster than the local executor.
+
+    :param list results: Result rows of :func:`run_benchmark`
+    :return list: Rows with ``kind``, ``executor``, ``workers``, ``break_even`` duration, None if it is never
+        faster, and ``overhead_floor``, the overhead per task on the shortest duration
+    """
+    groups = dict()
+    for row in sorted(results, key=lambda elm: elm['duration']):
+        if row['executor'] == 'local':
+            continue
+        key = (row['kind'], row['executor'], row['workers'])
+        group = groups.setdefault(key, {'kind': key[0], 'executor': key[1], 'workers': key[2], 'break_even': None,
+                                        'overhead_floor': row['overhead_per_task']})
+        if group['break_even'] is None and row['speedup'] > 1:
+            group['break_even'] = row['duration']
+    return list(groups.values())
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark executor scaling across workers and task durations")
+    parser.add_argument('--kinds', nargs='+', choices=KINDS, default=KINDS)
+    parser.add_argument('--durations', nargs='+', type=float, default=DURATIONS, help="Seconds every task runs")
+    parser.add_argument('--executors', nargs='+', choices=EXECUTORS, default=EXECUTORS)
+    parser.add_argument('--workers', nargs='+', type=int, default=default_workers(),
+                        help="Number of workers of parallel executors")
+    parser.add_argument('--tasks', type=int, default=32, help="Number of parallel tasks in the DAG")
+    parser.add_argument('--repeat', type=int, default=3, help="Runs of every measure. The fastest is kept")
+    parser.add_argument('--output', help="Write JSON results to this file")
+    parser.add_argument('--baseline', help="Exit with an error if results are slower than this results file")
+    parser.add_argument('--tolerance', type=float, default=0.25, help="Allowed slowdown ratio over the baseline")
+    args = parser.parse_args(argv)
+
+    results = run_benchmark(kinds=args.kinds, durations=args.durations, executors=args.executors,
+                            workers=args.workers, tasks=args.tasks, repeat=args.repeat)
+    summary = break_even(results)
+    format_table(results, COLUMNS)
+    print()
+    format_table(summary, ['kind', 'executor', 'workers', 'break_even', 'overhead_floor'])
+    if args.output is not None:
+        write_results(args.output, 'scaling', results, summary=summary, kinds=args.kinds,
+                      durations=args.durations, executors=args.executors, workers=args.workers, tasks=args.tasks,
+                      repeat=args.repeat)
+    if args.baseline is not None and check_baseline(results, args.baseline, args.tolerance):
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,160 @@
+"""
+Scheduler benchmark on synthetic DAG shapes of no-op tasks.
+
+Measures workflow construction, plan compilation, graph preparation, DOT export and run overhead per task for every
+executor. Results are written as JSON and can be checked against a stored baseline:
+
+.. code-block:: bash
+
+    python -m cd4ml.benchmarks.scheduler --output baseline.json
+    python -m cd4ml.benchmarks.scheduler --output results.json --baseline baseline.json
+"""
+import os
+import sys
+import random
+import argparse
+
+from cd4ml.task import Task
+from cd4ml.workflow import Workflow
+from cd4ml.benchmarks.harness import best_of, write_results, check_baseline, format_table
+
+SIZES = [10, 100, 1000, 10000, 100000]
+EXECUTORS = ['local', 'process']
+# Largest graph run on every executor. Worker processes are much slower per task, so big graphs take too long
+RUN_LIMITS = {'local': 100000, 'process': 1000}
+
+
+def chain(size):
+    """Every task depends on the previous one"""
+    return {f't{i}': [f't{i - 1}'] if i > 0 else [] for i in range(size)}
+
+
+def wide(size):
+    """One task fanning out to all others, joined by a last task"""
+    graph = {'t0': []}
+    graph.update({f't{i}': ['t0'] for i in range(1, size - 1 if size > 2 else size)})
+    if size > 2:
+        graph[f't{size - 1}'] = [f't{i}' for i in range(1, size - 1)]
+    return graph
+
+
+def lattice(size):
+    """Levels of two tasks, each depending on both tasks of the previous level. Paths double on every level"""
+    graph = {'t0_0': []}
+    level = 1
+    while len(graph) < size:
+        previous = [f't{level - 1}_{j}' for j in range(2 if level > 1 else 1)]
+        for i in range(min(2, size - len(graph))):
+            graph[f't{level}_{i}'] = previous
+        level += 1
+    return graph
+
+
+def random_dag(size, degree=3, seed=0):
+    """Every task depends on up to ``degree`` random previous tasks"""
+    rnd = random.Random(seed)
+    return {f't{i}': [f't{j}' for j in sorted(rnd.sample(range(i), min(degree, i)))] for i in range(size)}
+
+
+SHAPES = {
+    'chain': chain,
+    'wide': wide,
+    'lattice': lattice,
+    'random': random_dag
+}
+
+
+def noop(**params):
+    return None
+
+
+def build(graph):
+    """
+    Build a workflow of no-op tasks.
+
+    :param dict graph: Dependency names by task name, in dependency order
+    :return: Workflow and its run configuration
+    :rtype: tuple
+    """
+    w = Workflow()
+    w.add_tasks((Task(name=name, task=noop), dependency or None) for name, dependency in graph.items())
+    run_config = {name: {'params': {}, 'output': name} for name in graph}
+    return w, run_config
+
+
+def run_benchmark(shapes=None, sizes=None, executors=None, repeat=3, run_limits=None):
+    """
+    Run the scheduler benchmark.
+
+    :param List[str] shapes: Graph shapes. See :data:`SHAPES`. Defaults to all shapes
+    :param List[int] sizes: Number of tasks. Defaults to :data:`SIZES`
+    :param List[str] executors: Executors the graphs are run on. Defaults to :data:`EXECUTORS`
+    :param int repeat: Runs of every measure. The fastest is kept
+    :param dict run_limits: Largest graph run on each executor. Defaults to :data:`RUN_LIMITS`
+    :return list: Result rows with ``name``, ``shape``, ``size``, ``edges``, ``phase``, ``executor``, ``seconds`` and
+        ``per_task`` seconds
+    :raises RuntimeError: if a run doesn't run every task
+    """
+    shapes = list(SHAPES) if shapes is None else shapes
+    sizes = SIZES if sizes is None else sizes
+    executors = EXECUTORS if executors is None else executors
+    run_limits = dict(RUN_LIMITS, **(run_limits or {}))
+
+    results = []
+    for shape in shapes:
+        for size in sizes:
+            graph = SHAPES[shape](size)
+            edges = sum(len(dependency) for dependency in graph.values())
+
+            def record(phase, seconds, executor=None):
+                name = '/'.join([shape, str(size), phase] + ([executor] if executor is not None else []))
+                results.append({'name': name, 'shape': shape, 'size': size, 'edges': edges, 'phase': phase,
+                                'executor': executor, 'seconds': seconds, 'per_task': seconds / size})
+
+            seconds, (w, run_config) = best_of(lambda: build(graph), repeat=repeat)
+            record('construct', seconds)
+            seconds, _ = best_of(lambda built: built[0].compile(), repeat=repeat, setup=lambda: build(graph))
+            record('compile', seconds)
+            seconds, _ = best_of(lambda built: built[0].prepare(), repeat=repeat, setup=lambda: build(graph))
+            record('prepare', seconds)
+            seconds, _ = best_of(lambda: w.dotfile(os.devnull), repeat=repeat)
+            record('dot', seconds)
+
+            for executor in executors:
+                if size > run_limits.get(executor, size):
+                    continue
+                # The plan is compiled on the first run and cached, so runs only measure scheduling overhead
+                seconds, _ = best_of(lambda: w.run(run_config, executor=executor), repeat=repeat)
+                if len(w.stats) != len(graph):
+                    raise RuntimeError(f"Run on {executor} ran {len(w.stats)} of {len(graph)} tasks of {shape}")
+                record('run', seconds, executor)
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the workflow scheduler on synthetic DAG shapes")
+    parser.add_argument('--shapes', nargs='+', choices=list(SHAPES), default=list(SHAPES))
+    parser.add_argument('--sizes', nargs='+', type=int, default=SIZES)
+    parser.add_argument('--executors', nargs='+', choices=EXECUTORS, default=EXECUTORS)
+    parser.add_argument('--repeat', type=int, default=3, help="Runs of every measure. The fastest is kept")
+    parser.add_argument('--run-limit', action='append', default=[], metavar='EXECUTOR=SIZE',
+                        help="Largest graph run on an executor")
+    parser.add_argument('--output', help="Write JSON results to this file")
+    parser.add_argument('--baseline', help="Exit with an error if results are slower than this results file")
+    parser.add_argument('--tolerance', type=float, default=0.25, help="Allowed slowdown ratio over the baseline")
+    args = parser.parse_args(argv)
+
+    run_limits = {executor: int(size) for executor, size in (elm.split('=') for elm in args.run_limit)}
+    results = run_benchmark(shapes=args.shapes, sizes=args.sizes, executors=args.executors, repeat=args.repeat,
+                            run_limits=run_limits)
+    format_table(results, ['shape', 'size', 'edges', 'phase', 'executor', 'seconds', 'per_task'])
+    if args.output is not None:
+        write_results(args.output, 'scheduler', results, shapes=args.shapes, sizes=args.sizes,
+                      executors=args.executors, repeat=args.repeat)
+    if args.baseline is not None and check_baseline(results, args.baseline, args.tolerance):
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,215 @@
+"""
+Storage benchmark of experiment providers across payload types, sizes and serializer configurations.
+
+Measures :meth:`Experiment.save_output` and :meth:`Experiment.load_output` latency, throughput, peak python memory and
+size on disk for every :class:`ExperimentProvider` subclass. Providers are discovered from the subclasses imported,
+so modules registering other providers can be imported with ``--import``:
+
+.. code-block:: bash
+
+    python -m cd4ml.benchmarks.storage --sizes 1KB 1MB 100MB --report storage.txt --output storage.json
+"""
+import os
+import sys
+import json
+import shutil
+import tempfile
+import argparse
+import functools
+import importlib
+
+import numpy as np
+import pandas as pd
+
+from cd4ml.experiment import Experiment, ExperimentProvider
+from cd4ml.utils import sizeof, path_size
+from cd4ml.benchmarks.harness import best_of, peak_memory, write_results, check_baseline, format_table
+
+SIZES = ['1KB', '1MB', '100MB']
+UNITS = {'B': 1, 'KB': 10 ** 3, 'MB': 10 ** 6, 'GB': 10 ** 9}
+# Serializer configurations as save_output options. Partitioned configurations only apply to DataFrames
+CONFIGS = {
+    'json': {},
+    'partitioned': {'partition_rows': 100000},
+}
+COLUMNS = ['provider', 'payload', 'size', 'config', 'payload_bytes', 'disk_bytes', 'save_seconds', 'load_seconds',
+           'save_mbps', 'load_mbps', 'save_peak', 'load_peak', 'error']
+
+
+def parse_size(size):
+    """
+    Parse a size with decimal units, like ``'5GB'``.
+
+    :param str, int size: Size with unit, or bytes
+    :return int: Size in bytes
+    """
+    if isinstance(size, int):
+        return size
+    value = size.strip().upper()
+    for unit in sorted(UNITS, key=len, reverse=True):
+        if value.endswith(unit):
+            return int(float(value[:-len(unit)]) * UNITS[unit])
+    return int(value)
+
+
+def nested_dict(nbytes):
+    """JSON like records of about 100 bytes each"""
+    return {'records': [{'id': i, 'value': i / 7, 'name': f'record-{i:08d}', 'tags': ['a', 'b'],
+                         'meta': {'valid': i % 2 == 0}} for i in range(max(nbytes // 100, 1))]}
+
+
+def numeric_frame(nbytes):
+    """DataFrame of eight float64 columns"""
+    rows = max(nbytes // 64, 1)
+    values = np.random.default_rng(0).random((rows, 8))
+    return pd.DataFrame(values, columns=[f'x{i}' for i in range(8)])
+
+
+def mixed_frame(nbytes):
+    """DataFrame with integer, float, string and boolean columns"""
+    rows = max(nbytes // 80, 1)
+    rng = np.random.default_rng(0)
+    return pd.DataFrame({
+        'id': np.arange(rows),
+        'value': rng.random(rows),
+        'name': [f'name-{i % 1000:04d}' for i in range(rows)],
+        'valid': rng.random(rows) > 0.5
+    })
+
+
+# Providers serialize dicts as JSON and DataFrames as JSON lines. There is no serializer for NumPy arrays, so they
+# are not a payload: every array run would only record the same TypeError
+PAYLOADS = {
+    'dict': nested_dict,
+    'numeric_frame': numeric_frame,
+    'mixed_frame': mixed_frame
+}
+
+
+def providers():
+    """
+    Find experiment providers, including subclasses of subclasses.
+
+    :return dict: Provider classes by name
+    """
+    found = dict()
+    stack = list(ExperimentProvider.__subclasses__())
+    while stack:
+        cls = stack.pop()
+        if not getattr(cls, '__abstractmethods__', None):
+            found[cls.__name__] = cls
+        stack.extend(cls.__subclasses__())
+    return found
+
+
+def _remove(path):
+    if isinstance(path, str) and os.path.isdir(path):
+        shutil.rmtree(path, ignore_errors=True)
+    elif isinstance(path, str) and os.path.isfile(path):
+        os.remove(path)
+
+
+def run_benchmark(provider_classes=None, payloads=None, sizes=None, configs=None, repeat=3, memory=True,
+                  directory=None):
+    """
+    Run the storage benchmark. Every combination is saved and loaded ``repeat`` times, keeping the fastest, and once
+    more tracing memory when ``memory`` is set. Saved outputs are removed after each combination.
+
+    :param dict provider_classes: Provider classes by name. They are created with a ``repository_path``. Defaults
+        to all providers. See :func:`providers`
+    :param List[str] payloads: Payload types. See :data:`PAYLOADS`. Defaults to all payloads
+    :param list sizes: Payload sizes, as bytes or with units. Defaults to :data:`SIZES`
+    :param dict configs: ``save_output`` options by configuration name. Defaults to :data:`CONFIGS`
+    :param int repeat: Runs of every measure
+    :param bool memory: Measure peak python memory of save and load with ``tracemalloc``
+    :param str directory: Directory for provider repositories. Defaults to a temporary directory
+    :return list: Result rows with the :data:`COLUMNS` keys. Payloads a configuration can't save have an ``error``
+    """
+    provider_classes = providers() if provider_classes is None else provider_classes
+    payloads = list(PAYLOADS) if payloads is None else payloads
+    sizes = SIZES if sizes is None else sizes
+    configs = CONFIGS if configs is None else configs
+
+    results = []
+    with tempfile.TemporaryDirectory(dir=directory) as tmpdir:
+        for provider_name, cls in provider_classes.items():
+            experiment = Experiment(cls(repository_path=os.path.join(tmpdir, provider_name)))
+            for payload in payloads:
+                for size in sizes:
+                    data = PAYLOADS[payload](parse_size(size))
+                    frame = isinstance(data, pd.DataFrame)
+                    payload_bytes = len(json.dumps(data)) if payload == 'dict' else sizeof(data)
+                    save_output = load_output = None
+                    for config_name, options in configs.items():
+                        if options and not frame:
+                            continue
+                        name = f'{payload}_{config_name}'
+                        row = {'name': '/'.join([provider_name, payload, str(size), config_name]),
+                               'provider': provider_name, 'payload': payload, 'size': size, 'config': config_name,
+                               'payload_bytes': payload_bytes, 'seconds': None, 'error': None}
+                        # Bound now, so calls don't refer to the payload variable deleted after every size
+                        save_output = functools.partial(experiment.save_output, name=name, data=data, **options)
+                        load_output = functools.partial(experiment.load_output, name=name, pandas=frame)
+                        try:
+                            save, path = best_of(save_output, repeat=repeat)
+                            load, _ = best_of(load_output, repeat=repeat)
+                        except Exception as e:
+                            row['error'] = f'{type(e).__name__}: {e}'
+                            results.append(row)
+                            continue
+
+                        row.update(disk_bytes=path_size(path), save_seconds=save, load_seconds=load,
+                                   seconds=save + load, save_mbps=payload_bytes / 1e6 / save if save else None,
+                                   load_mbps=payload_bytes / 1e6 / load if load else None)
+                        if memory:
+                            row['save_peak'] = peak_memory(save_output)
+                            row['load_peak'] = peak_memory(load_output)
+                        _remove(path)
+                        results.append(row)
+                    del data, save_output, load_output
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark experiment storage across providers and payloads")
+    parser.add_argument('--providers', nargs='+', help="Provider class names. Defaults to all providers")
+    parser.add_argument('--import', dest='modules', nargs='+', default=[], metavar='MODULE',
+                        help="Import modules registering other providers")
+    parser.add_argument('--payloads', nargs='+', choices=list(PAYLOADS), default=list(PAYLOADS))
+    parser.add_argument('--sizes', nargs='+', default=SIZES, help="Payload sizes, like 1KB, 10MB or 5GB")
+    parser.add_argument('--configs', nargs='+', choices=list(CONFIGS), default=list(CONFIGS))
+    parser.add_argument('--repeat', type=int, default=3, help="Runs of every measure. The fastest is kept")
+    parser.add_argument('--no-memory', dest='memory', action='store_false', help="Don't measure peak memory")
+    parser.add_argument('--dir', help="Directory for provider repositories. Defaults to a temporary directory")
+    parser.add_argument('--output', help="Write JSON results to this file")
+    parser.add_argument('--report', help="Write the comparison table to this file")
+    parser.add_argument('--baseline', help="Exit with an error if results are slower than this results file")
+    parser.add_argument('--tolerance', type=float, default=0.25, help="Allowed slowdown ratio over the baseline")
+    args = parser.parse_args(argv)
+
+    for module in args.modules:
+        importlib.import_module(module)
+    found = providers()
+    if args.providers is not None:
+        unknown = [elm for elm in args.providers if elm not in found]
+        if unknown:
+            parser.error(f"Unknown providers {unknown}. Available providers: {list(found)}")
+        found = {elm: found[elm] for elm in args.providers}
+
+    results = run_benchmark(provider_classes=found, payloads=args.payloads, sizes=args.sizes,
+                            configs={elm: CONFIGS[elm] for elm in args.configs}, repeat=args.repeat,
+                            memory=args.memory, directory=args.dir)
+    format_table(results, COLUMNS)
+    if args.report is not None:
+        with open(args.report, 'w+') as fd:
+            format_table(results, COLUMNS, fd=fd)
+    if args.output is not None:
+        write_results(args.output, 'storage', results, providers=list(found), payloads=args.payloads,
+                      sizes=args.sizes, configs=args.configs, repeat=args.repeat)
+    if args.baseline is not None and check_baseline(results, args.baseline, args.tolerance):
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
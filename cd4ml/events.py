@@ -0,0 +1,114 @@
+import time
+import queue
+import threading
+
+from cd4ml.log import logger
+
+EVENTS = ['task_submitted', 'task_started', 'task_finished', 'output_saved', 'run_finished']
+
+
+class Event:
+    """Workflow run event"""
+    __slots__ = ('name', 'time', 'data')
+
+    def __init__(self, name, data, timestamp=None):
+        """
+        :param str name: Event name. See :data:`EVENTS`
+        :param dict data: Event data, like task name, timings and sizes
+        :param float timestamp: Event timestamp in seconds since epoch. Defaults to now
+        """
+        self.name = name
+        self.data = data
+        self.time = time.time() if timestamp is None else timestamp
+
+    def __repr__(self):
+        return f"Event(name={self.name!r}, time={self.time!r}, data={self.data!r})"
+
+
+class EventBus:
+    """
+    Publish workflow run events to subscribers without blocking the scheduler.
+
+    Events are put on a queue and delivered to subscribers, in order, by a dispatcher thread started with the first
+    subscription. Publishing without subscribers does nothing. Exceptions raised by subscribers are logged and don't
+    stop other subscribers.
+
+    The following events are published:
+
+        * ``task_submitted``: ``task``
+        * ``task_started``: ``task``. Worker processes can't publish, so the process executor publishes it when the
+          task finishes, with the start timestamp measured by the worker as event time
+        * ``task_finished``: ``task`` and task stats. See :func:`cd4ml.instrument.measure`
+        * ``output_saved``: ``task``, ``output``, ``path``, ``size`` in bytes written and ``seconds`` spent saving
+        * ``run_finished``: ``tasks`` run, ``wall`` seconds and ``failed``
+
+    :example:
+
+    >>> w = Workflow()
+    >>> w.events.subscribe(lambda event: print(event.data['task'], event.data['wall']), events=['task_finished'])
+    """
+
+    def __init__(self):
+        self.subscribers = list()
+        self._queue = queue.Queue()
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def subscribe(self, callback, events=None):
+        """
+        Subscribe to events.
+
+        :param callback: Function receiving an :class:`Event`
+        :param List[str] events: Event names. Defaults to all events
+        :return: The callback, so it can be unsubscribed
+        """
+        unknown = [elm for elm in events or [] if elm not in EVENTS]
+        if unknown:
+            raise ValueError(f"Invalid events {unknown}. Available events: {EVENTS}")
+
+        with self._lock:
+            self.subscribers.append((callback, None if events is None else set(events)))
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._dispatch, name='cd4ml-events', daemon=True)
+                self._thread.start()
+        return callback
+
+    def unsubscribe(self, callback):
+        """
+        Stop sending events to a callback.
+
+        :param callback: Subscribed function
+        """
+        with self._lock:
+            self.subscribers = [elm for elm in self.subscribers if elm[0] != callback]
+
+    def publish(self, name, timestamp=None, **data):
+        """
+        Publish an event. Returns immediately.
+
+        :param str name: Event name
+        :param float timestamp: Event timestamp in seconds since epoch. Defaults to now
+        :param data: Event data
+        """
+        if not self.subscribers:
+            return
+        self._queue.put(Event(name, data, timestamp))
+
+    def flush(self):
+        """Wait until all published events are delivered"""
+        if self._thread is not None:
+            self._queue.join()
+
+    def _dispatch(self):
+        while True:
+            event = self._queue.get()
+            try:
+                for callback, events in list(self.subscribers):
+                    if events is not None and event.name not in events:
+                        continue
+                    try:
+                        callback(event)
+                    except Exception as e:
+                        logger.error("Event subscriber %s failed on %s: %r", callback, event.name, e)
+            finally:
+                self._queue.task_done()
@@ -1,68 +1,485 @@
-from cd4ml.task import Task
+import os
+import pickle
+import shutil
+import tempfile
+import time
+import uuid
+import functools
+import weakref
+from collections import OrderedDict
+from collections.abc import MutableMapping
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+
+from cd4ml.task import Task, FusedTask, Expansion
 from cd4ml.experiment import Experiment as Exp
+from cd4ml.instrument import measure
+from cd4ml.profiler import get_profiler
+from cd4ml.trace import span
+from cd4ml.shm import SharedBlock, SharedMemoryTransport, share, attach, detach
+from cd4ml.utils import sizeof, path_size
 from cd4ml.log import logger
 
 from abc import ABC, abstractmethod
 
 
 class Executor(ABC):
-    def __init__(self, experiment: Exp = None):
+    def __init__(self, experiment: Exp = None, memory_budget=None, scratch_dir=None, trace_memory=False,
+                 measure_serialized=False):
+        """
+        :param Experiment experiment: Experiment to save tasks output
+        :param int memory_budget: Maximum size in bytes of outputs kept in memory. Outputs over the budget are
+            spilled to disk. Defaults to no limit
+        :param str scratch_dir: Directory for spilled outputs. Defaults to a temporary directory
+        :param bool trace_memory: Record the peak of python memory allocated by every task with ``tracemalloc``
+        :param bool measure_serialized: Record the pickled size of every task output. Pickling copies the whole
+            output, so it is off by default. Bytes written on experiment are always recorded as ``saved_size``
+        """
         self.tasks = dict()
-        self.output = dict()
+        self.pending = list()
+        self.output = dict() if memory_budget is None else OutputStore(memory_budget, scratch_dir=scratch_dir)
         self.done = list()
+        self.released = list()
+        self.stats = dict()
+        self.timings = dict()
+        self.profiles = dict()
+        self.expansions = dict()
+        self.trace_memory = trace_memory
+        self.measure_serialized = measure_serialized
+        # Tracer and event bus for task and save events, set by the workflow
+        self.tracer = None
+        self.events = None
         self.experiment = experiment
         super().__init__()
 
-    @abstractmethod
-    def submit(self, task: Task, params: dict = None, output=None):
+    def submit(self, task: Task, params: dict = None, output=None, profile=None):
         """
         Submit a job to process pool executor.
 
         :param Task task: Task instance to be executed
         :param dict params: parameters dict for the task
         :param str output: Name of output var
+        :param bool, str profile: Profile the task. Defaults to the task ``profile`` option
         """
-        pass
+        if not isinstance(params, dict) and params is not None:
+            raise TypeError(f"We only accept dict as params you supplied '{type(params)}' for {params}")
+
+        self.tasks[task.name] = {
+            'task': task,
+            'params': params,
+            'output': output,
+            'profile': profile or getattr(task, 'profile', False)
+        }
+        self.pending.append(task.name)
 
     @abstractmethod
     def run(self):
         """"Run pending tasks."""
         pass
 
+    def release(self, output):
+        """
+        Drop the in-memory reference to a task output no longer needed by pending tasks.
+
+        :param str output: Name of output var
+        """
+        if output in self.output:
+            logger.debug("Releasing output %s", output)
+            del self.output[output]
+            self.released.append(output)
+
+    def close(self):
+        """Release resources held by the executor. Outputs already returned are still valid"""
+        if isinstance(self.output, OutputStore):
+            self.output.close()
+
+    def running_tasks(self):
+        """
+        :return list: Names of tasks running now. Submitted tasks are not running until they are started
+        """
+        return []
+
+    def _publish(self, name, timestamp=None, **data):
+        """Publish an event if there is an event bus"""
+        if self.events is not None:
+            self.events.publish(name, timestamp=timestamp, **data)
+
+    def _record_stats(self, name, stats, steps=None):
+        """
+        Record task resource usage. See :func:`cd4ml.instrument.measure`. Fused tasks record the time of every
+        original task too.
+
+        :param str name: Task name
+        :param dict stats: Task stats
+        :param dict steps: Wall time in seconds for every original task of a fused task
+        """
+        logger.debug("Task %s finished in %.6fs", name, stats['wall'], extra={'task': name})
+        self.stats[name] = stats
+        self._publish('task_finished', task=name, **stats)
+        if self.tracer is not None:
+            self.tracer.add_task(name, stats)
+        if steps:
+            self.timings.update(steps)
+        else:
+            self.timings[name] = stats['wall']
+
+    def _store_profile(self, name, artifacts):
+        """
+        Store profiler artifacts of a task and save them on experiment next to the task output.
+
+        :param str name: Task name
+        :param dict artifacts: File content by extension
+        """
+        self.profiles[name] = artifacts
+        if self.experiment is not None:
+            filename = self.tasks[name]['output'] or name
+            logger.info("Saving task %s profile on path %s", name, self.experiment.provider.repository_path,
+                        extra={'task': name})
+            with span(self.tracer, f'save {filename} profile', cat='save', args={'task': name}):
+                self.experiment.save_profile(name=name, artifacts=artifacts, filename=filename)
+
+    def _store_result(self, name, result):
+        """
+        Store task result as output and mark task as done.
+
+        :param str name: Task name
+        :param result: Task result
+        """
+        if isinstance(result, Expansion):
+            # New tasks are added by the workflow before the task is marked as done
+            self.expansions[name] = result
+            result = result.output
+
+        output = self.tasks[name]['output']
+        if output is not None:
+            self.output[output] = result
+
+            # Save output on experiments repository
+            if self.experiment is not None:
+                logger.info("Saving task %s output on path %s", name, self.experiment.provider.repository_path,
+                            extra={'task': name})
+                start = time.perf_counter()
+                with span(self.tracer, f'save {output}', cat='save', args={'task': name}):
+                    path = self.experiment.save_output(name=output, data=result)
+                size = path_size(path)
+                if name in self.stats:
+                    self.stats[name]['saved_size'] = size
+                self._publish('output_saved', task=name, output=output, path=path, size=size,
+                              seconds=time.perf_counter() - start)
+
+        # Add task to done list
+        self.done.append(name)
+
 
 class LocalExecutor(Executor):
     """Local executor class."""
 
-    def __init__(self, experiment: Exp = None):
-        super(LocalExecutor, self).__init__(experiment)
-
-    def submit(self, task: Task, params: dict = None, output=None):
-        if not isinstance(params, dict) and params is not None:
-            raise TypeError(f"We only accept dict as params you supplied '{type(params)}' for {params}")
+    def __init__(self, experiment: Exp = None, memory_budget=None, scratch_dir=None, trace_memory=False,
+                 measure_serialized=False):
+        super(LocalExecutor, self).__init__(experiment, memory_budget=memory_budget, scratch_dir=scratch_dir,
+                                            trace_memory=trace_memory, measure_serialized=measure_serialized)
+        self.current = None
 
-        self.tasks[task.name] = {
-            'task': task,
-            'params': params,
-            'output': output
-        }
+    def running_tasks(self):
+        return [self.current] if self.current is not None else []
 
     def run(self):
-        for elm in self.tasks:
+        # Run only tasks submitted since the last run
+        pending, self.pending = self.pending, list()
+        for elm in pending:
+            task = self.tasks[elm]['task']
+            profiler = get_profiler(self.tasks[elm]['profile']) if self.tasks[elm]['profile'] else None
+            self._publish('task_started', task=elm)
+            self.current = elm
             try:
-                result = self.tasks[elm]['task'].run(**self.tasks[elm]['params'])
-            except TypeError:
-                # Try again with no params
-                result = self.tasks[elm]['task'].run()
+                result, stats = measure(functools.partial(_run_task, task, self.tasks[elm]['params'], profiler),
+                                        trace_memory=self.trace_memory, serialize=self.measure_serialized)
+            finally:
+                self.current = None
+            self._record_stats(elm, stats, getattr(task, 'timings', None))
+            if profiler is not None:
+                self._store_profile(elm, profiler.artifacts())
+            self._store_result(elm, result)
+
+        return self.output
 
-            if self.tasks[elm]['output'] is not None:
-                self.output[self.tasks[elm]['output']] = result
 
-                # Save output on experiments repository
-                if self.experiment is not None:
-                    logger.info(f"Saving task {elm} output on path {self.experiment.provider.repository_path}")
-                    self.experiment.save_output(name=self.tasks[elm]['output'], data=result)
+class ProcessExecutor(Executor):
+    """
+    Executor running tasks in a pool of worker processes.
 
-            # Add task to done list
-            self.done.append(elm)
+    Tasks and their functions must be picklable. NumPy arrays and the numeric columns of DataFrames returned by tasks
+    are placed in shared memory by the workers, and consumers receive read only views on the same segments, so large
+    outputs are never copied through pipes. Segments are unlinked when their output is released or the executor is
+    closed.
+    """
+
+    def __init__(self, experiment: Exp = None, max_workers=None, shared_memory=True, min_shared_bytes=2 ** 16,
+                 mp_context=None, memory_budget=None, scratch_dir=None, trace_memory=False, measure_serialized=False):
+        """
+        :param Experiment experiment: Experiment to save tasks output
+        :param int max_workers: Number of worker processes. Defaults to the number of CPUs
+        :param bool shared_memory: Pass arrays and DataFrames between tasks through shared memory
+        :param int min_shared_bytes: Outputs smaller than this are pickled as usual
+        :param mp_context: Multiprocessing context for the worker processes
+        :param int memory_budget: Maximum size in bytes of outputs kept in memory
+        :param str scratch_dir: Directory for spilled outputs
+        :param bool trace_memory: Record the peak of python memory allocated by every task
+        :param bool measure_serialized: Record the pickled size of every task output, pickling it on the worker
+        """
+        super(ProcessExecutor, self).__init__(experiment, memory_budget=memory_budget, scratch_dir=scratch_dir,
+                                              trace_memory=trace_memory, measure_serialized=measure_serialized)
+        self.max_workers = max_workers
+        self.mp_context = mp_context
+        self.min_shared_bytes = min_shared_bytes
+        self.transport = SharedMemoryTransport(min_bytes=min_shared_bytes) if shared_memory else None
+        self.running = dict()
+        self.pool = None
+        # Shared outputs by object id, so they are sent to workers as handles
+        self._blocks = dict()
+
+    def run(self):
+        if self.pool is None:
+            self.pool = ProcessPoolExecutor(max_workers=self.max_workers, mp_context=self.mp_context)
+
+        pending, self.pending = self.pending, list()
+        for elm in pending:
+            params = self.tasks[elm]['params']
+            if params is not None and self.transport is not None:
+                params = {key: self._get_block(value) for key, value in params.items()}
+            share_output = self.transport is not None and self.tasks[elm]['output'] is not None
+            future = self.pool.submit(_run_in_worker, self.tasks[elm]['task'], params,
+                                      self.min_shared_bytes if share_output else None, self.trace_memory,
+                                      self.tasks[elm]['profile'], self.measure_serialized)
+            self.running[future] = elm
+
+        if len(self.running) == 0:
+            return self.output
+
+        # Return as soon as any task finishes, so the workflow can submit new ready tasks
+        finished, _ = wait(self.running, return_when=FIRST_COMPLETED)
+        for future in finished:
+            elm = self.running.pop(future)
+            result, stats, steps, artifacts = future.result()
+            self._publish('task_started', timestamp=stats['started'], task=elm)
+            self._record_stats(elm, stats, steps)
+            if artifacts is not None:
+                self._store_profile(elm, artifacts)
+            if isinstance(result, SharedBlock):
+                block = result
+                result = self.transport.adopt(self.tasks[elm]['output'], block)
+                self._blocks[self.tasks[elm]['output']] = (result, block)
+            self._store_result(elm, result)
 
         return self.output
+
+    def running_tasks(self):
+        # Futures are running once a worker queue takes them, so tasks waiting for a free worker are left out
+        return [elm for future, elm in list(self.running.items()) if future.running()]
+
+    def release(self, output):
+        super(ProcessExecutor, self).release(output)
+        self._blocks.pop(output, None)
+        if self.transport is not None:
+            self.transport.release(output)
+
+    def close(self):
+        super(ProcessExecutor, self).close()
+        if self.pool is not None:
+            self.pool.shutdown(wait=True)
+            self.pool = None
+        self._blocks.clear()
+        if self.transport is not None:
+            self.transport.close()
+
+    def _get_block(self, value):
+        for obj, block in self._blocks.values():
+            if obj is value:
+                return block
+        return value
+
+
+def _run_task(task: Task, params: dict = None, profiler=None):
+    """Run task with params, under a profiler if supplied"""
+    if profiler is not None:
+        with profiler:
+            return _run_task(task, params)
+
+    if isinstance(task, FusedTask):
+        # Every step of the chain already falls back to no params
+        return task.run(**(params or {}))
+
+    try:
+        return task.run(**params)
+    except TypeError:
+        # Try again with no params
+        return task.run()
+
+
+def _run_in_worker(task: Task, params: dict = None, min_shared_bytes=None, trace_memory=False, profile=False,
+                   measure_serialized=False):
+    """
+    Run task on a worker process.
+
+    :param Task task: Task instance to be executed
+    :param dict params: parameters dict for the task. Shared blocks are attached as views
+    :param int min_shared_bytes: Share results at least this big. None to return results by pickling
+    :param bool trace_memory: Record the peak of python memory allocated by the task
+    :param bool, str profile: Profile the task. See :func:`cd4ml.profiler.get_profiler`
+    :param bool measure_serialized: Record the pickled size of the result
+    :return: Task result or a shared block handle, task stats, the time of every original task of fused tasks and
+        profiler artifacts
+    :rtype: tuple
+    """
+    segments = []
+    if params is not None:
+        params = dict(params)
+        for key, value in params.items():
+            if isinstance(value, SharedBlock):
+                params[key], shm = attach(value, track=False)
+                segments.append(shm)
+
+    profiler = get_profiler(profile) if profile else None
+    run = functools.partial(_run_task, task, params, profiler)
+    del params
+    try:
+        result, stats = measure(run, trace_memory=trace_memory, serialize=measure_serialized)
+    finally:
+        del run
+
+    if min_shared_bytes is not None:
+        block, shm = share(result, min_bytes=min_shared_bytes, track=False)
+        if block is not None:
+            detach(shm)
+            result = block
+
+    for shm in segments:
+        detach(shm)
+    artifacts = profiler.artifacts() if profiler is not None else None
+    return result, stats, getattr(task, 'timings', None), artifacts
+
+
+class OutputStore(MutableMapping):
+    """
+    Task outputs kept under a memory budget.
+
+    When the approximate size of outputs in memory goes over the budget, the least recently needed outputs are
+    spilled to a scratch directory with pickle and transparently loaded again when accessed.
+    """
+
+    def __init__(self, memory_budget, scratch_dir=None):
+        """
+        :param int memory_budget: Maximum size in bytes of outputs kept in memory
+        :param str scratch_dir: Directory to spill outputs. Defaults to a new temporary directory, removed when the
+            store is closed
+        """
+        self.memory_budget = memory_budget
+        self.scratch_dir = scratch_dir if scratch_dir is not None else tempfile.mkdtemp(prefix='cd4ml-spill-')
+        self.memory = OrderedDict()
+        self.sizes = dict()
+        self.spilled = dict()
+        self.total = 0
+        self._owned = scratch_dir is None
+        self._finalizer = None
+
+    def __getitem__(self, key):
+        if key in self.memory:
+            self.memory.move_to_end(key)
+            return self.memory[key]
+        if key not in self.spilled:
+            raise KeyError(key)
+
+        value = self._load(key)
+        size = sizeof(value)
+        if size > self.memory_budget:
+            # It would be spilled again right away, so it stays on disk
+            return value
+        os.unlink(self.spilled.pop(key))
+        self._store(key, value, size)
+        return value
+
+    def __setitem__(self, key, value):
+        self._discard(key)
+        self._store(key, value)
+
+    def __delitem__(self, key):
+        if key not in self:
+            raise KeyError(key)
+        self._discard(key)
+
+    def __contains__(self, key):
+        return key in self.memory or key in self.spilled
+
+    def __iter__(self):
+        yield from list(self.memory)
+        yield from list(self.spilled)
+
+    def __len__(self):
+        return len(self.memory) + len(self.spilled)
+
+    def spill(self, key):
+        """
+        Move an output from memory to the scratch directory.
+
+        :param str key: Output name
+        :return str: Spilled file path
+        """
+        if self._finalizer is None or not self._finalizer.alive:
+            # Remove spilled files when the store is closed or garbage collected
+            os.makedirs(self.scratch_dir, exist_ok=True)
+            self._finalizer = weakref.finalize(self, _remove_files, self.spilled,
+                                               self.scratch_dir if self._owned else None)
+        value = self.memory.pop(key)
+        self.total -= self.sizes.pop(key)
+        filepath = os.path.join(self.scratch_dir, f'{uuid.uuid4().hex}.pickle')
+        with open(filepath, 'wb') as fd:
+            pickle.dump(value, fd, protocol=pickle.HIGHEST_PROTOCOL)
+        self.spilled[key] = filepath
+        logger.debug("Spilled output %s to %s", key, filepath)
+        return filepath
+
+    def to_dict(self):
+        """
+        Get all outputs. Spilled outputs are loaded but kept on disk, so other outputs are not spilled to make room.
+
+        :return dict: Outputs by name
+        """
+        return {key: self.memory[key] if key in self.memory else self._load(key) for key in self}
+
+    def close(self):
+        """Remove all spilled files, and the scratch directory if the store created it"""
+        if self._finalizer is not None:
+            self._finalizer()
+        elif self._owned:
+            shutil.rmtree(self.scratch_dir, ignore_errors=True)
+
+    def _load(self, key):
+        filepath = self.spilled[key]
+        logger.debug("Loading spilled output %s from %s", key, filepath)
+        with open(filepath, 'rb') as fd:
+            return pickle.load(fd)
+
+    def _store(self, key, value, size=None):
+        self.memory[key] = value
+        self.sizes[key] = sizeof(value) if size is None else size
+        self.total += self.sizes[key]
+        while self.total > self.memory_budget and len(self.memory) > 0:
+            # First key is the least recently needed
+            self.spill(next(iter(self.memory)))
+
+    def _discard(self, key):
+        if key in self.memory:
+            del self.memory[key]
+            self.total -= self.sizes.pop(key)
+        elif key in self.spilled:
+            os.unlink(self.spilled.pop(key))
+
+
+def _remove_files(spilled, directory=None):
+    for filepath in spilled.values():
+        try:
+            os.unlink(filepath)
+        except FileNotFoundError:
+            pass
+    spilled.clear()
+    if directory is not None:
+        shutil.rmtree(directory, ignore_errors=True)
@@ -1,11 +1,18 @@
 import os
 import json
+import threading
 
 from abc import ABC, abstractmethod
-import pandas as pd
+from concurrent.futures import ThreadPoolExecutor
+from typing import TYPE_CHECKING
 
+from cd4ml.fingerprint import fingerprint, changed
+from cd4ml.utils import is_frame
 from cd4ml.log import logger
 
+if TYPE_CHECKING:
+    import pandas as pd
+
 
 class Experiment:
     def __init__(self, provider, experiment_id='latest'):
@@ -27,7 +34,8 @@ class Experiment:
             # Load output paths to provider
             self.provider.paths = metadata['output']
         except DataNotFound:
-            logger.info(f"Creating metadata for experiment = '{self.experiment_id}' at {self.provider.repository_path}")
+            logger.info("Creating metadata for experiment = '%s' at %s", self.experiment_id,
+                        self.provider.repository_path)
             metadata = {
                 'experiment_id': self.experiment_id,
                 'output': {},
@@ -37,30 +45,53 @@ class Experiment:
 
         self.metadata = metadata
 
-    def save_output(self, name, data):
+    def save_output(self, name, data, partition_by=None, partition_rows=None, max_workers=None):
         """
         Should save experiment output to provider
 
+        A DataFrame can be stored as a directory of partitions, either one per distinct value of a key column or one
+        per block of rows. Partitions are written concurrently and the manifest is recorded in metadata under
+        ``'partitions'``.
+
         :param str name: Output experiment name
         :param dict, pd.DataFrame data: Data to be saved on provider
+        :param str partition_by: Column used to split a DataFrame in partitions
+        :param int partition_rows: Maximum number of rows for each partition
+        :param int max_workers: Number of threads writing partitions. Defaults to the executor default
         :return str: Path on provider where the experiment was saved
         """
         self.provider.add_path(path=self.output_path, name='output')
-        output = self.provider.save(name=name, data=data, path=self.output_path)
+        if partition_by is not None or partition_rows is not None:
+            manifest = self.provider.save_partitions(name=name, data=data, path=self.output_path,
+                                                     partition_by=partition_by, partition_rows=partition_rows,
+                                                     max_workers=max_workers)
+            self.metadata.setdefault('partitions', {})[name] = manifest
+            output = manifest['path']
+        else:
+            output = self.provider.save(name=name, data=data, path=self.output_path)
+            # A plain save replaces any previous partitioned output with the same name
+            self.metadata.get('partitions', {}).pop(name, None)
 
         # Add output data to metadata
         self.metadata['output'][name] = output
         self.provider.save(name='.metadata', data=self.metadata, path='root')
         return output
 
-    def load_output(self, name, pandas=False):
+    def load_output(self, name, pandas=False, partitions=None, max_workers=None):
         """
         Load previously stored output on provider
 
         :param str name: Name of data file to be loaded from output
         :param bool pandas: Should we return it as pandas DataFrame
-        :return dict, pd.DataFrame: output data on desired format
+        :param list partitions: Keys (or indexes, for row partitions) to be loaded from a partitioned output.
+            Defaults to all partitions
+        :param int max_workers: Number of threads reading partitions
+        :return dict, pd.DataFrame: output data on desired format. Partitioned outputs are always DataFrames
         """
+        manifest = self.metadata.get('partitions', {}).get(name)
+        if manifest is not None:
+            return self.provider.load_partitions(manifest=manifest, partitions=partitions, max_workers=max_workers)
+
         output = self.provider.load(name=name, pandas=pandas, path=self.output_path)
         return output
 
@@ -90,6 +121,84 @@ class Experiment:
         output = self.provider.load(name=name, pandas=False, path=self.params_path)
         return output
 
+    def save_profile(self, name, artifacts, filename=None):
+        """
+        Save profiler artifacts of a task on the output path and record them in metadata under ``'profiles'``.
+
+        :param str name: Task name
+        :param dict artifacts: File content by extension, like ``.prof`` or folded stacks
+        :param str filename: File name without extension. Defaults to task name
+        :return dict: Saved file path by extension
+        """
+        self.provider.add_path(path=self.output_path, name='output')
+        paths = dict()
+        for extension, data in artifacts.items():
+            paths[extension] = self.provider.save_file(name=filename or name, data=data, extension=extension,
+                                                       path=self.output_path)
+
+        self.metadata.setdefault('profiles', {})[name] = paths
+        self.provider.save(name='.metadata', data=self.metadata, path='root')
+        return paths
+
+    def save_run(self, stats, **info):
+        """
+        Record the stats of a workflow run in metadata under ``'runs'``.
+
+        :param dict stats: Stats for every task name. See :func:`cd4ml.instrument.measure`
+        :param info: Run information, like start time and executor
+        :return int: Run index
+        """
+        runs = self.metadata.setdefault('runs', [])
+        runs.append(dict(info, tasks=stats))
+        self.provider.save(name='.metadata', data=self.metadata, path='root')
+        return len(runs) - 1
+
+    def load_runs(self):
+        """
+        Load stats of all recorded workflow runs.
+
+        :return pd.DataFrame: A row for every task run, with the run index, run information and task stats
+        :example:
+
+        >>> runs = experiment.load_runs()
+        >>> runs.groupby('task')['wall'].describe().sort_values('mean', ascending=False)
+        """
+        rows = []
+        for i, run in enumerate(self.metadata.get('runs', [])):
+            info = {f'run_{key}': value for key, value in run.items() if key != 'tasks'}
+            for task, stats in run['tasks'].items():
+                rows.append(dict(run=i, **info, task=task, **stats))
+
+        import pandas as pd
+        return pd.DataFrame(rows)
+
+    def input_changed(self, name, path, level='sample', **options):
+        """
+        Check if an input changed since the last time it was fingerprinted and store the new fingerprint in
+        metadata under ``'inputs'``.
+
+        The stat fingerprint is checked first, so unchanged inputs are recognized without reading any data. Content
+        hashes are computed only when file stats differ.
+
+        :param str name: Input name
+        :param str path: File or directory path
+        :param str level: Fingerprint level. See :func:`cd4ml.fingerprint.fingerprint`
+        :param options: Extra options for :func:`cd4ml.fingerprint.fingerprint`
+        :return bool: True if input is new or changed
+        """
+        previous = self.metadata.get('inputs', {}).get(name)
+        current = fingerprint(path, level='stat')
+        if not changed(previous, current, level='stat'):
+            return False
+
+        if level != 'stat':
+            current = fingerprint(path, level=level, **options)
+        result = changed(previous, current, level=level)
+
+        self.metadata.setdefault('inputs', {})[name] = current
+        self.provider.save(name='.metadata', data=self.metadata, path='root')
+        return result
+
 
 class ExperimentProvider(ABC):
 
@@ -191,6 +300,106 @@ class ExperimentProvider(ABC):
         """
         pass
 
+    def save_file(self, name, data: bytes, extension, path='root'):
+        """
+        Save raw file content on repository.
+
+        :param str name: File name without extension
+        :param bytes data: File content
+        :param str extension: File extension
+        :param str path: Path to save the file, relative to experiment repository
+        :return str: Saved file path
+        """
+        raise NotImplementedError(f"Raw files are not supported by {type(self).__name__}")
+
+    def save_partitions(self, name, data, path='root', partition_by=None, partition_rows=None, max_workers=None):
+        """
+        Save a DataFrame as a set of partitions written concurrently.
+
+        :param str name: Name of the partitioned data in the experiment
+        :param pd.DataFrame data: DataFrame to be partitioned
+        :param str path: Path where data is stored without filename, relative to experiment repository.
+        :param str partition_by: Column used to split the DataFrame. One partition per distinct value
+        :param int partition_rows: Maximum number of rows for each partition
+        :param int max_workers: Number of concurrent writers
+        :return: Manifest describing the partitions. It must be JSON serializable
+        :rtype: dict
+        :example:
+
+        >>> p = LocalExperimentProvider(repository_path='.cd4ml')
+        >>> df = pd.DataFrame(data={'key': ['a', 'b', 'a'], 'col2': [3, 4, 5]})
+        >>> manifest = p.save_partitions('teste', df, partition_by='key')
+        >>> [(part['key'], part['rows']) for part in manifest['partitions']]
+        [('a', 2), ('b', 1)]
+        """
+        raise NotImplementedError(f"{type(self).__name__} does not support partitioned data")
+
+    def load_partitions(self, manifest, partitions=None, max_workers=None):
+        """
+        Load partitions described in a manifest concurrently and reassemble them.
+
+        :param dict manifest: Manifest returned by :meth:`save_partitions`
+        :param list partitions: Partition keys (or indexes, for row partitions) to be loaded. Defaults to all
+        :param int max_workers: Number of concurrent readers
+        :return: The selected partitions concatenated in manifest order
+        :rtype: pd.DataFrame
+        """
+        raise NotImplementedError(f"{type(self).__name__} does not support partitioned data")
+
+    @staticmethod
+    def split_partitions(data, partition_by=None, partition_rows=None):
+        """
+        Split a DataFrame in partitions.
+
+        Rows with a null key are kept in their own partition, keyed by None. Keys are stored on the manifest, so they
+        are converted to JSON values: NumPy scalars to python values and dates to ISO format strings. See
+        :func:`partition_key`.
+
+        :param pd.DataFrame data: DataFrame to be partitioned
+        :param str partition_by: Column used to split the DataFrame
+        :param int partition_rows: Maximum number of rows for each partition
+        :return: Generator of ``(key, DataFrame)`` tuples. Row partitions are keyed by their index
+        :raises ValueError: if more than one column is used as key
+        :raises TypeError: if a key can't be stored as JSON
+        """
+        if not is_frame(data):
+            raise TypeError(f"Only DataFrames can be partitioned. You supplied '{type(data)}'")
+        if partition_by is not None:
+            if isinstance(partition_by, (list, tuple)):
+                if len(partition_by) != 1:
+                    raise ValueError(f"Partitions are keyed by a single column. You supplied {list(partition_by)}")
+                partition_by = partition_by[0]
+            for key, frame in data.groupby(partition_by, sort=False, dropna=False):
+                yield partition_key(key), frame
+        else:
+            if partition_rows is None or partition_rows < 1:
+                raise ValueError(f"partition_rows should be a positive integer. You supplied '{partition_rows}'")
+            for i, start in enumerate(range(0, max(len(data), 1), partition_rows)):
+                yield i, data.iloc[start:start + partition_rows]
+
+
+def partition_key(key):
+    """
+    Convert a partition key to the JSON value stored on the manifest.
+
+    :param key: Group key, as returned by ``DataFrame.groupby``
+    :return: None for null keys, ISO format strings for dates and python values for NumPy scalars
+    :raises TypeError: if the key can't be stored as JSON
+    """
+    if isinstance(key, tuple) and len(key) == 1:
+        key = key[0]
+    if key is None or (isinstance(key, float) and key != key):
+        return None
+    if hasattr(key, 'isoformat'):
+        # Null dates (NaT) have no ISO format
+        return None if key != key else key.isoformat()
+    key = getattr(key, 'item', lambda: key)()
+    if isinstance(key, float) and key != key:
+        return None
+    if not isinstance(key, (str, int, float, bool)):
+        raise TypeError(f"Partition key {key!r} of type '{type(key)}' can't be stored on the manifest")
+    return key
+
 
 class LocalExperimentProvider(ExperimentProvider):
 
@@ -204,11 +413,25 @@ class LocalExperimentProvider(ExperimentProvider):
         if path != 'root':
             root_path = os.path.join(self.repository_path, path)
         filepath = os.path.join(root_path, f'{name}.{datatype}')
-        with open(filepath, 'w+') as fd:
-            if isinstance(data, pd.DataFrame):
-                filepath = self._save_pandas(path=filepath, data=data)
-            else:
-                json.dump(data, fd)
+        if is_frame(data):
+            return self._save_pandas(path=filepath, data=data)
+
+        # Serialize before touching the file and replace it atomically, so a failed save never leaves it truncated
+        content = json.dumps(data)
+        # Every writing thread gets its own temporary file, so concurrent saves never write on the same file
+        tmp_path = f'{filepath}.{os.getpid()}.{threading.get_ident()}.tmp'
+        with open(tmp_path, 'w+') as fd:
+            fd.write(content)
+        os.replace(tmp_path, filepath)
+        return filepath
+
+    def save_file(self, name, data: bytes, extension, path='root'):
+        root_path = self.repository_path
+        if path != 'root':
+            root_path = os.path.join(self.repository_path, path)
+        filepath = os.path.join(root_path, f'{name}.{extension}')
+        with open(filepath, 'wb') as fd:
+            fd.write(data)
 
         return filepath
 
@@ -225,7 +448,7 @@ class LocalExperimentProvider(ExperimentProvider):
         except FileNotFoundError as e:
             raise DataNotFound(e)
 
-    def _save_pandas(self, path, data: pd.DataFrame, orient='records', lines=True, *args, **kwargs):
+    def _save_pandas(self, path, data: 'pd.DataFrame', orient='records', lines=True, *args, **kwargs):
         """
         Save pandas to data repository
         :param path: Path where data is stored with filename, relative to experiment repository
@@ -261,6 +484,7 @@ class LocalExperimentProvider(ExperimentProvider):
         :return: Return a DataFrame
         :rtype: pd.DataFrame
         """
+        import pandas as pd
         return pd.read_json(path, orient=orient, lines=lines, *args, **kwargs)
 
     def add_path(self, path, name):
@@ -268,6 +492,63 @@ class LocalExperimentProvider(ExperimentProvider):
         os.makedirs(new_path, exist_ok=True)
         return new_path
 
+    def save_partitions(self, name, data, path='root', partition_by=None, partition_rows=None, max_workers=None):
+        root_path = self.repository_path
+        if path != 'root':
+            root_path = os.path.join(self.repository_path, path)
+        partition_path = os.path.join(root_path, name)
+        # Split before removing anything, so invalid keys don't destroy a previous save
+        splits = list(self.split_partitions(data, partition_by, partition_rows))
+        os.makedirs(partition_path, exist_ok=True)
+
+        # Remove partitions from a previous save so they don't get mixed with the new ones
+        for filename in os.listdir(partition_path):
+            if filename.startswith('part-'):
+                os.unlink(os.path.join(partition_path, filename))
+
+        parts = []
+        with ThreadPoolExecutor(max_workers=max_workers) as pool:
+            futures = []
+            for i, (key, frame) in enumerate(splits):
+                filename = f'part-{i:05d}.json'
+                parts.append({'key': key, 'file': filename, 'rows': len(frame)})
+                futures.append(pool.submit(self._save_pandas, path=os.path.join(partition_path, filename), data=frame))
+
+            # Raise any error found while writing
+            for future in futures:
+                future.result()
+
+        return {
+            'path': partition_path,
+            'partition_by': partition_by,
+            'partition_rows': partition_rows,
+            'columns': [str(col) for col in data.columns],
+            'rows': len(data),
+            'partitions': parts
+        }
+
+    def load_partitions(self, manifest, partitions=None, max_workers=None):
+        parts = manifest['partitions']
+        if partitions is not None:
+            selected = {partition_key(elm) for elm in partitions}
+            parts = [part for part in parts if part['key'] in selected]
+            missing = selected - {part['key'] for part in parts}
+            if missing:
+                raise DataNotFound(f"Partitions {sorted(missing, key=str)} not found in {manifest['path']}")
+
+        import pandas as pd
+
+        # Empty partitions have nothing to be parsed
+        parts = [part for part in parts if part['rows'] > 0]
+        if len(parts) == 0:
+            return pd.DataFrame(columns=manifest['columns'])
+
+        with ThreadPoolExecutor(max_workers=max_workers) as pool:
+            frames = list(pool.map(lambda part: self._load_pandas(os.path.join(manifest['path'], part['file'])),
+                                   parts))
+
+        return pd.concat(frames, ignore_index=True)
+
 
 class DataNotFound(Exception):
     """Should be raised when data is not found on provider"""
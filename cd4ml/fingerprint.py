@@ -0,0 +1,169 @@
+import os
+import hashlib
+from concurrent.futures import ThreadPoolExecutor
+
+LEVELS = ['stat', 'sample', 'full']
+
+
+def fingerprint(path, level='stat', blocks=16, block_size=2 ** 16, chunk_size=2 ** 24, max_workers=None):
+    """
+    Fingerprint a file or directory to find out if it changed.
+
+    :param str path: File or directory path
+    :param str level: Fingerprint level. Every level includes the previous ones. Can be one of the following:
+
+        * ``'stat'``: size, modification time and inode of every file. Doesn't read any data
+        * ``'sample'``: hash of ``blocks`` evenly spaced blocks of every file
+        * ``'full'``: hash of the whole content, computed in parallel threads over chunks
+    :param int blocks: Number of blocks read by sample level
+    :param int block_size: Size in bytes of every sampled block
+    :param int chunk_size: Size in bytes of every chunk hashed by full level
+    :param int max_workers: Number of threads for full level
+    :return: Fingerprint data. It is JSON serializable
+    :rtype: dict
+    :example:
+
+    >>> fingerprint('data.csv', level='sample')
+    {
+        'path': '/data/data.csv',
+        'stat': [['data.csv', 1024, 1658784722000000000, 1234]],
+        'sample': '5b1d...'
+    }
+    """
+    if level not in LEVELS:
+        raise ValueError(f"Invalid fingerprint level {level}. Available levels: {LEVELS}")
+
+    files = list_files(path)
+    result = {
+        'path': os.path.abspath(path),
+        'stat': stat_files(path, files)
+    }
+    if level in ('sample', 'full'):
+        result['sample'] = combine(sample_hash(filepath, blocks, block_size) for filepath in files)
+    if level == 'full':
+        result['full'] = full_hash(files, chunk_size=chunk_size, max_workers=max_workers)
+
+    return result
+
+
+def list_files(path):
+    """
+    List files in a path in a stable order.
+
+    :param str path: File or directory path
+    :return list: File paths
+    """
+    if not os.path.isdir(path):
+        return [path]
+
+    files = []
+    for root, dirs, filenames in os.walk(path):
+        dirs.sort()
+        files.extend(os.path.join(root, filename) for filename in sorted(filenames))
+    return files
+
+
+def stat_files(path, files):
+    """
+    Get stat fingerprint for files.
+
+    :param str path: Base path. File names are stored relative to it
+    :param list files: File paths
+    :return list: ``[relative path, size, mtime in ns, inode]`` for every file
+    """
+    result = []
+    for filepath in files:
+        stat = os.stat(filepath)
+        relpath = os.path.relpath(filepath, path) if os.path.isdir(path) else os.path.basename(filepath)
+        result.append([relpath, stat.st_size, stat.st_mtime_ns, stat.st_ino])
+    return result
+
+
+def sample_hash(path, blocks=16, block_size=2 ** 16):
+    """
+    Hash a sample of evenly spaced blocks from a file.
+
+    :param str path: File path
+    :param int blocks: Number of blocks to be read. A single block is read from the start of the file
+    :param int block_size: Size of every block in bytes
+    :return str: Hex digest of the sampled blocks
+    :raises ValueError: if less than one block is requested
+    """
+    if blocks < 1:
+        raise ValueError(f"At least one block should be sampled. You supplied '{blocks}'")
+    size = os.path.getsize(path)
+    digest = hashlib.sha1()
+    digest.update(str(size).encode())
+    with open(path, 'rb') as fd:
+        if size <= blocks * block_size:
+            digest.update(fd.read())
+        else:
+            step = (size - block_size) // (blocks - 1) if blocks > 1 else 0
+            for i in range(blocks):
+                fd.seek(i * step)
+                digest.update(fd.read(block_size))
+
+    return digest.hexdigest()
+
+
+def full_hash(files, chunk_size=2 ** 24, max_workers=None):
+    """
+    Hash the whole content of files.
+
+    Files are split in chunks hashed concurrently and the chunk digests are combined in order. hashlib releases the
+    GIL while hashing, so threads scale with cores.
+
+    :param list files: File paths
+    :param int chunk_size: Size in bytes of every chunk
+    :param int max_workers: Number of threads
+    :return str: Hex digest
+    """
+    chunks = []
+    for filepath in files:
+        size = os.path.getsize(filepath)
+        chunks.extend((filepath, start) for start in range(0, max(size, 1), chunk_size))
+
+    def hash_chunk(chunk):
+        filepath, start = chunk
+        with open(filepath, 'rb') as fd:
+            fd.seek(start)
+            return hashlib.sha256(fd.read(chunk_size)).hexdigest()
+
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        return combine(pool.map(hash_chunk, chunks))
+
+
+def combine(digests):
+    """
+    Combine a sequence of digests in a single one.
+
+    :param digests: Iterable of hex digests
+    :return str: Hex digest
+    """
+    digest = hashlib.sha256()
+    for elm in digests:
+        digest.update(elm.encode())
+    return digest.hexdigest()
+
+
+def changed(previous, current, level='stat'):
+    """
+    Compare fingerprints.
+
+    Stat fingerprints are compared first. When both fingerprints have the requested level, content hashes refine the
+    result: the full hash decides, so files that were only touched are not considered changed, while the sample hash
+    can only add changes, as it misses edits outside the sampled blocks.
+
+    :param dict previous: Previous fingerprint
+    :param dict current: Current fingerprint
+    :param str level: Fingerprint level to be compared
+    :return bool: True if the data changed
+    """
+    if previous is None or previous.get('path') != current.get('path'):
+        return True
+    stat_changed = previous['stat'] != current['stat']
+    if level == 'stat' or level not in previous or level not in current:
+        return stat_changed
+    if level == 'full':
+        return previous['full'] != current['full']
+    return stat_changed or previous[level] != current[level]
@@ -0,0 +1,101 @@
+import os
+import sys
+import time
+import pickle
+import threading
+import tracemalloc
+
+from cd4ml.utils import sizeof
+
+
+def max_rss():
+    """
+    Peak resident set size of this process.
+
+    :return int: Size in bytes, or None where ``resource`` is not available
+    """
+    try:
+        import resource
+    except ImportError:
+        return None
+
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes and macOS bytes
+    return rss if sys.platform == 'darwin' else rss * 1024
+
+
+def serialized_size(obj):
+    """
+    Size of an object serialized with pickle.
+
+    :param obj: Any python object
+    :return int: Size in bytes, or None if the object can't be pickled
+    """
+    try:
+        return len(pickle.dumps(obj, protocol=pickle.HIGHEST_PROTOCOL))
+    except Exception:
+        return None
+
+
+def measure(func, trace_memory=False, serialize=False):
+    """
+    Call a function measuring the resources it used.
+
+    :param func: Function without arguments
+    :param bool trace_memory: Trace python memory allocations with ``tracemalloc`` to get the peak allocated by the
+        function. Slows down allocation heavy code
+    :param bool serialize: Pickle the result to measure its serialized size. Pickling makes a full copy of the
+        result, so it is off by default
+    :return: Function result and its stats, with the following keys:
+
+        * ``'started'``: start timestamp in seconds since epoch
+        * ``'wall'``: wall time in seconds
+        * ``'cpu'``: process CPU time in seconds
+        * ``'rss_peak_delta'``: increase of the process peak resident set size in bytes
+        * ``'memory_peak'``: peak of python memory allocated in bytes. None if memory is not traced
+        * ``'output_size'``: approximate size of the result in memory. See :func:`cd4ml.utils.sizeof`
+        * ``'serialized_size'``: size of the result pickled. None if not measured
+        * ``'serialize'``: time in seconds spent pickling the result. None if not measured
+        * ``'pid'`` and ``'tid'``: process and thread running the function
+    :rtype: tuple
+    """
+    started_tracing = False
+    if trace_memory:
+        if not tracemalloc.is_tracing():
+            tracemalloc.start()
+            started_tracing = True
+        tracemalloc.reset_peak()
+        traced = tracemalloc.get_traced_memory()[0]
+
+    rss = max_rss()
+    started = time.time()
+    cpu = time.process_time()
+    start = time.perf_counter()
+    try:
+        result = func()
+        wall = time.perf_counter() - start
+        cpu = time.process_time() - cpu
+        memory_peak = tracemalloc.get_traced_memory()[1] - traced if trace_memory else None
+    finally:
+        if started_tracing:
+            tracemalloc.stop()
+
+    size = seconds = None
+    if serialize:
+        seconds = time.perf_counter()
+        size = serialized_size(result)
+        seconds = time.perf_counter() - seconds
+
+    stats = {
+        'started': started,
+        'wall': wall,
+        'cpu': cpu,
+        'rss_peak_delta': None if rss is None else max_rss() - rss,
+        'memory_peak': memory_peak,
+        'output_size': sizeof(result),
+        'serialized_size': size,
+        'serialize': seconds,
+        'pid': os.getpid(),
+        'tid': threading.get_ident()
+    }
+    return result, stats
@@ -1,12 +1,106 @@
+import os
+import json
+import queue
+import atexit
 import logging
+import logging.handlers
 
-# create logger
-logger = logging.getLogger('simple_example')
-logger.setLevel(logging.DEBUG)
+# Library logger. Nothing is output until the application configures logging or calls configure()
+logger = logging.getLogger('cd4ml')
+logger.addHandler(logging.NullHandler())
 
-# create console handler and set level to debug
-ch = logging.StreamHandler()
-ch.setLevel(logging.DEBUG)
+LOG_FILE = 'log.jsonl'
 
-# add ch to logger
-logger.addHandler(ch)
+# Record attributes that are not user extras
+_RECORD_ATTRS = set(vars(logging.makeLogRecord({}))) | {'message', 'asctime'}
+
+_listener = None
+# Handlers attached to the logger and handlers writing records, which are different when using a queue
+_handlers = []
+_targets = []
+
+
+class JsonLinesFormatter(logging.Formatter):
+    """Format records as JSON objects, one per line. Values passed as ``extra`` are added as fields"""
+
+    def format(self, record):
+        data = {
+            'time': record.created,
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage(),
+            'thread': record.threadName,
+            'process': record.process
+        }
+        for key, value in vars(record).items():
+            if key not in _RECORD_ATTRS and not key.startswith('_'):
+                data[key] = value
+        if record.exc_info:
+            data['exc_info'] = self.formatException(record.exc_info)
+        return json.dumps(data, default=str)
+
+
+def configure(level=logging.INFO, stream=True, json_path=None, experiment=None, use_queue=True, handlers=None):
+    """
+    Configure cd4ml logging, replacing any previous configuration made by this function.
+
+    Records are put on a queue and written by a listener thread, so running workflows never wait on log I/O.
+
+    :param int, str level: Log level
+    :param bool stream: Log formatted messages to stderr
+    :param str json_path: Write a structured log to this path in JSON lines format
+    :param Experiment experiment: Write a structured log to the experiment directory, as :data:`LOG_FILE`
+    :param bool use_queue: Write records on a listener thread
+    :param list handlers: Extra handlers
+    :return: cd4ml logger
+    :rtype: logging.Logger
+    :example:
+
+    >>> configure(level='DEBUG', experiment=experiment)
+    """
+    shutdown()
+
+    targets = list(handlers or [])
+    if stream:
+        handler = logging.StreamHandler()
+        handler.setFormatter(logging.Formatter('%(asctime)s %(levelname)s %(name)s: %(message)s'))
+        targets.append(handler)
+    if experiment is not None:
+        json_path = os.path.join(experiment.provider.repository_path, LOG_FILE)
+    if json_path is not None:
+        handler = logging.FileHandler(json_path, mode='a')
+        handler.setFormatter(JsonLinesFormatter())
+        targets.append(handler)
+
+    global _listener
+    attached = targets
+    if use_queue:
+        records = queue.SimpleQueue()
+        _listener = logging.handlers.QueueListener(records, *targets, respect_handler_level=True)
+        _listener.start()
+        attached = [logging.handlers.QueueHandler(records)]
+
+    for handler in attached:
+        logger.addHandler(handler)
+    _handlers.extend(attached)
+    _targets.extend(targets)
+    logger.setLevel(level)
+    return logger
+
+
+def shutdown():
+    """Flush queued records and remove handlers added by :func:`configure`"""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
+    for handler in _handlers:
+        logger.removeHandler(handler)
+    for handler in _targets:
+        handler.close()
+    _handlers.clear()
+    _targets.clear()
+
+
+atexit.register(shutdown)
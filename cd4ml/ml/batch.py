@@ -0,0 +1,217 @@
+import queue
+import threading
+
+import numpy as np
+import pandas as pd
+
+from cd4ml.experiment import Experiment
+from cd4ml.ml.loader import DataLoader
+
+
+class BatchIterator:
+    """
+    Iterate over a dataset in batches prefetched by a background thread.
+
+    While the consumer computes on a batch the next ``prefetch`` batches are loaded, decoded and copied to
+    contiguous NumPy arrays, so I/O overlaps with computation. :class:`cd4ml.ml.loader.DataLoader` sources are
+    streamed chunk by chunk, so the first batches are ready before the whole source is parsed. Loaders storing
+    their output on an experiment and shuffles without ``window`` need the whole source, so it is loaded first.
+
+    :example:
+
+    >>> data = pd.DataFrame(data={'x': range(10), 'y': range(10)})
+    >>> for x, y in BatchIterator(data, batch_size=4, columns=(['x'], ['y'])):
+    >>>     print(x.shape, y.shape)
+    (4, 1) (4, 1)
+    (4, 1) (4, 1)
+    (2, 1) (2, 1)
+    """
+
+    def __init__(self, source, batch_size=32, prefetch=2, shuffle=False, window=None, seed=None, columns=None,
+                 dtype=None, drop_last=False, experiment: Experiment = None):
+        """
+        :param source: Data source. Can be a DataFrame, a NumPy array, a :class:`cd4ml.ml.loader.DataLoader` or
+            the output name of a previous task stored on ``experiment``
+        :param int batch_size: Number of rows on every batch
+        :param int prefetch: Number of batches loaded ahead of the consumer
+        :param bool shuffle: Shuffle rows inside a window
+        :param int window: Number of rows shuffled together. Defaults to the whole dataset
+        :param int seed: Random seed for shuffling
+        :param list, tuple columns: Columns to be returned. A tuple of lists returns a tuple of arrays per batch
+        :param dtype: NumPy dtype for batch arrays
+        :param bool drop_last: Drop the last batch if it is smaller than ``batch_size``
+        :param Experiment experiment: Experiment to load ``source`` output from
+        """
+        if prefetch < 1:
+            raise ValueError(f"prefetch should be at least 1. You supplied '{prefetch}'")
+        if isinstance(source, str) and experiment is None:
+            raise ValueError(f"An experiment is needed to load output '{source}'")
+
+        self.source = source
+        self.batch_size = batch_size
+        self.prefetch = prefetch
+        self.shuffle = shuffle
+        self.window = window
+        self.columns = columns
+        self.dtype = dtype
+        self.drop_last = drop_last
+        self.experiment = experiment
+        self.rng = np.random.default_rng(seed)
+        self._rows = None
+        self._data = None
+
+    def __len__(self):
+        rows = self._rows if self._rows is not None else len(self.load())
+        if self.drop_last:
+            return rows // self.batch_size
+        return -(-rows // self.batch_size)
+
+    def __iter__(self):
+        buffer = queue.Queue(maxsize=self.prefetch)
+        stop = threading.Event()
+        producer = threading.Thread(target=self._produce, args=(buffer, stop), daemon=True)
+        producer.start()
+        try:
+            while True:
+                batch = buffer.get()
+                if batch is _END:
+                    return
+                if isinstance(batch, _Error):
+                    raise batch.error
+                yield batch
+        finally:
+            # Release producer if the consumer stops before the end
+            stop.set()
+            while producer.is_alive():
+                try:
+                    buffer.get_nowait()
+                except queue.Empty:
+                    producer.join(timeout=0.01)
+
+    def load(self):
+        """
+        Load data from source. Loaded data is kept, so the source is loaded once.
+
+        :return: Source data
+        :rtype: pd.DataFrame, np.ndarray
+        """
+        if self._data is not None:
+            return self._data
+        if isinstance(self.source, DataLoader):
+            data = self.source.run()
+        elif isinstance(self.source, str):
+            data = self.experiment.load_output(name=self.source, pandas=True)
+        else:
+            data = self.source
+        self._rows = len(data)
+        self._data = data
+        return data
+
+    def stream(self):
+        """
+        Generate source data in consecutive parts. Data already loaded is returned whole.
+
+        :return: Generator of DataFrames or NumPy arrays
+        """
+        streamed = isinstance(self.source, DataLoader) and self.source.experiment is None
+        if self._data is not None or not streamed or (self.shuffle and self.window is None):
+            yield self.load()
+            return
+
+        rows = 0
+        for frame in self.source.iter_chunks():
+            rows += len(frame)
+            yield frame
+        self._rows = rows
+
+    def to_arrays(self, data):
+        """
+        Convert data to a list of arrays, one for every column group.
+
+        :param pd.DataFrame, np.ndarray data: Source data
+        :return list: NumPy arrays
+        """
+        groups = self.columns if isinstance(self.columns, tuple) else (self.columns, )
+        arrays = []
+        for group in groups:
+            if isinstance(data, pd.DataFrame):
+                frame = data if group is None else data[group]
+                arrays.append(frame.to_numpy(dtype=self.dtype))
+            else:
+                array = np.asarray(data, dtype=self.dtype)
+                arrays.append(array if group is None else array[:, group])
+        return arrays
+
+    def blocks(self):
+        """
+        Regroup streamed data in arrays of whole windows, or whole batches when not shuffling, so batches are the
+        same as with all data loaded at once.
+
+        :return: Generator of array lists. See :meth:`to_arrays`
+        """
+        step = self.window or (None if self.shuffle else self.batch_size)
+        pending = None
+        for data in self.stream():
+            if len(data) == 0:
+                continue
+            arrays = self.to_arrays(data)
+            pending = arrays if pending is None else [np.concatenate(elm) for elm in zip(pending, arrays)]
+            full = len(pending[0]) // step * step if step else 0
+            if full > 0:
+                yield [array[:full] for array in pending]
+                pending = [array[full:] for array in pending]
+        if pending is not None and len(pending[0]) > 0:
+            yield pending
+
+    def batches(self, arrays):
+        """
+        Generate batches from arrays.
+
+        :param list arrays: Arrays with the same number of rows
+        :return: Generator of batches. Each batch is an array or a tuple of arrays
+        """
+        rows = len(arrays[0])
+        window = self.window or max(rows, 1)
+        for start in range(0, rows, window):
+            end = min(start + window, rows)
+            index = np.arange(start, end)
+            if self.shuffle:
+                self.rng.shuffle(index)
+
+            for batch_start in range(0, len(index), self.batch_size):
+                batch_index = index[batch_start:batch_start + self.batch_size]
+                if self.drop_last and len(batch_index) < self.batch_size:
+                    continue
+                # take always returns a new C-contiguous array
+                batch = tuple(np.ascontiguousarray(array.take(batch_index, axis=0)) for array in arrays)
+                yield batch if isinstance(self.columns, tuple) else batch[0]
+
+    def _produce(self, buffer, stop):
+        def put(item):
+            while not stop.is_set():
+                try:
+                    buffer.put(item, timeout=0.1)
+                    return True
+                except queue.Full:
+                    pass
+            return False
+
+        try:
+            for arrays in self.blocks():
+                for batch in self.batches(arrays):
+                    if not put(batch):
+                        return
+        except Exception as e:
+            put(_Error(e))
+            return
+        put(_END)
+
+
+class _Error:
+    """Wrap exceptions raised on producer thread"""
+
+    def __init__(self, error):
+        self.error = error
+
+
+_END = object()
@@ -0,0 +1,177 @@
+import os
+import json
+import shutil
+import hashlib
+import uuid
+
+import numpy as np
+import pandas as pd
+
+from cd4ml.fingerprint import sample_hash
+from cd4ml.log import logger
+
+
+class SourceCache:
+    """
+    Binary cache of parsed data sources.
+
+    Entries are keyed on the source path, size, modification time and the options used to parse it. Optionally a
+    hash of a sample of file blocks is added to the key, so sources rewritten with the same size and mtime are not
+    served from cache. Every column is stored as a ``.npy`` file; numeric columns are memory mapped on cache hits.
+    The cache directory is kept under ``max_bytes`` evicting the least recently used entries.
+
+    :example:
+
+    >>> cache = SourceCache(cache_dir='.cd4ml/cache')
+    >>> data = cache.get('data.csv', fmt='csv')
+    >>> if data is None:
+    >>>     data = pd.read_csv('data.csv')
+    >>>     cache.put('data.csv', data, fmt='csv')
+    """
+    metadata_file = 'meta.json'
+
+    def __init__(self, cache_dir='.cd4ml/cache', max_bytes=2 ** 32, sample_hash=False, mmap=True):
+        """
+        :param str cache_dir: Directory to store cache entries
+        :param int max_bytes: Maximum size of the cache directory
+        :param bool sample_hash: Add a hash of sampled file blocks to the key
+        :param bool mmap: Memory map numeric columns on cache hits
+        """
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.sample_hash = sample_hash
+        self.mmap = mmap
+        os.makedirs(self.cache_dir, exist_ok=True)
+
+    def key(self, path, **options):
+        """
+        Get the cache key for a source.
+
+        :param str path: Source path
+        :param options: Parse options that change the parsed output, like format and schema
+        :return str: Cache key
+        """
+        stat = os.stat(path)
+        fingerprint = {
+            'path': os.path.abspath(path),
+            'size': stat.st_size,
+            'mtime': stat.st_mtime_ns,
+            'options': options
+        }
+        if self.sample_hash:
+            fingerprint['sample'] = sample_hash(path)
+
+        return hashlib.sha1(json.dumps(fingerprint, sort_keys=True, default=str).encode()).hexdigest()
+
+    def get(self, path, **options):
+        """
+        Get parsed data from cache.
+
+        :param str path: Source path
+        :param options: Parse options used on :meth:`put`
+        :return: Cached data or None if the entry doesn't exist
+        :rtype: pd.DataFrame
+        """
+        entry = os.path.join(self.cache_dir, self.key(path, **options))
+        try:
+            with open(os.path.join(entry, self.metadata_file), 'r') as fd:
+                metadata = json.load(fd)
+        except FileNotFoundError:
+            return None
+
+        columns = {}
+        for i, column in enumerate(metadata['columns']):
+            filepath = os.path.join(entry, f'{i}.npy')
+            if metadata['pickled'][i]:
+                values = np.load(filepath, allow_pickle=True)
+            else:
+                values = np.load(filepath, mmap_mode='r' if self.mmap else None)
+            columns[column] = values
+
+        data = pd.DataFrame(columns, copy=False)
+        for column, dtype in zip(metadata['columns'], metadata['dtypes']):
+            if str(data[column].dtype) != dtype:
+                data[column] = data[column].astype(dtype)
+
+        # Touch the entry so it is the most recently used
+        os.utime(os.path.join(entry, self.metadata_file))
+        logger.debug("Cache hit for %s on %s", path, entry)
+        return data
+
+    def put(self, path, data: pd.DataFrame, **options):
+        """
+        Store parsed data on cache.
+
+        :param str path: Source path
+        :param pd.DataFrame data: Parsed data
+        :param options: Parse options that change the parsed output, like format and schema
+        :return str: Cache entry path
+        """
+        entry = os.path.join(self.cache_dir, self.key(path, **options))
+
+        # Write on a temporary directory, so readers never see incomplete entries
+        tmp_entry = os.path.join(self.cache_dir, f'.tmp-{uuid.uuid4().hex}')
+        os.makedirs(tmp_entry)
+        metadata = {
+            'source': os.path.abspath(path),
+            'columns': [str(col) for col in data.columns],
+            'dtypes': [str(dtype) for dtype in data.dtypes],
+            'pickled': [],
+            'size': 0
+        }
+        for i, column in enumerate(data.columns):
+            values = data[column].to_numpy()
+            pickled = values.dtype.hasobject
+            np.save(os.path.join(tmp_entry, f'{i}.npy'), values, allow_pickle=pickled)
+            metadata['pickled'].append(pickled)
+            metadata['size'] += os.path.getsize(os.path.join(tmp_entry, f'{i}.npy'))
+
+        with open(os.path.join(tmp_entry, self.metadata_file), 'w+') as fd:
+            json.dump(metadata, fd)
+
+        shutil.rmtree(entry, ignore_errors=True)
+        try:
+            os.rename(tmp_entry, entry)
+        except OSError:
+            # Another writer stored the same entry first
+            shutil.rmtree(tmp_entry, ignore_errors=True)
+
+        self.evict()
+        return entry
+
+    def entries(self):
+        """
+        List cache entries from the least to the most recently used.
+
+        :return list: Tuples of ``(entry path, size in bytes)``
+        """
+        entries = []
+        for name in os.listdir(self.cache_dir):
+            metadata_path = os.path.join(self.cache_dir, name, self.metadata_file)
+            try:
+                with open(metadata_path, 'r') as fd:
+                    size = json.load(fd)['size']
+                entries.append((os.path.getmtime(metadata_path), os.path.join(self.cache_dir, name), size))
+            except (FileNotFoundError, NotADirectoryError):
+                continue
+
+        return [(entry, size) for _, entry, size in sorted(entries)]
+
+    def evict(self):
+        """
+        Remove least recently used entries until cache size is under ``max_bytes``.
+
+        :return list: Removed entries
+        """
+        entries = self.entries()
+        total = sum(size for _, size in entries)
+        removed = []
+        for entry, size in entries:
+            if total <= self.max_bytes:
+                break
+            shutil.rmtree(entry, ignore_errors=True)
+            total -= size
+            removed.append(entry)
+            logger.debug("Evicted cache entry %s", entry)
+
+        return removed
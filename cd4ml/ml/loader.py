@@ -0,0 +1,314 @@
+import io
+import os
+import time
+import collections
+from concurrent.futures import ThreadPoolExecutor
+
+import pandas as pd
+
+from cd4ml.task import Task
+from cd4ml.experiment import Experiment
+from cd4ml.ml.cache import SourceCache
+from cd4ml.log import logger
+
+
+class DataLoader(Task):
+    """
+    Task to load datasets from CSV, JSON lines or Parquet files.
+
+    Every source file is split in chunks which are parsed concurrently by a pool of reader threads. Text files are
+    split in byte ranges aligned to line boundaries, so records with embedded line breaks (quoted CSV fields) are
+    not supported when the file has more than one chunk. Parquet files are split by row groups.
+
+    When a :class:`cd4ml.ml.cache.SourceCache` is supplied, parsed sources are stored on it and unchanged sources
+    are served from the cache instead of being parsed again.
+
+    The ``header``, ``skiprows`` and ``nrows`` read options are applied once per file instead of once per chunk.
+    Options which can't be split in chunks, like ``skipfooter`` or non integer ``skiprows``, are rejected.
+    """
+    formats = {
+        '.csv': 'csv',
+        '.json': 'jsonl',
+        '.jsonl': 'jsonl',
+        '.ndjson': 'jsonl',
+        '.parquet': 'parquet',
+        '.pq': 'parquet'
+    }
+    # Read options applied by the loader on every file instead of by the pandas reader on every chunk
+    file_options = {'header', 'skiprows', 'nrows'}
+    unsupported_options = {'skipfooter', 'chunksize', 'iterator'}
+
+    def __init__(self, name, source=None, fmt=None, schema=None, chunk_size=2 ** 26, max_workers=None,
+                 experiment: Experiment = None, output=None, description=None, cache: SourceCache = None,
+                 **read_options):
+        """
+        :param str name: Task name to be shown on later DAG
+        :param str, List[str] source: Path or list of paths to be loaded
+        :param str fmt: Source format. One of ``'csv'``, ``'jsonl'`` or ``'parquet'``. Inferred from file extension
+            when not supplied
+        :param dict schema: Column dtypes to be applied while parsing
+        :param int chunk_size: Size in bytes of every chunk parsed by a reader thread
+        :param int max_workers: Number of reader threads
+        :param Experiment experiment: Experiment to store loaded data
+        :param str output: Output name on experiment repository. Defaults to task name
+        :param str description: Task human description
+        :param SourceCache cache: Cache for parsed sources
+        :param read_options: Extra options to pandas reader functions
+        :raises ValueError: if a read option can't be applied to chunks
+        """
+        unsupported = self.unsupported_options.intersection(read_options)
+        if unsupported:
+            raise ValueError(f"Read options {sorted(unsupported)} are not supported on chunked sources")
+        for option in ['skiprows', 'nrows']:
+            if read_options.get(option) is not None and not isinstance(read_options[option], int):
+                raise ValueError(f"Read option {option} must be an integer number of lines")
+        if read_options.get('header', 'infer') not in (None, 'infer') and not isinstance(read_options['header'], int):
+            raise ValueError("Read option header must be None or the integer line number of the header")
+        super(DataLoader, self).__init__(name, description=description, task=self.load)
+        self.source = source
+        self.fmt = fmt
+        self.schema = schema
+        self.chunk_size = chunk_size
+        self.max_workers = max_workers
+        self.experiment = experiment
+        self.output = output if output is not None else name
+        self.read_options = read_options
+        self.cache = cache
+        self.stats = dict()
+
+    def load(self, source=None, schema=None):
+        """
+        Load data from sources.
+
+        :param str, List[str] source: Path or list of paths. Defaults to the source supplied on init
+        :param dict schema: Column dtypes. Defaults to the schema supplied on init
+        :return: Loaded data
+        :rtype: pd.DataFrame
+        """
+        frames = [frame for frame in self.iter_chunks(source=source, schema=schema) if len(frame.columns) > 0]
+        data = pd.concat(frames, ignore_index=True) if len(frames) > 0 else pd.DataFrame()
+
+        if self.experiment is not None:
+            self.experiment.save_output(name=self.output, data=data)
+
+        return data
+
+    def iter_chunks(self, source=None, schema=None):
+        """
+        Parse sources chunk by chunk, in order. Reader threads parse the next chunks while the current one is
+        consumed, keeping at most two chunks per thread in memory. Cached sources are returned whole.
+
+        :param str, List[str] source: Path or list of paths. Defaults to the source supplied on init
+        :param dict schema: Column dtypes. Defaults to the schema supplied on init
+        :return: Generator of parsed chunks
+        """
+        source = source if source is not None else self.source
+        schema = schema if schema is not None else self.schema
+        if source is None:
+            raise ValueError(f"No source supplied for loader {self.name}")
+        sources = [source] if isinstance(source, (str, os.PathLike)) else list(source)
+        nrows = self.read_options.get('nrows')
+
+        start = time.perf_counter()
+        items = []
+        for path in sources:
+            fmt = self.get_format(path)
+            frame = self.cache.get(path, **self._cache_options(fmt, schema)) if self.cache is not None else None
+            items.append((fmt, path, frame, self.get_chunks(path, fmt) if frame is None else []))
+
+        workers = self.max_workers or min(32, (os.cpu_count() or 1) + 4)
+        pool = ThreadPoolExecutor(max_workers=workers)
+        try:
+            parsed = self._parse(pool, ((fmt, path, chunk) for fmt, path, _, chunks in items for chunk in chunks),
+                                 schema, ahead=2 * workers)
+            rows = 0
+            for fmt, path, frame, chunks in items:
+                if frame is not None:
+                    rows += len(frame)
+                    yield frame
+                    continue
+
+                source_frames = []
+                parsed_rows = False
+                remaining = nrows
+                for _ in chunks:
+                    frame = next(parsed)
+                    if frame is None or remaining == 0:
+                        continue
+                    if remaining is not None:
+                        # Parquet row groups are not split, so the last one may exceed the rows requested
+                        frame = frame.iloc[:remaining]
+                        remaining -= len(frame)
+                    if self.cache is not None:
+                        source_frames.append(frame)
+                    parsed_rows = True
+                    rows += len(frame)
+                    yield frame
+
+                if not parsed_rows and fmt == 'csv':
+                    # Files without data rows still have the columns of their header
+                    frame = self._header_frame(path, schema)
+                    if frame is not None:
+                        source_frames.append(frame)
+                        yield frame
+
+                if self.cache is not None:
+                    frame = pd.concat(source_frames, ignore_index=True) if source_frames else pd.DataFrame()
+                    self.cache.put(path, frame, **self._cache_options(fmt, schema))
+        finally:
+            pool.shutdown(cancel_futures=True)
+        elapsed = time.perf_counter() - start
+
+        self.stats = {
+            'rows': rows,
+            'chunks': sum(len(chunks) for _, _, _, chunks in items),
+            'cached': sum(1 for _, _, frame, _ in items if frame is not None),
+            'seconds': elapsed,
+            'rows_per_second': rows / elapsed if elapsed > 0 else float('inf')
+        }
+        logger.info("Loaded %d rows from %d sources in %.3fs (%.0f rows/s)", rows, len(sources), elapsed,
+                    self.stats['rows_per_second'])
+
+    def _parse(self, pool, chunks, schema, ahead):
+        """Parse chunks on the pool in order, submitting up to ``ahead`` chunks before the one returned"""
+        pending = collections.deque()
+        for fmt, path, chunk in chunks:
+            pending.append(pool.submit(self.read_chunk, fmt, path, chunk, schema=schema))
+            if len(pending) > ahead:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+
+    def _cache_options(self, fmt, schema):
+        return {'fmt': fmt, 'schema': schema, 'read_options': self.read_options}
+
+    def get_format(self, path):
+        """
+        Get data format for the path.
+
+        :param str path: Source path
+        :return str: Data format
+        """
+        if self.fmt is not None:
+            return self.fmt
+        ext = os.path.splitext(str(path))[1].lower()
+        if ext not in self.formats:
+            raise ValueError(f"Could not infer format for {path}. Available formats: {set(self.formats.values())}")
+        return self.formats[ext]
+
+    def get_chunks(self, path, fmt):
+        """
+        Split source in chunks to be parsed independently.
+
+        :param str path: Source path
+        :param str fmt: Source format
+        :return list: Byte ranges for text files or row group indexes for Parquet files. Lines skipped, the header and
+            lines after ``nrows`` are out of every range
+        """
+        nrows = self.read_options.get('nrows')
+        if fmt == 'parquet':
+            import pyarrow.parquet as pq
+            metadata = pq.ParquetFile(path).metadata
+            groups, rows = [], 0
+            for group in range(metadata.num_row_groups):
+                if nrows is not None and rows >= nrows:
+                    break
+                groups.append(group)
+                rows += metadata.row_group(group).num_rows
+            return groups
+
+        size = os.path.getsize(path)
+        with open(path, 'rb') as fd:
+            # Skipped lines and header are parsed apart
+            self._read_header(fd, fmt)
+            start = fd.tell()
+            if nrows is not None:
+                for _ in range(nrows):
+                    fd.readline()
+                size = fd.tell()
+
+            ranges = []
+            while start < size:
+                fd.seek(min(start + self.chunk_size, size))
+                # Move end position to the next line break
+                fd.readline()
+                end = min(fd.tell(), size)
+                ranges.append((start, end))
+                start = end
+
+        return ranges
+
+    def read_chunk(self, fmt, path, chunk, schema=None):
+        """
+        Parse a single chunk of the source.
+
+        :param str fmt: Source format
+        :param str path: Source path
+        :param tuple, int chunk: Byte range or row group index returned by :meth:`get_chunks`
+        :param dict schema: Column dtypes
+        :return: Parsed chunk
+        :rtype: pd.DataFrame
+        """
+        if fmt == 'parquet':
+            import pyarrow.parquet as pq
+            frame = pq.ParquetFile(path).read_row_group(chunk).to_pandas()
+            return frame.astype(schema) if schema else frame
+
+        start, end = chunk
+        with open(path, 'rb') as fd:
+            header = self._read_header(fd, fmt)
+            fd.seek(start)
+            buffer = fd.read(end - start)
+
+        if len(buffer.strip()) == 0:
+            return None
+
+        options = self._chunk_options()
+        if fmt == 'csv':
+            return pd.read_csv(io.BytesIO(header + buffer), dtype=schema, header=0 if header else None, **options)
+        if fmt == 'jsonl':
+            return pd.read_json(io.BytesIO(buffer), lines=True, orient='records',
+                                dtype=schema if schema else True, **options)
+
+        raise ValueError(f"Invalid format {fmt}. Available formats: {set(self.formats.values())}")
+
+    def _read_header(self, fd, fmt):
+        """
+        Move a text file past the lines skipped and the CSV header.
+
+        :param fd: Source file opened in binary mode
+        :param str fmt: Source format
+        :return bytes: CSV header line. Empty if the source has no header
+        """
+        for _ in range(self.read_options.get('skiprows') or 0):
+            fd.readline()
+        if fmt != 'csv':
+            return b''
+        header = self.read_options.get('header', 'infer')
+        if header == 'infer':
+            header = None if self.read_options.get('names') is not None else 0
+        if header is None:
+            return b''
+        for _ in range(header):
+            fd.readline()
+        return fd.readline()
+
+    def _header_frame(self, path, schema=None):
+        """
+        Parse only the header of a CSV file.
+
+        :param str path: Source path
+        :param dict schema: Column dtypes
+        :return: Frame without rows with the header columns, or None if the columns are unknown
+        :rtype: pd.DataFrame
+        """
+        with open(path, 'rb') as fd:
+            header = self._read_header(fd, 'csv')
+        if not header.strip() and self.read_options.get('names') is None:
+            return None
+        return pd.read_csv(io.BytesIO(header), dtype=schema, header=0 if header.strip() else None,
+                           **self._chunk_options())
+
+    def _chunk_options(self):
+        """Read options applied by pandas readers on every chunk"""
+        return {key: value for key, value in self.read_options.items() if key not in self.file_options}
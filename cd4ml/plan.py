@@ -0,0 +1,162 @@
+import graphlib
+
+_PENDING = 0
+_READY = 1
+_DONE = 2
+
+
+class ExecutionPlan:
+    """
+    Immutable execution plan compiled from a workflow graph.
+
+    Nodes are mapped to integer ids, and the plan keeps only the number of predecessors and the successors of every
+    node as tuples. Each run starts a :class:`PlanRun` with its own copy of the predecessor counters, so the same plan
+    can be run many times, even concurrently in different threads.
+    """
+    __slots__ = ('names', 'index', 'npredecessors', 'successors')
+
+    def __init__(self, names, npredecessors, successors):
+        """
+        :param tuple names: Node names indexed by node id
+        :param tuple npredecessors: Number of predecessors indexed by node id
+        :param tuple successors: Tuple of successor ids indexed by node id
+        """
+        self.names = tuple(names)
+        self.index = {name: i for i, name in enumerate(self.names)}
+        self.npredecessors = tuple(npredecessors)
+        self.successors = tuple(tuple(elm) for elm in successors)
+
+    @classmethod
+    def from_graph(cls, graph: graphlib.TopologicalSorter, nodes=None):
+        """
+        Compile a plan from the graph nodes. Predecessor counts are computed from successors, so the graph may be
+        prepared or even running.
+
+        :param graphlib.TopologicalSorter graph: Graph to be compiled
+        :param set nodes: Compile only the subgraph with these nodes. Defaults to all nodes
+        :return: Compiled plan
+        :rtype: ExecutionPlan
+        """
+        names = [name for name in graph._node2info if nodes is None or name in nodes]
+        index = {name: i for i, name in enumerate(names)}
+        npredecessors = [0] * len(names)
+        successors = []
+        for name in names:
+            ids = [index[elm] for elm in graph._node2info[name].successors if elm in index]
+            for i in ids:
+                npredecessors[i] += 1
+            successors.append(ids)
+
+        return cls(names, npredecessors, successors)
+
+    def __len__(self):
+        return len(self.names)
+
+    def start(self):
+        """
+        Start a new run of the plan.
+
+        :return: Run state
+        :rtype: PlanRun
+        """
+        return PlanRun(self)
+
+
+class PlanRun:
+    """
+    State of a single run of an :class:`ExecutionPlan`. Follows the ``graphlib.TopologicalSorter`` interface, and
+    nodes may be added while the run is active.
+    """
+
+    def __init__(self, plan: ExecutionPlan):
+        self.plan = plan
+        # Plan structure is shared until nodes are added to this run
+        self.names = plan.names
+        self.index = plan.index
+        self.successors = plan.successors
+        self.npredecessors = list(plan.npredecessors)
+        self.state = bytearray(len(plan))
+        self.ready = [i for i, count in enumerate(self.npredecessors) if count == 0]
+        self.npassedout = 0
+        self.nfinished = 0
+
+    def get_ready(self):
+        """
+        Return all nodes that are ready to run and were not returned before.
+
+        :return tuple: Node names
+        """
+        ready, self.ready = self.ready, []
+        for i in ready:
+            self.state[i] = _READY
+        self.npassedout += len(ready)
+        return tuple(self.names[i] for i in ready)
+
+    def is_active(self):
+        """
+        Check if there are nodes still to be finished.
+
+        :return bool:
+        """
+        return self.nfinished < self.npassedout or bool(self.ready)
+
+    def add(self, node, *predecessors):
+        """
+        Add a new node to this run only. The plan is not changed.
+
+        :param node: Node name
+        :param predecessors: Names of nodes already in the run. Node is ready when all of them are done
+        """
+        if node in self.index:
+            raise ValueError(f"node {node!r} was already added")
+        unknown = [elm for elm in predecessors if elm not in self.index]
+        if unknown:
+            raise ValueError(f"nodes {unknown!r} were not added using add()")
+
+        if self.names is self.plan.names:
+            self.names = list(self.names)
+            self.index = dict(self.index)
+            self.successors = [list(elm) for elm in self.successors]
+
+        i = len(self.names)
+        self.names.append(node)
+        self.index[node] = i
+        self.successors.append([])
+        self.state.append(_PENDING)
+
+        count = 0
+        for elm in set(predecessors):
+            j = self.index[elm]
+            if self.state[j] != _DONE:
+                self.successors[j].append(i)
+                count += 1
+        self.npredecessors.append(count)
+        if count == 0:
+            self.ready.append(i)
+
+    def __bool__(self):
+        return self.is_active()
+
+    def done(self, *nodes):
+        """
+        Mark nodes returned by :meth:`get_ready` as done, releasing their successors.
+
+        :param nodes: Node names
+        """
+        index = self.index
+        for node in nodes:
+            i = index.get(node)
+            if i is None:
+                raise ValueError(f"node {node!r} was not added using add()")
+            if self.state[i] != _READY:
+                if self.state[i] == _DONE:
+                    raise ValueError(f"node {node!r} was already marked done")
+                raise ValueError(f"node {node!r} was not passed out (still not ready)")
+
+            self.state[i] = _DONE
+            for successor in self.successors[i]:
+                self.npredecessors[successor] -= 1
+                if self.npredecessors[successor] == 0:
+                    self.ready.append(successor)
+
+            self.nfinished += 1
@@ -0,0 +1,111 @@
+import os
+import sys
+import marshal
+import cProfile
+import threading
+from collections import Counter
+
+PROFILERS = ['cprofile', 'sample']
+
+
+class CProfiler:
+    """Deterministic profiler using ``cProfile``. Stats are saved in the ``.prof`` format read by ``pstats``"""
+
+    def __init__(self):
+        self.profile = cProfile.Profile()
+
+    def __enter__(self):
+        self.profile.enable()
+        return self
+
+    def __exit__(self, *args):
+        self.profile.disable()
+
+    def artifacts(self):
+        """
+        :return dict: ``.prof`` file content by extension
+        """
+        self.profile.create_stats()
+        return {'prof': marshal.dumps(self.profile.stats)}
+
+
+class SamplingProfiler:
+    """
+    Low overhead profiler sampling the stack of the profiled thread from a background thread.
+
+    Samples are collapsed in the folded stacks format read by flamegraph tools, like ``flamegraph.pl`` and
+    `speedscope <https://www.speedscope.app>`_. Only frames below the profiled block are kept.
+    """
+
+    def __init__(self, interval=0.005):
+        """
+        :param float interval: Seconds between samples
+        """
+        self.interval = interval
+        self.counts = Counter()
+        self.tid = None
+        self.depth = 0
+        self._stop = threading.Event()
+        self._thread = None
+
+    def __enter__(self):
+        self.tid = threading.get_ident()
+        self.depth = len(_stack(sys._getframe(1)))
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._sample, name='cd4ml-sampler', daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, *args):
+        self._stop.set()
+        self._thread.join()
+
+    def _sample(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.tid)
+            if frame is None:
+                continue
+            stack = _stack(frame)[self.depth:]
+            del frame
+            if stack:
+                self.counts[';'.join(stack)] += 1
+
+    def folded(self):
+        """
+        :return str: One line for every sampled stack with the frames separated by ``;`` and the number of samples
+        """
+        return ''.join(f'{stack} {count}\n' for stack, count in self.counts.most_common())
+
+    def artifacts(self):
+        """
+        :return dict: Folded stacks file content by extension
+        """
+        return {'folded': self.folded().encode()}
+
+
+def _stack(frame):
+    """Frame names from the outermost to the innermost frame"""
+    stack = []
+    while frame is not None:
+        code = frame.f_code
+        stack.append(f'{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})')
+        frame = frame.f_back
+    stack.reverse()
+    return stack
+
+
+def get_profiler(profiler='cprofile'):
+    """
+    Get a new profiler.
+
+    :param str, bool profiler: Profiler name. Can be one of the following:
+
+        * ``'cprofile'`` or ``True``: :class:`CProfiler`
+        * ``'sample'``: :class:`SamplingProfiler`
+    :return: Profiler used as a context manager around profiled code
+    """
+    if profiler is True or profiler == 'cprofile':
+        return CProfiler()
+    if profiler == 'sample':
+        return SamplingProfiler()
+    raise ValueError(f"Invalid profiler {profiler}. Available profilers: {PROFILERS}")
@@ -0,0 +1,148 @@
+import os
+import time
+import threading
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+from cd4ml.events import EventBus, Event
+
+METRICS = {
+    'cd4ml_tasks_submitted_total': ('counter', "Tasks submitted to executors"),
+    'cd4ml_tasks_finished_total': ('counter', "Tasks finished"),
+    'cd4ml_tasks_running': ('gauge', "Tasks submitted and not finished"),
+    'cd4ml_task_seconds_total': ('counter', "Wall time spent running tasks"),
+    'cd4ml_task_cpu_seconds_total': ('counter', "CPU time spent running tasks"),
+    'cd4ml_output_bytes_total': ('counter', "Bytes of task outputs saved on experiment"),
+    'cd4ml_outputs_saved_total': ('counter', "Outputs saved on experiment"),
+    'cd4ml_output_save_seconds_total': ('counter', "Time spent saving outputs on experiment"),
+    'cd4ml_runs_finished_total': ('counter', "Workflow runs finished"),
+    'cd4ml_runs_failed_total': ('counter', "Workflow runs failed"),
+    'cd4ml_last_run_seconds': ('gauge', "Wall time of the last workflow run"),
+    'cd4ml_last_event_timestamp_seconds': ('gauge', "Timestamp of the last event"),
+}
+
+
+class PrometheusExporter:
+    """
+    Aggregate workflow run events as Prometheus metrics.
+
+    Metrics are exposed in the Prometheus text format on an HTTP endpoint, on a text file for the node exporter
+    textfile collector, or both.
+
+    :example:
+
+    >>> w = Workflow()
+    >>> exporter = PrometheusExporter(w.events, textfile='/var/lib/node_exporter/cd4ml.prom')
+    >>> exporter.serve(port=9150)
+    >>> w.run(run_config)
+    """
+
+    def __init__(self, events: EventBus = None, textfile=None, min_interval=1.0):
+        """
+        :param EventBus events: Event bus to subscribe to
+        :param str textfile: Write metrics to this file. It is replaced atomically
+        :param float min_interval: Minimum seconds between text file writes. It is always written when a run finishes
+        """
+        self.values = {name: 0 for name in METRICS}
+        self.textfile = textfile
+        self.min_interval = min_interval
+        self.server = None
+        self._written = 0.0
+        self._lock = threading.Lock()
+        if events is not None:
+            events.subscribe(self.handle)
+
+    def handle(self, event: Event):
+        """
+        Update metrics with an event.
+
+        :param Event event: Workflow run event
+        """
+        data = event.data
+        with self._lock:
+            values = self.values
+            if event.name == 'task_submitted':
+                values['cd4ml_tasks_submitted_total'] += 1
+                values['cd4ml_tasks_running'] += 1
+            elif event.name == 'task_finished':
+                values['cd4ml_tasks_finished_total'] += 1
+                values['cd4ml_tasks_running'] = max(values['cd4ml_tasks_running'] - 1, 0)
+                values['cd4ml_task_seconds_total'] += data.get('wall') or 0
+                values['cd4ml_task_cpu_seconds_total'] += data.get('cpu') or 0
+            elif event.name == 'output_saved':
+                values['cd4ml_outputs_saved_total'] += 1
+                values['cd4ml_output_bytes_total'] += data.get('size') or 0
+                values['cd4ml_output_save_seconds_total'] += data.get('seconds') or 0
+            elif event.name == 'run_finished':
+                values['cd4ml_runs_finished_total'] += 1
+                values['cd4ml_runs_failed_total'] += 1 if data.get('failed') else 0
+                values['cd4ml_last_run_seconds'] = data.get('wall') or 0
+                values['cd4ml_tasks_running'] = 0
+            values['cd4ml_last_event_timestamp_seconds'] = event.time
+
+        if self.textfile is not None:
+            now = time.monotonic()
+            if event.name == 'run_finished' or now - self._written >= self.min_interval:
+                self.write(self.textfile)
+                self._written = now
+
+    def render(self):
+        """
+        Render metrics in the Prometheus text format.
+
+        :return str: Metrics
+        """
+        with self._lock:
+            values = dict(self.values)
+
+        lines = []
+        for name, (kind, description) in METRICS.items():
+            lines.append(f'# HELP {name} {description}\n')
+            lines.append(f'# TYPE {name} {kind}\n')
+            lines.append(f'{name} {values[name]}\n')
+        return ''.join(lines)
+
+    def write(self, filepath):
+        """
+        Write metrics to a text file, replacing it atomically.
+
+        :param str filepath: Metrics file path
+        :return str: Metrics file path
+        """
+        tmp_path = f'{filepath}.{os.getpid()}.tmp'
+        with open(tmp_path, 'w+') as fd:
+            fd.write(self.render())
+        os.replace(tmp_path, filepath)
+        return filepath
+
+    def serve(self, port=9150, addr='127.0.0.1'):
+        """
+        Serve metrics over HTTP on a daemon thread.
+
+        :param int port: Port to listen to. Use 0 for any free port
+        :param str addr: Address to listen to
+        :return: HTTP server. Its ``server_address`` has the bound port
+        """
+        exporter = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                body = exporter.render().encode()
+                self.send_response(200)
+                self.send_header('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer((addr, port), Handler)
+        threading.Thread(target=self.server.serve_forever, name='cd4ml-prometheus', daemon=True).start()
+        return self.server
+
+    def close(self):
+        """Stop the HTTP server"""
+        if self.server is not None:
+            self.server.shutdown()
+            self.server.server_close()
+            self.server = None
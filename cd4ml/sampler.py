@@ -0,0 +1,174 @@
+import os
+import time
+import threading
+
+from cd4ml.log import logger
+
+PROC = '/proc'
+
+
+def read_process(pid):
+    """
+    Read resource usage of a process from ``/proc``.
+
+    :param int pid: Process id
+    :return: CPU seconds, RSS bytes, bytes read and bytes written from storage, or None if the process is gone
+    :rtype: tuple
+    """
+    try:
+        with open(os.path.join(PROC, str(pid), 'stat'), 'r') as fd:
+            # Command name may have spaces, so fields are counted after it
+            fields = fd.read().rsplit(')', 1)[1].split()
+        cpu = (int(fields[11]) + int(fields[12])) / os.sysconf('SC_CLK_TCK')
+        rss = int(fields[21]) * os.sysconf('SC_PAGE_SIZE')
+    except (FileNotFoundError, ProcessLookupError, IndexError):
+        return None
+
+    read_bytes = write_bytes = 0
+    try:
+        with open(os.path.join(PROC, str(pid), 'io'), 'r') as fd:
+            io = dict(line.split(': ') for line in fd.read().splitlines())
+        read_bytes = int(io['read_bytes'])
+        write_bytes = int(io['write_bytes'])
+    except (OSError, KeyError, ValueError):
+        pass
+
+    return cpu, rss, read_bytes, write_bytes
+
+
+def process_tree(pid):
+    """
+    Find a process and all its descendants.
+
+    :param int pid: Root process id
+    :return list: Process ids
+    """
+    parents = dict()
+    for name in os.listdir(PROC):
+        if not name.isdigit():
+            continue
+        try:
+            with open(os.path.join(PROC, name, 'stat'), 'r') as fd:
+                parents[int(name)] = int(fd.read().rsplit(')', 1)[1].split()[1])
+        except (OSError, IndexError, ValueError):
+            continue
+
+    children = dict()
+    for child, parent in parents.items():
+        children.setdefault(parent, []).append(child)
+
+    tree = []
+    stack = [pid]
+    while stack:
+        elm = stack.pop()
+        tree.append(elm)
+        stack.extend(children.get(elm, []))
+    return tree
+
+
+class ResourceSampler:
+    """
+    Background thread sampling resource usage of this process and its children from ``/proc``.
+
+    Every sample has the CPU utilization in cores, RSS, storage read and write throughput of the whole process tree,
+    tagged with the tasks running at the time. High CPU with few running tasks means the run is under parallelized,
+    CPU close to the number of cores means it is CPU bound and low CPU with high throughput means it is I/O bound.
+    Only Linux is supported; elsewhere no samples are recorded.
+
+    :example:
+
+    >>> running = set()
+    >>> with ResourceSampler(interval=0.1, tags=lambda: running) as sampler:
+    >>>     run_tasks()
+    >>> sampler.series()['cpu']
+    """
+
+    def __init__(self, interval=0.1, tags=None, pid=None):
+        """
+        :param float interval: Seconds between samples
+        :param tags: Function returning the names of running tasks
+        :param int pid: Root process id. Defaults to this process
+        """
+        self.interval = interval
+        self.tags = tags
+        self.pid = os.getpid() if pid is None else pid
+        self.samples = list()
+        self._previous = dict()
+        self._previous_time = None
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        """Start sampling on a daemon thread"""
+        if not os.path.isdir(PROC):
+            logger.warning("Resource sampling is not supported without %s", PROC)
+            return self
+
+        self._stop.clear()
+        self.sample()
+        self._thread = threading.Thread(target=self._run, name='cd4ml-resources', daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        """Stop sampling, taking a last sample"""
+        if self._thread is not None:
+            self._stop.set()
+            self._thread.join()
+            self._thread = None
+            self.sample()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *args):
+        self.stop()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self.sample()
+
+    def sample(self):
+        """
+        Take a sample. Rates are computed from the previous sample, only for processes alive on both.
+
+        :return dict: Sample
+        """
+        now = time.time()
+        current = dict()
+        for pid in process_tree(self.pid):
+            usage = read_process(pid)
+            if usage is not None:
+                current[pid] = usage
+
+        elapsed = now - self._previous_time if self._previous_time is not None else None
+        cpu = read_bytes = write_bytes = 0
+        for pid, usage in current.items():
+            if pid in self._previous:
+                previous = self._previous[pid]
+                cpu += usage[0] - previous[0]
+                read_bytes += usage[2] - previous[2]
+                write_bytes += usage[3] - previous[3]
+
+        sample = {
+            'time': now,
+            'cpu': cpu / elapsed if elapsed else 0.0,
+            'rss': sum(usage[1] for usage in current.values()),
+            'read_rate': read_bytes / elapsed if elapsed else 0.0,
+            'write_rate': write_bytes / elapsed if elapsed else 0.0,
+            'processes': len(current),
+            'tasks': sorted(self.tags()) if self.tags is not None else []
+        }
+        self._previous = current
+        self._previous_time = now
+        self.samples.append(sample)
+        return sample
+
+    def series(self):
+        """
+        Get samples by column, ready to be saved as JSON or loaded as a DataFrame.
+
+        :return dict: List of values by column
+        """
+        columns = ['time', 'cpu', 'rss', 'read_rate', 'write_rate', 'processes', 'tasks']
+        return {column: [sample[column] for sample in self.samples] for column in columns}
@@ -0,0 +1,263 @@
+import os
+import sys
+import mmap
+import secrets
+import weakref
+from multiprocessing import shared_memory
+
+from cd4ml.utils import is_frame
+from cd4ml.log import logger
+
+ALIGNMENT = 64
+
+
+class SharedBlock:
+    """
+    Picklable handle to arrays stored in a single shared memory segment.
+
+    Handles are small, so they can be sent to other processes instead of the data. Arrays are attached as read only
+    views on the segment.
+    """
+    __slots__ = ('name', 'kind', 'arrays', 'meta')
+
+    def __init__(self, name, kind, arrays, meta=None):
+        """
+        :param str name: Shared memory segment name
+        :param str kind: Kind of shared object. Can be ``'array'`` or ``'frame'``
+        :param list arrays: ``(key, dtype, shape, offset)`` for every array in the segment
+        :param dict meta: Data needed to rebuild the object apart from arrays, like DataFrame index and non numeric
+            columns
+        """
+        self.name = name
+        self.kind = kind
+        self.arrays = arrays
+        self.meta = meta
+
+    def __getstate__(self):
+        return self.name, self.kind, self.arrays, self.meta
+
+    def __setstate__(self, state):
+        self.name, self.kind, self.arrays, self.meta = state
+
+    def __repr__(self):
+        return f"SharedBlock(name={self.name!r}, kind={self.kind!r}, arrays={len(self.arrays)})"
+
+
+class _Segment:
+    """
+    Shared memory segment mapped without registering it on the resource tracker. Python 3.13 supports this with
+    ``SharedMemory(track=False)``; before that ``SharedMemory`` always registers segments, and forked processes share
+    the tracker of their parent, so unregistering a segment there would drop the registration of its owner.
+    """
+
+    def __init__(self, name=None, create=False, size=0):
+        import _posixshmem
+
+        flags = os.O_RDWR | (os.O_CREAT | os.O_EXCL if create else 0)
+        while True:
+            self.name = name if name is not None else f'psm_{secrets.token_hex(4)}'
+            try:
+                fd = _posixshmem.shm_open(f'/{self.name}', flags, mode=0o600)
+                break
+            except FileExistsError:
+                if name is not None:
+                    raise
+        try:
+            if create:
+                os.ftruncate(fd, size)
+            self.size = os.fstat(fd).st_size
+            self._mmap = mmap.mmap(fd, self.size)
+        finally:
+            os.close(fd)
+        self.buf = memoryview(self._mmap)
+
+    def close(self):
+        self.buf.release()
+        self._mmap.close()
+
+
+def _open(name=None, create=False, size=0, track=True):
+    """
+    Open a shared memory segment.
+
+    :param str name: Segment name. A new name is generated when creating a segment without name
+    :param bool create: Create a new segment
+    :param int size: Size in bytes of a new segment
+    :param bool track: Register the segment on the resource tracker, so it is unlinked if this process dies. Only the
+        process owning the segment should track it
+    :return: Shared memory handle
+    """
+    if sys.version_info >= (3, 13):
+        return shared_memory.SharedMemory(name=name, create=create, size=size, track=track)
+    if track or os.name == 'nt':
+        # Windows segments are never tracked
+        return shared_memory.SharedMemory(name=name, create=create, size=size)
+    return _Segment(name=name, create=create, size=size)
+
+
+# Handles returned by attach, closed when the last view on them is garbage collected
+_attached = weakref.WeakSet()
+
+
+def detach(shm):
+    """
+    Drop a shared memory handle. Handles returned by :func:`attach` stay open until all views on the segment are
+    garbage collected, as views would point to unmapped memory otherwise. Other handles are closed.
+
+    :param shm: Shared memory handle
+    """
+    if shm not in _attached:
+        shm.close()
+
+
+def share(obj, min_bytes=0, track=True):
+    """
+    Copy NumPy arrays or the numeric columns of a DataFrame to a new shared memory segment.
+
+    :param obj: Object to be shared
+    :param int min_bytes: Objects with less bytes than this are not shared
+    :param bool track: Register the segment on the resource tracker. Worker processes should not track segments they
+        hand over to the parent
+    :return: Handle and shared memory, or ``(None, None)`` if the object can't or shouldn't be shared
+    :rtype: tuple
+    """
+    # Arrays and DataFrames can only exist if numpy was imported by the caller
+    if 'numpy' not in sys.modules:
+        return None, None
+    import numpy as np
+
+    if isinstance(obj, np.ndarray) and obj.dtype.kind in 'biufcmM':
+        kind = 'array'
+        arrays = [(None, obj)]
+        meta = None
+    elif is_frame(obj) and obj.columns.is_unique:
+        kind = 'frame'
+        arrays = []
+        other = dict()
+        for column in obj.columns:
+            values = obj[column]
+            if isinstance(values.dtype, np.dtype) and values.dtype.kind in 'biufcmM':
+                arrays.append((column, values.to_numpy()))
+            else:
+                other[column] = values
+        meta = {'columns': list(obj.columns), 'index': obj.index, 'other': other}
+    else:
+        return None, None
+
+    nbytes = sum(array.nbytes for _, array in arrays)
+    if nbytes < max(min_bytes, 1):
+        return None, None
+
+    specs = []
+    offset = 0
+    for key, array in arrays:
+        specs.append((key, array.dtype.str, array.shape, offset))
+        offset += -(-array.nbytes // ALIGNMENT) * ALIGNMENT
+
+    shm = _open(create=True, size=offset, track=track)
+    for (key, array), (_, dtype, shape, start) in zip(arrays, specs):
+        view = np.ndarray(shape, dtype=dtype, buffer=shm.buf, offset=start)
+        view[...] = array
+        del view
+
+    return SharedBlock(shm.name, kind, specs, meta), shm
+
+
+def attach(block: SharedBlock, track=True):
+    """
+    Attach to a shared block returning read only views on the segment.
+
+    :param SharedBlock block: Shared block handle
+    :param bool track: Register the segment on the resource tracker. Only the process owning the segment should
+        track it
+    :return: Shared object and its shared memory handle. The handle is closed when the last view is garbage collected
+    :rtype: tuple
+    """
+    import numpy as np
+
+    shm = _open(name=block.name, track=track)
+    # Views are taken from a single array on the whole segment, so the handle lives as long as any view does. Arrays
+    # built on a buffer keep a reference to the mapping but no buffer export, so the handle can be closed with them
+    base = np.ndarray((shm.size, ), dtype=np.uint8, buffer=shm.buf)
+    weakref.finalize(base, shm.close)
+    _attached.add(shm)
+
+    views = []
+    for key, dtype, shape, offset in block.arrays:
+        dtype = np.dtype(dtype)
+        nbytes = int(np.prod(shape)) * dtype.itemsize
+        view = base[offset:offset + nbytes].view(dtype).reshape(shape)
+        view.flags.writeable = False
+        views.append((key, view))
+    del base
+
+    if block.kind == 'array':
+        return views[0][1], shm
+
+    import pandas as pd
+    columns = dict(views)
+    columns.update(block.meta['other'])
+    frame = pd.DataFrame({column: columns[column] for column in block.meta['columns']}, index=block.meta['index'],
+                         copy=False)
+    return frame, shm
+
+
+class SharedMemoryTransport:
+    """
+    Shared memory segments owned by a process, grouped by the output they store.
+
+    Segments are unlinked when their output is released or the transport is closed. Views already handed to
+    consumers stay valid after unlink until they are garbage collected.
+    """
+
+    def __init__(self, min_bytes=2 ** 16):
+        """
+        :param int min_bytes: Objects smaller than this are not shared
+        """
+        self.min_bytes = min_bytes
+        self.segments = dict()
+
+    def share(self, key, obj):
+        """
+        Share an object under an output name.
+
+        :param str key: Output name
+        :param obj: Object to be shared
+        :return: Shared block handle, or None if the object was not shared
+        :rtype: SharedBlock
+        """
+        block, shm = share(obj, min_bytes=self.min_bytes)
+        if block is not None:
+            self.segments.setdefault(key, []).append(shm)
+        return block
+
+    def adopt(self, key, block: SharedBlock):
+        """
+        Take ownership of a segment created by another process and attach to it.
+
+        :param str key: Output name
+        :param SharedBlock block: Shared block handle
+        :return: Shared object
+        """
+        obj, shm = attach(block)
+        self.segments.setdefault(key, []).append(shm)
+        return obj
+
+    def release(self, key):
+        """
+        Unlink all segments of an output.
+
+        :param str key: Output name
+        """
+        for shm in self.segments.pop(key, []):
+            logger.debug("Unlinking shared memory %s for output %s", shm.name, key)
+            try:
+                shm.unlink()
+            except FileNotFoundError:
+                pass
+            detach(shm)
+
+    def close(self):
+        """Unlink all segments"""
+        for key in list(self.segments):
+            self.release(key)
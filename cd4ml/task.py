@@ -1,14 +1,17 @@
 import inspect
+import time
 
 
 class Task:
     """Generic task to be run in a pipeline."""
 
-    def __init__(self, name, description=None, task=None):
+    def __init__(self, name, description=None, task=None, profile=False):
         """
         :param name: Task name to be shown on later DAG
         :param description: Task human description
         :param task: Function to be called in this task
+        :param bool, str profile: Profile the task when run on a workflow. Can be a profiler name. See
+            :func:`cd4ml.profiler.get_profiler`
         """
         self.name = name
         self.description = description
@@ -17,6 +20,7 @@ class Task:
 
         self.params = []
         self.task = task
+        self.profile = profile
 
     @property
     def task(self):
@@ -30,6 +34,95 @@ class Task:
             self.params = sig.parameters
             self._task = value
 
+    def __getstate__(self):
+        # Signature parameters can't be pickled. They are read again from the task on unpickling
+        state = self.__dict__.copy()
+        state.pop('params', None)
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self.params = []
+        if getattr(self, '_task', None) is not None:
+            self.params = inspect.signature(self._task).parameters
+
     def run(self, *args, **kwargs):
         """Run method task if defined"""
         return self.task(*args, **kwargs)
+
+
+class FusedTask(Task):
+    """
+    Chain of tasks run as a single task.
+
+    Every task receives the output of the previous one as its only param, so intermediate outputs stay in memory and
+    are never submitted, persisted or loaded by the workflow. Like executors do, tasks not accepting the param are run
+    again with no params. The time spent on every original task is recorded on :attr:`timings`.
+    """
+
+    def __init__(self, steps, name=None, description=None):
+        """
+        :param list steps: ``(Task, output)`` tuples in running order. ``output`` is the param name the next task
+            receives the result with
+        :param str name: Task name. Defaults to the last task name, so consumers of the chain don't need to change
+        :param str description: Task human description. Defaults to the chain of task names
+        """
+        self.steps = list(steps)
+        if name is None:
+            name = self.steps[-1][0].name
+        if description is None:
+            description = ' -> '.join(task.name for task, _ in self.steps)
+        # The chain is profiled if any of its tasks is
+        profile = next((task.profile for task, _ in self.steps if getattr(task, 'profile', False)), False)
+        super(FusedTask, self).__init__(name, description=description, profile=profile)
+        self.timings = dict()
+
+    def run(self, **params):
+        """
+        Run all tasks in the chain. First task receives the params.
+
+        :return: Last task result
+        """
+        self.timings = dict()
+        result = None
+        previous = None
+        for i, (task, output) in enumerate(self.steps):
+            start = time.perf_counter()
+            try:
+                result = task.run(**params) if i == 0 else task.run(**{previous: result})
+            except TypeError:
+                # Try again with no params
+                result = task.run()
+            self.timings[task.name] = time.perf_counter() - start
+            previous = output
+
+        return result
+
+
+class Expansion:
+    """
+    Task result adding new tasks to the running workflow.
+
+    New tasks are scheduled on the same run as soon as their dependencies finish, so work discovered by a task can be
+    run in parallel. They are not added to the workflow, so every run expands again.
+
+    :example:
+
+    >>> def discover(path):
+    >>>     files = os.listdir(path)
+    >>>     tasks = [(Task(name=f'parse-{i}', task=parse), 'discover') for i in range(len(files))]
+    >>>     tasks.append((Task(name='merge', task=merge), [name for name, _ in tasks]))
+    >>>     return Expansion(tasks, output=files)
+    """
+
+    def __init__(self, tasks, run_config=None, output=None):
+        """
+        :param tasks: Iterable of :class:`Task` instances or ``(Task, dependency)`` tuples, like
+            :meth:`Workflow.add_tasks`. Dependencies can be the emitting task, other new tasks or tasks already in
+            the run with outputs still available
+        :param dict run_config: Input and output format of new tasks
+        :param output: Emitting task output
+        """
+        self.tasks = list(tasks)
+        self.run_config = run_config or dict()
+        self.output = output
@@ -0,0 +1,63 @@
+import io
+import os
+import time
+import tempfile
+import unittest
+import contextlib
+
+from cd4ml.benchmarks.scaling import default_workers, spin, ideal_seconds, run_benchmark, break_even, main
+from cd4ml.benchmarks.harness import load_results
+
+
+class TestScalingBenchmark(unittest.TestCase):
+    def setUp(self) -> None:
+        self.tmpdir = tempfile.TemporaryDirectory()
+
+    def tearDown(self) -> None:
+        self.tmpdir.cleanup()
+
+    def test_default_workers(self):
+        """Should include one worker and the number of CPUs."""
+        workers = default_workers()
+        self.assertEqual(workers[0], 1)
+        self.assertIn(os.cpu_count(), workers)
+
+    def test_spin(self):
+        """Should spend CPU time."""
+        start = time.thread_time()
+        spin(0.02)
+        self.assertGreaterEqual(time.thread_time() - start, 0.02)
+
+    def test_ideal_seconds(self):
+        """Should not run CPU time on more workers than CPUs."""
+        self.assertAlmostEqual(ideal_seconds('io', 0.1, 8, 4, cpus=1), 0.2)
+        self.assertAlmostEqual(ideal_seconds('cpu', 0.1, 8, 4, cpus=1), 0.8)
+        self.assertAlmostEqual(ideal_seconds('cpu', 0.1, 8, 4, cpus=8), 0.2)
+        self.assertAlmostEqual(ideal_seconds('mixed', 0.1, 8, 4, cpus=1), 0.4)
+
+    def test_run_benchmark(self):
+        """Should measure local and process executors, with speedup over the local executor."""
+        results = run_benchmark(kinds=['io'], durations=[0.0, 0.05], workers=[1, 4], tasks=8, repeat=1)
+        rows = {(row['duration'], row['executor'], row['workers']): row for row in results}
+        self.assertEqual(len(rows), 6)
+        self.assertEqual(rows[(0.0, 'local', 1)]['speedup'], 1)
+        for row in results:
+            self.assertGreater(row['seconds'], 0)
+            self.assertAlmostEqual(row['efficiency'], row['speedup'] / row['workers'])
+        # Sleeping tasks run in parallel on any number of CPUs
+        self.assertGreater(rows[(0.05, 'process', 4)]['speedup'], 1)
+
+        summary = {row['workers']: row for row in break_even(results)}
+        self.assertEqual(summary[4]['break_even'], 0.05)
+        self.assertEqual(summary[4]['overhead_floor'], rows[(0.0, 'process', 4)]['overhead_per_task'])
+
+    def test_main(self):
+        """Should write results with the break even summary."""
+        output = os.path.join(self.tmpdir.name, 'scaling.json')
+        with contextlib.redirect_stdout(io.StringIO()):
+            code = main(['--kinds', 'cpu', '--durations', '0', '--executors', 'local', '--tasks', '4', '--repeat', '1',
+                         '--output', output])
+        self.assertEqual(code, 0)
+        results = load_results(output)
+        self.assertEqual(len(results['results']), 1)
+        self.assertListEqual(results['summary'], [])
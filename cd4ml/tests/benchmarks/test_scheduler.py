@@ -0,0 +1,83 @@
+import io
+import os
+import tempfile
+import unittest
+import contextlib
+
+from cd4ml.benchmarks.scheduler import SHAPES, chain, wide, lattice, random_dag, run_benchmark, main
+from cd4ml.benchmarks.harness import compare, check_baseline, load_results, write_results
+
+
+class TestSchedulerBenchmark(unittest.TestCase):
+    def setUp(self) -> None:
+        self.tmpdir = tempfile.TemporaryDirectory()
+
+    def tearDown(self) -> None:
+        self.tmpdir.cleanup()
+
+    def test_shapes(self):
+        """Should generate graphs with the requested number of tasks in dependency order."""
+        for shape, generate in SHAPES.items():
+            for size in [1, 2, 3, 10]:
+                graph = generate(size)
+                self.assertEqual(len(graph), size, shape)
+                seen = set()
+                for name, dependency in graph.items():
+                    self.assertTrue(set(dependency) <= seen, shape)
+                    seen.add(name)
+
+        self.assertEqual(sum(len(elm) for elm in chain(10).values()), 9)
+        self.assertListEqual(wide(5)['t4'], ['t1', 't2', 't3'])
+        self.assertEqual(sum(len(elm) for elm in lattice(10).values()), 2 + 4 * 3 + 2)
+        self.assertDictEqual(random_dag(20, seed=1), random_dag(20, seed=1))
+
+    def test_run_benchmark(self):
+        """Should measure every phase of every shape and run all tasks."""
+        results = run_benchmark(sizes=[10], executors=['local'], repeat=1)
+        self.assertEqual(len(results), len(SHAPES) * 5)
+        self.assertEqual(len({row['name'] for row in results}), len(results))
+        for row in results:
+            self.assertGreater(row['seconds'], 0)
+            self.assertAlmostEqual(row['per_task'], row['seconds'] / 10)
+        self.assertIn('lattice/10/run/local', {row['name'] for row in results})
+
+    def test_run_limits(self):
+        """Should skip runs of graphs over the executor limit."""
+        results = run_benchmark(shapes=['chain'], sizes=[10], executors=['local'], repeat=1,
+                                run_limits={'local': 5})
+        self.assertNotIn('run', {row['phase'] for row in results})
+
+    def test_compare(self):
+        """Should report results slower than baseline over tolerance and noise floor."""
+        baseline = [{'name': 'a', 'seconds': 1.0}, {'name': 'b', 'seconds': 1.0}, {'name': 'c', 'seconds': 1e-5}]
+        results = [{'name': 'a', 'seconds': 1.1}, {'name': 'b', 'seconds': 2.0}, {'name': 'c', 'seconds': 1e-4},
+                   {'name': 'd', 'seconds': 5.0}]
+        regressions = compare(results, baseline, tolerance=0.25)
+        self.assertListEqual([elm['name'] for elm in regressions], ['b'])
+        self.assertAlmostEqual(regressions[0]['ratio'], 2.0)
+
+    def test_main_baseline(self):
+        """Should write results and fail against a faster baseline."""
+        output = os.path.join(self.tmpdir.name, 'results.json')
+        # Large enough for runs to take longer than the noise floor
+        argv = ['--shapes', 'chain', '--sizes', '500', '--executors', 'local', '--repeat', '1']
+        with contextlib.redirect_stdout(io.StringIO()):
+            self.assertEqual(main(argv + ['--output', output]), 0)
+        results = load_results(output)
+        self.assertEqual(results['benchmark'], 'scheduler')
+        self.assertIn('python', results['environment'])
+
+        # Every measure took a second on the baseline, and almost nothing on the second baseline
+        baseline = os.path.join(self.tmpdir.name, 'baseline.json')
+        write_results(baseline, 'scheduler', [dict(row, seconds=1.0) for row in results['results']])
+        with contextlib.redirect_stdout(io.StringIO()):
+            self.assertEqual(main(argv + ['--baseline', baseline]), 0)
+
+        write_results(baseline, 'scheduler', [dict(row, seconds=1e-6) for row in results['results']])
+        with contextlib.redirect_stdout(io.StringIO()):
+            self.assertEqual(main(argv + ['--baseline', baseline]), 1)
+
+        report = io.StringIO()
+        regressions = check_baseline(results['results'], baseline, tolerance=0.25, fd=report)
+        self.assertIn('chain/500/run/local', {elm['name'] for elm in regressions})
+        self.assertIn('regressions over 25%', report.getvalue())
@@ -0,0 +1,69 @@
+import io
+import os
+import tempfile
+import unittest
+import contextlib
+
+from cd4ml.experiment import LocalExperimentProvider
+from cd4ml.benchmarks.storage import PAYLOADS, parse_size, providers, run_benchmark, main
+from cd4ml.benchmarks.harness import load_results
+
+
+class TestStorageBenchmark(unittest.TestCase):
+    def setUp(self) -> None:
+        self.tmpdir = tempfile.TemporaryDirectory()
+
+    def tearDown(self) -> None:
+        self.tmpdir.cleanup()
+
+    def test_parse_size(self):
+        """Should parse sizes with decimal units."""
+        self.assertEqual(parse_size('1KB'), 1000)
+        self.assertEqual(parse_size('5GB'), 5 * 10 ** 9)
+        self.assertEqual(parse_size('1.5mb'), 1500000)
+        self.assertEqual(parse_size('300'), 300)
+        self.assertEqual(parse_size(42), 42)
+
+    def test_providers(self):
+        """Should find concrete experiment providers."""
+        self.assertIs(providers()['LocalExperimentProvider'], LocalExperimentProvider)
+
+    def test_run_benchmark(self):
+        """Should save and load every payload with every configuration it applies to."""
+        results = run_benchmark(sizes=['10KB'], repeat=1, directory=self.tmpdir.name)
+        rows = {(row['payload'], row['config']): row for row in results}
+        self.assertSetEqual({payload for payload, _ in rows}, set(PAYLOADS))
+        # Only DataFrames can be partitioned
+        self.assertNotIn(('dict', 'partitioned'), rows)
+        self.assertIn(('mixed_frame', 'partitioned'), rows)
+
+        for key in [('dict', 'json'), ('numeric_frame', 'json'), ('numeric_frame', 'partitioned')]:
+            row = rows[key]
+            self.assertIsNone(row['error'])
+            self.assertGreater(row['disk_bytes'], 0)
+            self.assertGreater(row['save_mbps'], 0)
+            self.assertGreater(row['load_peak'], 0)
+            self.assertAlmostEqual(row['seconds'], row['save_seconds'] + row['load_seconds'])
+        self.assertTrue(all(row['error'] is None for row in results))
+        # Outputs are removed after measuring
+        self.assertListEqual(os.listdir(self.tmpdir.name), [])
+
+    def test_run_benchmark_error(self):
+        """Should record payloads a configuration can't save."""
+        results = run_benchmark(payloads=['numeric_frame'], sizes=['1KB'], configs={'missing': {'partition_by': 'y'}},
+                                repeat=1, memory=False, directory=self.tmpdir.name)
+        self.assertEqual(len(results), 1)
+        self.assertIn('KeyError', results[0]['error'])
+        self.assertIsNone(results[0]['seconds'])
+
+    def test_main(self):
+        """Should write results and the comparison report."""
+        output = os.path.join(self.tmpdir.name, 'storage.json')
+        report = os.path.join(self.tmpdir.name, 'storage.txt')
+        with contextlib.redirect_stdout(io.StringIO()):
+            code = main(['--providers', 'LocalExperimentProvider', '--payloads', 'dict', '--sizes', '1KB',
+                         '--repeat', '1', '--no-memory', '--output', output, '--report', report])
+        self.assertEqual(code, 0)
+        self.assertEqual(len(load_results(output)['results']), 1)
+        with open(report) as fd:
+            self.assertIn('LocalExperimentProvider', fd.read())
@@ -37,3 +37,8 @@ def experiment_repository(request, tmp_path_factory):
 @pytest.fixture(scope='class')
 def get_local_experiment_repository(request, experiment_repository):
     request.cls.local_experiment_repository = experiment_repository
+
+
+@pytest.fixture(scope='class')
+def get_data_dir(request, tmp_path_factory):
+    request.cls.data_dir = tmp_path_factory.mktemp("input")
@@ -0,0 +1,99 @@
+import os.path
+import shutil
+import unittest
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from cd4ml.ml.batch import BatchIterator
+from cd4ml.ml.loader import DataLoader
+from cd4ml.experiment import LocalExperimentProvider, Experiment
+
+
+@pytest.mark.usefixtures('get_local_experiment_repository', 'get_data_dir')
+class TestBatchIterator(unittest.TestCase):
+    def setUp(self) -> None:
+        self.data = pd.DataFrame(data={'x1': range(10), 'x2': range(10, 20), 'y': range(20, 30)})
+
+    def tearDown(self) -> None:
+        shutil.rmtree(self.local_experiment_repository, ignore_errors=True)
+
+    def test_batches(self):
+        """Should split data in batches of contiguous arrays."""
+        batches = list(BatchIterator(self.data, batch_size=4))
+        self.assertListEqual([4, 4, 2], [len(batch) for batch in batches])
+        for batch in batches:
+            self.assertIsInstance(batch, np.ndarray)
+            self.assertTrue(batch.flags['C_CONTIGUOUS'])
+        self.assertTrue(np.array_equal(np.concatenate(batches), self.data.to_numpy()))
+
+    def test_batches_length(self):
+        """Should return the number of batches."""
+        self.assertEqual(len(BatchIterator(self.data, batch_size=4)), 3)
+        self.assertEqual(len(BatchIterator(self.data, batch_size=4, drop_last=True)), 2)
+
+    def test_batches_columns(self):
+        """Should return a tuple of arrays when columns are grouped."""
+        for x, y in BatchIterator(self.data, batch_size=5, columns=(['x1', 'x2'], ['y']), dtype='float32'):
+            self.assertEqual(x.shape, (5, 2))
+            self.assertEqual(y.shape, (5, 1))
+            self.assertEqual(x.dtype, np.float32)
+
+    def test_batches_shuffle_window(self):
+        """Should shuffle rows only inside the window."""
+        batches = list(BatchIterator(np.arange(20), batch_size=5, shuffle=True, window=10, seed=42))
+        result = np.concatenate(batches)
+        self.assertSetEqual(set(result[:10]), set(range(10)))
+        self.assertSetEqual(set(result[10:]), set(range(10, 20)))
+        self.assertFalse(np.array_equal(result, np.arange(20)))
+
+    def test_batches_experiment_output(self):
+        """Should load source from a stored experiment output."""
+        experiment = Experiment(provider=LocalExperimentProvider(repository_path=self.local_experiment_repository))
+        experiment.save_output(name='data', data=self.data)
+        batches = list(BatchIterator('data', batch_size=3, experiment=experiment))
+        self.assertEqual(len(batches), 4)
+
+    def test_batches_early_stop(self):
+        """Should stop the producer when the consumer leaves the loop."""
+        it = BatchIterator(np.arange(1000), batch_size=1, prefetch=2)
+        for i, batch in enumerate(it):
+            if i == 2:
+                break
+        self.assertEqual(batch[0], 2)
+
+    def test_batches_error(self):
+        """Should raise errors found when loading batches."""
+        with self.assertRaises(KeyError):
+            list(BatchIterator(self.data, columns=['missing']))
+
+    def test_batches_loader_stream(self):
+        """Should stream loader chunks, returning the same batches as the whole source."""
+        data = pd.DataFrame(data={'x': range(1000), 'y': range(1000)})
+        path = os.path.join(self.data_dir, 'batches.csv')
+        data.to_csv(path, index=False)
+        for options in [{}, {'drop_last': True}, {'shuffle': True, 'window': 100, 'seed': 1}]:
+            loader = DataLoader(name='load', source=path, chunk_size=512)
+            streamed = list(BatchIterator(loader, batch_size=64, **options))
+            self.assertGreater(loader.stats['chunks'], 1)
+            expected = list(BatchIterator(data, batch_size=64, **options))
+            self.assertEqual(len(streamed), len(expected))
+            for batch, other in zip(streamed, expected):
+                self.assertTrue(np.array_equal(batch, other))
+
+    def test_batches_loader_once(self):
+        """Should parse a loader source once for length and iteration."""
+        calls = []
+
+        class CountingLoader(DataLoader):
+            def read_chunk(self, *args, **kwargs):
+                calls.append(1)
+                return super().read_chunk(*args, **kwargs)
+
+        path = os.path.join(self.data_dir, 'batches.csv')
+        self.data.to_csv(path, index=False)
+        it = BatchIterator(CountingLoader(name='load', source=path), batch_size=4)
+        self.assertEqual(len(it), 3)
+        self.assertEqual(len(list(it)), 3)
+        self.assertEqual(len(calls), 1)
@@ -0,0 +1,81 @@
+import os
+import shutil
+import unittest
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from cd4ml.ml.cache import SourceCache
+from cd4ml.ml.loader import DataLoader
+
+
+@pytest.mark.usefixtures('get_data_dir')
+class TestSourceCache(unittest.TestCase):
+    def setUp(self) -> None:
+        self.cache_dir = os.path.join(self.data_dir, 'cache')
+        self.csv_path = os.path.join(self.data_dir, 'cached.csv')
+        self.data = pd.DataFrame(data={'col1': range(100), 'col2': np.linspace(0, 1, 100),
+                                       'col3': [f'value{i}' for i in range(100)]})
+        self.data.to_csv(self.csv_path, index=False)
+        self.cache = SourceCache(cache_dir=self.cache_dir)
+
+    def tearDown(self) -> None:
+        shutil.rmtree(self.cache_dir, ignore_errors=True)
+
+    def test_cache_miss(self):
+        """Should return None when the source is not cached."""
+        self.assertIsNone(self.cache.get(self.csv_path, fmt='csv'))
+
+    def test_cache_hit(self):
+        """Should return cached data with numeric columns memory mapped."""
+        self.cache.put(self.csv_path, self.data, fmt='csv')
+        data = self.cache.get(self.csv_path, fmt='csv')
+        self.assertTrue(self.data.equals(data))
+        self.assertIsInstance(np.asarray(data['col1'].array).base, np.memmap)
+
+    def test_cache_options(self):
+        """Should use parse options as part of the key."""
+        self.cache.put(self.csv_path, self.data, fmt='csv', schema={'col1': 'int32'})
+        self.assertIsNone(self.cache.get(self.csv_path, fmt='csv'))
+
+    def test_cache_invalidation(self):
+        """Should not serve data for modified sources."""
+        self.cache.put(self.csv_path, self.data, fmt='csv')
+        stat = os.stat(self.csv_path)
+        with open(self.csv_path, 'a') as fd:
+            fd.write('100,1.0,value100\n')
+        os.utime(self.csv_path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10 ** 9))
+        self.assertIsNone(self.cache.get(self.csv_path, fmt='csv'))
+
+    def test_cache_sample_hash(self):
+        """Should detect content changes with same size and mtime using sampled hash."""
+        cache = SourceCache(cache_dir=self.cache_dir, sample_hash=True)
+        cache.put(self.csv_path, self.data, fmt='csv')
+        stat = os.stat(self.csv_path)
+        with open(self.csv_path, 'r+b') as fd:
+            fd.seek(-3, os.SEEK_END)
+            fd.write(b'X')
+        os.utime(self.csv_path, ns=(stat.st_atime_ns, stat.st_mtime_ns))
+        self.assertIsNone(cache.get(self.csv_path, fmt='csv'))
+
+    def test_cache_eviction(self):
+        """Should evict least recently used entries over the size limit."""
+        other_path = os.path.join(self.data_dir, 'other.csv')
+        self.data.to_csv(other_path, index=False)
+        entry = self.cache.put(self.csv_path, self.data, fmt='csv')
+        size = self.cache.entries()[0][1]
+        self.cache.max_bytes = size
+        os.utime(os.path.join(entry, SourceCache.metadata_file), (0, 0))
+        self.cache.put(other_path, self.data, fmt='csv')
+        self.assertIsNone(self.cache.get(self.csv_path, fmt='csv'))
+        self.assertIsNotNone(self.cache.get(other_path, fmt='csv'))
+
+    def test_loader_cache(self):
+        """Should serve data loader sources from cache."""
+        loader = DataLoader(name='load', source=self.csv_path, cache=self.cache)
+        data = loader.run()
+        self.assertEqual(loader.stats['cached'], 0)
+        cached = loader.run()
+        self.assertEqual(loader.stats['cached'], 1)
+        self.assertTrue(data.equals(cached))
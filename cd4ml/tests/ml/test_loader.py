@@ -1,25 +1,125 @@
+import os.path
+import shutil
 import unittest
 
+import pytest
+import pandas as pd
 
+from cd4ml.ml.loader import DataLoader
+from cd4ml.task import Task
+from cd4ml.workflow import Workflow
+from cd4ml.experiment import LocalExperimentProvider, Experiment
+
+
+@pytest.mark.usefixtures('get_local_experiment_repository', 'get_data_dir')
 class TestLoader(unittest.TestCase):
     def setUp(self) -> None:
-        pass
+        self.data = pd.DataFrame(data={'col1': range(1000), 'col2': [f'value{i}' for i in range(1000)]})
+        self.csv_path = os.path.join(self.data_dir, 'data.csv')
+        self.json_path = os.path.join(self.data_dir, 'data.jsonl')
+        self.data.to_csv(self.csv_path, index=False)
+        self.data.to_json(self.json_path, orient='records', lines=True)
 
     def tearDown(self) -> None:
-        pass
+        shutil.rmtree(self.local_experiment_repository, ignore_errors=True)
 
     def test_loader_init(self):
         """Should init a data storage for storing data."""
-        pass
+        loader = DataLoader(name='load', source=self.csv_path)
+        self.assertIsInstance(loader, Task)
+        self.assertEqual(loader.output, 'load')
+        self.assertIn('source', loader.params)
 
     def test_load_data_params(self):
         """Should read input params for loading data."""
-        pass
+        loader = DataLoader(name='load')
+        data = loader.run(source=self.csv_path, schema={'col1': 'int32'})
+        self.assertEqual(data['col1'].dtype, 'int32')
+        self.assertEqual(len(data), 1000)
 
     def test_load_data(self):
         """Should execute data loading task."""
-        pass
+        loader = DataLoader(name='load', source=self.csv_path, chunk_size=1024, max_workers=4)
+        data = loader.run()
+        self.assertGreater(loader.stats['chunks'], 1)
+        self.assertTrue(self.data.equals(data))
+        self.assertEqual(loader.stats['rows'], 1000)
+        self.assertGreater(loader.stats['rows_per_second'], 0)
+
+    def test_load_json_lines(self):
+        """Should load JSON lines files in chunks."""
+        loader = DataLoader(name='load', source=self.json_path, chunk_size=1024, schema={'col1': 'int64'})
+        data = loader.run()
+        self.assertGreater(loader.stats['chunks'], 1)
+        self.assertTrue(self.data.equals(data))
+
+    def test_load_without_header(self):
+        """Should not repeat the first row of files without header on every chunk."""
+        self.data.to_csv(self.csv_path, index=False, header=False)
+        loader = DataLoader(name='load', source=self.csv_path, chunk_size=1024, header=None, names=['col1', 'col2'])
+        data = loader.run()
+        self.assertGreater(loader.stats['chunks'], 1)
+        self.assertTrue(self.data.equals(data))
+
+    def test_load_file_options(self):
+        """Should skip lines and limit rows once per file instead of once per chunk."""
+        with open(self.csv_path) as fd:
+            content = fd.read()
+        with open(self.csv_path, 'w+') as fd:
+            fd.write('# generated\n' + content)
+        data = DataLoader(name='load', source=self.csv_path, chunk_size=1024, skiprows=1).run()
+        self.assertTrue(self.data.equals(data))
+        data = DataLoader(name='load', source=[self.csv_path, self.json_path], chunk_size=256, skiprows=1,
+                          nrows=10).run()
+        self.assertEqual(len(data), 20)
+        self.assertListEqual(list(data['col1']), list(range(10)) + list(range(1, 11)))
+
+    def test_load_header_only(self):
+        """Should return the header columns with schema dtypes for files without data rows."""
+        self.data.iloc[:0].to_csv(self.csv_path, index=False)
+        data = DataLoader(name='load', source=self.csv_path, schema={'col1': 'int32'}).run()
+        self.assertEqual(len(data), 0)
+        self.assertListEqual(['col1', 'col2'], list(data.columns))
+        self.assertEqual(data['col1'].dtype, 'int32')
+
+        self.data.to_csv(self.csv_path, index=False)
+        data = DataLoader(name='load', source=self.csv_path, nrows=0).run()
+        self.assertListEqual(['col1', 'col2'], list(data.columns))
+
+    def test_load_invalid_options(self):
+        """Should reject read options which can't be applied to chunks."""
+        with self.assertRaises(ValueError):
+            DataLoader(name='load', source=self.csv_path, skipfooter=1)
+        with self.assertRaises(ValueError):
+            DataLoader(name='load', source=self.csv_path, skiprows=[1, 2])
+        with self.assertRaises(ValueError):
+            DataLoader(name='load', source=self.csv_path, header=[0, 1])
+
+    def test_load_multiple_sources(self):
+        """Should concatenate multiple sources in order."""
+        loader = DataLoader(name='load', source=[self.csv_path, self.json_path], chunk_size=4096)
+        data = loader.run()
+        self.assertEqual(len(data), 2000)
+        self.assertListEqual(list(data['col1'][:3]), [0, 1, 2])
+        self.assertListEqual(list(data['col1'][1000:1003]), [0, 1, 2])
+
+    def test_load_invalid_format(self):
+        """Should fail when the format can't be inferred from file extension."""
+        loader = DataLoader(name='load', source='data.txt')
+        with self.assertRaises(ValueError):
+            loader.run()
 
     def test_load_data_output(self):
         """Should store data loading output on experiment's repository."""
-        pass
\ No newline at end of file
+        experiment = Experiment(provider=LocalExperimentProvider(repository_path=self.local_experiment_repository))
+        loader = DataLoader(name='load', source=self.csv_path, experiment=experiment, output='raw')
+        loader.run()
+        output = experiment.load_output(name='raw', pandas=True)
+        self.assertTrue(self.data.equals(output))
+
+    def test_load_data_workflow(self):
+        """Should run as a workflow task."""
+        w = Workflow()
+        w.add_task(DataLoader(name='load', source=self.csv_path, chunk_size=1024))
+        output = w.run(run_config={'load': {'params': {}, 'output': 'raw'}})
+        self.assertTrue(self.data.equals(output['raw']))
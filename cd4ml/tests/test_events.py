@@ -0,0 +1,88 @@
+import os
+import tempfile
+import unittest
+import urllib.request
+
+from cd4ml.events import EventBus, Event
+from cd4ml.prometheus import PrometheusExporter
+
+
+class TestEventBus(unittest.TestCase):
+    def setUp(self) -> None:
+        self.bus = EventBus()
+
+    def tearDown(self) -> None:
+        pass
+
+    def test_publish(self):
+        """Should deliver events in order to subscribers on a dispatcher thread."""
+        received = []
+        self.bus.subscribe(received.append)
+        self.bus.publish('task_submitted', task='load')
+        self.bus.publish('task_finished', task='load', wall=1.0)
+        self.bus.flush()
+        self.assertListEqual(['task_submitted', 'task_finished'], [event.name for event in received])
+        self.assertDictEqual({'task': 'load', 'wall': 1.0}, received[1].data)
+
+    def test_subscribe_events(self):
+        """Should deliver only selected events and keep going when a subscriber fails."""
+        received = []
+
+        def fail(event):
+            raise RuntimeError(event.name)
+
+        self.bus.subscribe(fail)
+        self.bus.subscribe(received.append, events=['run_finished'])
+        self.bus.publish('task_submitted', task='load')
+        self.bus.publish('run_finished', tasks=1, wall=1.0, failed=False)
+        self.bus.flush()
+        self.assertListEqual(['run_finished'], [event.name for event in received])
+
+        self.bus.unsubscribe(received.append)
+        self.bus.publish('run_finished', tasks=1, wall=1.0, failed=False)
+        self.bus.flush()
+        self.assertEqual(1, len(received))
+
+    def test_subscribe_invalid(self):
+        """Should not subscribe to unknown events."""
+        with self.assertRaises(ValueError):
+            self.bus.subscribe(print, events=['other'])
+
+
+class TestPrometheusExporter(unittest.TestCase):
+    def setUp(self) -> None:
+        self.tmpdir = tempfile.TemporaryDirectory()
+
+    def tearDown(self) -> None:
+        self.tmpdir.cleanup()
+
+    def test_exporter(self):
+        """Should aggregate events in Prometheus text format."""
+        exporter = PrometheusExporter()
+        exporter.handle(Event('task_submitted', {'task': 'load'}))
+        exporter.handle(Event('task_finished', {'task': 'load', 'wall': 2.0, 'cpu': 1.5}))
+        exporter.handle(Event('output_saved', {'task': 'load', 'size': 10, 'seconds': 0.5}))
+        text = exporter.render()
+        self.assertIn('# TYPE cd4ml_tasks_finished_total counter\n', text)
+        self.assertIn('cd4ml_tasks_finished_total 1\n', text)
+        self.assertIn('cd4ml_task_seconds_total 2.0\n', text)
+        self.assertIn('cd4ml_tasks_running 0\n', text)
+        self.assertIn('cd4ml_output_bytes_total 10\n', text)
+
+    def test_exporter_textfile(self):
+        """Should write metrics to a text file when a run finishes."""
+        filepath = os.path.join(self.tmpdir.name, 'cd4ml.prom')
+        exporter = PrometheusExporter(textfile=filepath, min_interval=3600)
+        exporter.handle(Event('run_finished', {'tasks': 2, 'wall': 3.0, 'failed': False}))
+        with open(filepath) as fd:
+            self.assertIn('cd4ml_runs_finished_total 1\n', fd.read())
+
+    def test_exporter_serve(self):
+        """Should serve metrics over HTTP."""
+        exporter = PrometheusExporter()
+        server = exporter.serve(port=0)
+        try:
+            with urllib.request.urlopen(f'http://127.0.0.1:{server.server_address[1]}/metrics') as response:
+                self.assertIn('cd4ml_runs_finished_total 0', response.read().decode())
+        finally:
+            exporter.close()
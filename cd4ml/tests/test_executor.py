@@ -2,8 +2,9 @@ import os.path
 
 import unittest
 import pytest
+import numpy as np
 
-from cd4ml.executor import LocalExecutor
+from cd4ml.executor import LocalExecutor, ProcessExecutor, OutputStore
 from cd4ml.task import Task
 from cd4ml.experiment import LocalExperimentProvider, Experiment
 
@@ -12,6 +13,15 @@ def add(a, b):
     return a + b
 
 
+def make_array(size):
+    return np.arange(size, dtype='float64')
+
+
+def is_shared(data):
+    # Shared outputs are received as read only views
+    return not data.flags.writeable, float(data.sum())
+
+
 @pytest.mark.usefixtures('get_local_experiment_repository')
 class TestLocalExecutor(unittest.TestCase):
     """Test local executor."""
@@ -85,3 +95,133 @@ class TestLocalExecutor(unittest.TestCase):
         self.e.run()
         output = self.e.experiment.load_output(name='add')
         self.assertEqual(output, 3)
+
+
+@pytest.mark.usefixtures('get_data_dir')
+class TestOutputStore(unittest.TestCase):
+    """Test outputs under memory budget."""
+    def setUp(self) -> None:
+        self.scratch_dir = os.path.join(self.data_dir, 'spill')
+        self.store = OutputStore(memory_budget=2500, scratch_dir=self.scratch_dir)
+
+    def tearDown(self) -> None:
+        self.store.close()
+
+    def test_store_under_budget(self):
+        """Should keep outputs in memory while under budget."""
+        self.store['a'] = bytes(1000)
+        self.store['b'] = bytes(1000)
+        self.assertListEqual([], list(self.store.spilled))
+        self.assertEqual(len(self.store), 2)
+
+    def test_store_spill(self):
+        """Should spill least recently needed outputs over budget and load them on access."""
+        self.store['a'] = bytes(1000)
+        self.store['b'] = bytes(1000)
+        self.store['a']
+        self.store['c'] = bytes(1000)
+        self.assertListEqual(['b'], list(self.store.spilled))
+        self.assertTrue(os.path.exists(self.store.spilled['b']))
+        self.assertLessEqual(self.store.total, 2500)
+
+        self.assertEqual(self.store['b'], bytes(1000))
+        self.assertNotIn('b', self.store.spilled)
+        self.assertSetEqual({'a', 'b', 'c'}, set(self.store))
+
+    def test_store_delete(self):
+        """Should remove spilled files when outputs are deleted."""
+        self.store['a'] = bytes(3000)
+        filepath = self.store.spilled['a']
+        del self.store['a']
+        self.assertFalse(os.path.exists(filepath))
+        with self.assertRaises(KeyError):
+            self.store['a']
+
+    def test_store_oversized(self):
+        """Should read outputs over the budget from disk without spilling them again."""
+        self.store['a'] = bytes(3000)
+        self.store['b'] = bytes(1000)
+        filepath = self.store.spilled['a']
+        for _ in range(2):
+            self.assertEqual(self.store['a'], bytes(3000))
+            self.assertEqual(filepath, self.store.spilled['a'])
+        self.assertListEqual(['b'], list(self.store.memory))
+        self.assertDictEqual({'a': bytes(3000), 'b': bytes(1000)}, self.store.to_dict())
+
+    def test_store_scratch_dir(self):
+        """Should remove the scratch directory created by the store when its executor is closed."""
+        e = LocalExecutor(memory_budget=100)
+        e.submit(Task(name='a', task=lambda: bytes(1000)), params={}, output='a')
+        e.run()
+        scratch_dir = e.output.scratch_dir
+        self.assertTrue(os.path.exists(e.output.spilled['a']))
+        e.close()
+        self.assertFalse(os.path.exists(scratch_dir))
+        # A scratch directory supplied is kept
+        self.store['a'] = bytes(3000)
+        self.store.close()
+        self.assertTrue(os.path.isdir(self.scratch_dir))
+        self.assertListEqual([], os.listdir(self.scratch_dir))
+
+    def test_executor_memory_budget(self):
+        """Should spill executor outputs over the memory budget."""
+        def make(size):
+            return bytes(size)
+
+        e = LocalExecutor(memory_budget=1500, scratch_dir=self.scratch_dir)
+        e.submit(Task(name='a', task=make), params={'size': 1000}, output='a')
+        e.submit(Task(name='b', task=make), params={'size': 1000}, output='b')
+        e.run()
+        self.assertIn('a', e.output.spilled)
+        self.assertEqual(len(e.output['a']), 1000)
+
+
+class TestProcessExecutor(unittest.TestCase):
+    """Test process pool executor."""
+    def setUp(self) -> None:
+        self.e = ProcessExecutor(max_workers=2, min_shared_bytes=1024)
+
+    def tearDown(self) -> None:
+        self.e.close()
+
+    def run_all(self):
+        while self.e.pending or self.e.running:
+            self.e.run()
+
+    def test_process_completed(self):
+        """Should run tasks on worker processes."""
+        self.e.submit(Task(name='add', task=add), params={'a': 1, 'b': 2}, output='add')
+        self.run_all()
+        self.assertEqual(self.e.output['add'], 3)
+        self.assertListEqual(['add'], self.e.done)
+
+    def test_process_shared_output(self):
+        """Should pass large arrays between tasks through shared memory."""
+        self.e.submit(Task(name='make', task=make_array), params={'size': 10000}, output='data')
+        self.run_all()
+        data = self.e.output['data']
+        self.assertFalse(data.flags.writeable)
+        self.assertEqual(len(self.e.transport.segments['data']), 1)
+
+        for i in range(4):
+            self.e.submit(Task(name=f'check{i}', task=is_shared), params={'data': data}, output=f'check{i}')
+        self.run_all()
+        for i in range(4):
+            self.assertEqual(self.e.output[f'check{i}'], (True, float(data.sum())))
+
+    def test_process_release(self):
+        """Should unlink shared segments when output is released."""
+        self.e.submit(Task(name='make', task=make_array), params={'size': 10000}, output='data')
+        self.run_all()
+        self.e.release('data')
+        self.assertNotIn('data', self.e.transport.segments)
+        self.assertNotIn('data', self.e.output)
+
+    def test_process_no_shared_memory(self):
+        """Should pickle outputs when shared memory is disabled."""
+        e = ProcessExecutor(max_workers=1, shared_memory=False)
+        e.submit(Task(name='make', task=make_array), params={'size': 10000}, output='data')
+        while e.pending or e.running:
+            e.run()
+        self.assertTrue(e.output['data'].flags.writeable)
+        e.close()
@@ -139,3 +139,101 @@ class ExperimentTest(unittest.TestCase):
         # This new experiment should load metadata from previously saved repository
         e2 = Experiment(provider=self.provider)
         self.assertDictEqual(e2.metadata, self.e.metadata)
+
+    def test_experiment_save_partitions_by_key(self):
+        """Should save a DataFrame output as one partition per key and record the manifest on metadata."""
+        data = pd.DataFrame(data={'key': ['a', 'b', 'a', 'c'], 'col2': [1, 2, 3, 4]})
+        output = self.e.save_output(name='test', data=data, partition_by='key')
+        self.assertTrue(os.path.isdir(output))
+        manifest = self.e.metadata['partitions']['test']
+        self.assertListEqual([('a', 2), ('b', 1), ('c', 1)],
+                             [(part['key'], part['rows']) for part in manifest['partitions']])
+        for part in manifest['partitions']:
+            self.assertTrue(os.path.exists(os.path.join(output, part['file'])))
+
+    def test_experiment_save_partitions_by_rows(self):
+        """Should split a DataFrame output in partitions with a maximum number of rows."""
+        data = pd.DataFrame(data={'col1': range(10), 'col2': range(10, 20)})
+        self.e.save_output(name='test', data=data, partition_rows=3)
+        manifest = self.e.metadata['partitions']['test']
+        self.assertListEqual([3, 3, 3, 1], [part['rows'] for part in manifest['partitions']])
+
+    def test_experiment_load_partitions(self):
+        """Should reassemble all partitions of an output."""
+        data = pd.DataFrame(data={'col1': range(10), 'col2': range(10, 20)})
+        self.e.save_output(name='test', data=data, partition_rows=3, max_workers=2)
+        output = self.e.load_output(name='test', pandas=True, max_workers=2)
+        self.assertTrue(data.equals(output))
+
+    def test_experiment_load_selected_partitions(self):
+        """Should load only the selected partitions."""
+        data = pd.DataFrame(data={'key': ['a', 'b', 'a', 'c'], 'col2': [1, 2, 3, 4]})
+        self.e.save_output(name='test', data=data, partition_by='key')
+        output = self.e.load_output(name='test', partitions=['a', 'c'])
+        self.assertListEqual(['a', 'a', 'c'], list(output['key']))
+        self.assertListEqual([1, 3, 4], list(output['col2']))
+
+    def test_experiment_load_partitions_metadata(self):
+        """Should load partitioned outputs from previously saved metadata."""
+        data = pd.DataFrame(data={'key': ['a', 'b', 'a'], 'col2': [1, 2, 3]})
+        self.e.save_output(name='test', data=data, partition_by='key')
+        e2 = Experiment(provider=self.provider)
+        output = e2.load_output(name='test', partitions=['b'])
+        self.assertListEqual([2], list(output['col2']))
+
+    def test_experiment_save_partitions_null_keys(self):
+        """Should keep rows with null keys in their own partition."""
+        data = pd.DataFrame(data={'key': ['a', None, 'a', None], 'col2': [1, 2, 3, 4]})
+        self.e.save_output(name='test', data=data, partition_by='key')
+        manifest = self.e.metadata['partitions']['test']
+        self.assertEqual(4, sum(part['rows'] for part in manifest['partitions']))
+        self.assertListEqual([2, 4], list(self.e.load_output(name='test', partitions=[None])['col2']))
+        self.assertEqual(4, len(self.e.load_output(name='test')))
+
+    def test_experiment_save_partitions_date_keys(self):
+        """Should store date keys as ISO strings and keep metadata loadable."""
+        data = pd.DataFrame(data={'day': pd.to_datetime(['2022-01-01', '2022-01-02', '2022-01-01']),
+                                  'col2': [1, 2, 3]})
+        self.e.save_output(name='test', data=data, partition_by='day')
+        e2 = Experiment(provider=self.provider)
+        keys = [part['key'] for part in e2.metadata['partitions']['test']['partitions']]
+        self.assertListEqual(['2022-01-01T00:00:00', '2022-01-02T00:00:00'], keys)
+        output = e2.load_output(name='test', partitions=[pd.Timestamp('2022-01-02')])
+        self.assertListEqual([2], list(output['col2']))
+
+    def test_experiment_save_partitions_columns(self):
+        """Should accept a single key column as list and reject many key columns."""
+        data = pd.DataFrame(data={'a': ['x', 'y'], 'b': ['z', 'z'], 'col2': [1, 2]})
+        self.e.save_output(name='test', data=data, partition_by=['a'])
+        self.assertListEqual([2], list(self.e.load_output(name='test', partitions=['y'])['col2']))
+        with self.assertRaises(ValueError):
+            self.e.save_output(name='test', data=data, partition_by=['a', 'b'])
+        # The previous save is untouched
+        self.assertEqual(2, len(Experiment(provider=self.provider).load_output(name='test')))
+
+    def test_experiment_failed_save_keeps_metadata(self):
+        """Should not truncate a file when data can't be serialized."""
+        self.e.save_output(name='test', data={'a': 1})
+        with self.assertRaises(TypeError):
+            self.provider.save(name='.metadata', data={'bad': object()}, path='root')
+        self.assertDictEqual(Experiment(provider=self.provider).metadata, self.e.metadata)
+
+    def test_experiment_concurrent_save(self):
+        """Should save the same file from many threads without mixing their writes."""
+        from concurrent.futures import ThreadPoolExecutor
+
+        payloads = [{'value': i, 'data': list(range(1000))} for i in range(16)]
+        with ThreadPoolExecutor(max_workers=8) as pool:
+            paths = list(pool.map(lambda data: self.provider.save(name='shared', data=data), payloads * 4))
+        self.assertIn(self.provider.load(name='shared'), payloads)
+        self.assertListEqual([], [elm for elm in os.listdir(os.path.dirname(paths[0])) if elm.endswith('.tmp')])
+
+    def test_experiment_runs(self):
+        """Should record run stats in metadata and load them as a DataFrame."""
+        self.e.save_run({'load': {'wall': 1.0, 'cpu': 0.5}, 'train': {'wall': 3.0, 'cpu': 2.5}}, started=10.0)
+        self.e.save_run({'load': {'wall': 2.0, 'cpu': 1.0}}, started=20.0)
+        runs = Experiment(provider=self.provider).load_runs()
+        self.assertListEqual([0, 0, 1], list(runs['run']))
+        self.assertListEqual(['load', 'train', 'load'], list(runs['task']))
+        self.assertListEqual([1.0, 3.0, 2.0], list(runs['wall']))
+        self.assertListEqual([10.0, 10.0, 20.0], list(runs['run_started']))
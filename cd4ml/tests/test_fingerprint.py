@@ -0,0 +1,116 @@
+import os
+import shutil
+import unittest
+
+import pytest
+
+from cd4ml.fingerprint import fingerprint, changed, full_hash, sample_hash
+from cd4ml.experiment import LocalExperimentProvider, Experiment
+
+
+@pytest.mark.usefixtures('get_data_dir', 'get_local_experiment_repository')
+class TestFingerprint(unittest.TestCase):
+    def setUp(self) -> None:
+        self.path = os.path.join(self.data_dir, 'fingerprint.bin')
+        with open(self.path, 'wb') as fd:
+            fd.write(os.urandom(2 ** 16))
+
+    def tearDown(self) -> None:
+        shutil.rmtree(self.local_experiment_repository, ignore_errors=True)
+
+    def touch_same_size(self, offset=100):
+        """Change one byte keeping file size and mtime"""
+        stat = os.stat(self.path)
+        with open(self.path, 'r+b') as fd:
+            fd.seek(offset)
+            value = fd.read(1)
+            fd.seek(offset)
+            fd.write(bytes([(value[0] + 1) % 256]))
+        os.utime(self.path, ns=(stat.st_atime_ns, stat.st_mtime_ns))
+
+    def test_fingerprint_levels(self):
+        """Should include hashes for every level up to the requested one."""
+        self.assertNotIn('sample', fingerprint(self.path))
+        self.assertIn('sample', fingerprint(self.path, level='sample'))
+        result = fingerprint(self.path, level='full')
+        self.assertIn('sample', result)
+        self.assertIn('full', result)
+
+    def test_fingerprint_invalid_level(self):
+        """Should fail for unknown levels."""
+        with self.assertRaises(ValueError):
+            fingerprint(self.path, level='md5')
+
+    def test_full_hash_chunks(self):
+        """Should not depend on the number of threads."""
+        self.assertEqual(full_hash([self.path], chunk_size=1024, max_workers=1),
+                         full_hash([self.path], chunk_size=1024, max_workers=8))
+
+    def test_full_hash_change(self):
+        """Should detect a single byte change."""
+        previous = full_hash([self.path], chunk_size=1024)
+        self.touch_same_size(offset=5000)
+        self.assertNotEqual(previous, full_hash([self.path], chunk_size=1024))
+
+    def test_sample_hash_change(self):
+        """Should detect a change inside a sampled block."""
+        previous = sample_hash(self.path, blocks=4, block_size=256)
+        self.touch_same_size(offset=0)
+        self.assertNotEqual(previous, sample_hash(self.path, blocks=4, block_size=256))
+
+    def test_sample_hash_single_block(self):
+        """Should sample a single block from the start of the file and reject no blocks."""
+        previous = sample_hash(self.path, blocks=1, block_size=256)
+        self.touch_same_size(offset=0)
+        self.assertNotEqual(previous, sample_hash(self.path, blocks=1, block_size=256))
+        with self.assertRaises(ValueError):
+            sample_hash(self.path, blocks=0)
+
+    def test_fingerprint_directory(self):
+        """Should fingerprint every file in a directory."""
+        directory = os.path.join(self.data_dir, 'dataset')
+        os.makedirs(directory, exist_ok=True)
+        for i in range(3):
+            with open(os.path.join(directory, f'part-{i}'), 'wb') as fd:
+                fd.write(os.urandom(100))
+        result = fingerprint(directory, level='full')
+        self.assertListEqual(['part-0', 'part-1', 'part-2'], [elm[0] for elm in result['stat']])
+
+    def test_changed_touched(self):
+        """Should not consider touched files with the same content as changed."""
+        previous = fingerprint(self.path, level='full')
+        os.utime(self.path, ns=(0, 0))
+        current = fingerprint(self.path, level='full')
+        self.assertTrue(changed(previous, current, level='stat'))
+        self.assertFalse(changed(previous, current, level='full'))
+
+    def test_changed_sample_edit(self):
+        """Should not let the sample hash hide an edit outside the sampled blocks."""
+        options = {'level': 'sample', 'blocks': 4, 'block_size': 256}
+        previous = fingerprint(self.path, **options)
+        self.touch_same_size(offset=5000)
+        os.utime(self.path, ns=(0, 0))
+        current = fingerprint(self.path, **options)
+        self.assertEqual(previous['sample'], current['sample'])
+        self.assertTrue(changed(previous, current, level='sample'))
+
+        experiment = Experiment(provider=LocalExperimentProvider(repository_path=self.local_experiment_repository))
+        experiment.input_changed('raw', self.path, **options)
+        self.touch_same_size(offset=5000)
+        os.utime(self.path, ns=(10 ** 9, 10 ** 9))
+        self.assertTrue(experiment.input_changed('raw', self.path, **options))
+
+    def test_experiment_input_changed(self):
+        """Should persist fingerprints on experiment metadata and detect changes."""
+        experiment = Experiment(provider=LocalExperimentProvider(repository_path=self.local_experiment_repository))
+        self.assertTrue(experiment.input_changed('raw', self.path, level='full'))
+        self.assertFalse(experiment.input_changed('raw', self.path, level='full'))
+        self.assertIn('raw', experiment.metadata['inputs'])
+
+        # Metadata is loaded on a new experiment
+        experiment = Experiment(provider=LocalExperimentProvider(repository_path=self.local_experiment_repository))
+        self.assertFalse(experiment.input_changed('raw', self.path, level='full'))
+
+        self.touch_same_size()
+        os.utime(self.path, ns=(0, 0))
+        self.assertTrue(experiment.input_changed('raw', self.path, level='full'))
@@ -0,0 +1,42 @@
+import sys
+import json
+import subprocess
+import unittest
+
+# Seconds allowed to import a module on a fresh interpreter. Importing pandas alone takes longer than this
+IMPORT_BUDGET = 0.5
+
+PROBE = """
+import sys, json, time
+start = time.perf_counter()
+import {module}
+print(json.dumps({{'seconds': time.perf_counter() - start, 'modules': sorted(sys.modules)}}))
+"""
+
+
+def import_module(module):
+    output = subprocess.run([sys.executable, '-c', PROBE.format(module=module)], check=True, capture_output=True,
+                            text=True).stdout
+    return json.loads(output)
+
+
+class TestImport(unittest.TestCase):
+    def setUp(self) -> None:
+        pass
+
+    def tearDown(self) -> None:
+        pass
+
+    def test_import_lazy(self):
+        """Should not import pandas or numpy when importing the workflow and executor modules."""
+        for module in ['cd4ml.workflow', 'cd4ml.executor', 'cd4ml.experiment', 'cd4ml.prometheus']:
+            with self.subTest(module=module):
+                modules = import_module(module)['modules']
+                self.assertNotIn('pandas', modules)
+                self.assertNotIn('numpy', modules)
+
+    def test_import_budget(self):
+        """Should import the workflow module within the import time budget."""
+        # Best of a few runs, so a busy machine doesn't fail the test
+        seconds = min(import_module('cd4ml.workflow')['seconds'] for _ in range(3))
+        self.assertLess(seconds, IMPORT_BUDGET)
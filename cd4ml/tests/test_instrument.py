@@ -0,0 +1,45 @@
+import os
+import unittest
+
+from cd4ml.instrument import measure, serialized_size
+
+
+def allocate(size):
+    return bytearray(size)
+
+
+class TestInstrument(unittest.TestCase):
+    def setUp(self) -> None:
+        pass
+
+    def tearDown(self) -> None:
+        pass
+
+    def test_measure(self):
+        """Should return function result with time, memory and output stats."""
+        result, stats = measure(lambda: list(range(1000)))
+        self.assertListEqual(list(range(1000)), result)
+        self.assertGreaterEqual(stats['wall'], 0)
+        self.assertGreaterEqual(stats['cpu'], 0)
+        self.assertGreaterEqual(stats['rss_peak_delta'], 0)
+        self.assertIsNone(stats['memory_peak'])
+        self.assertGreater(stats['output_size'], 0)
+        self.assertIsNone(stats['serialized_size'])
+        self.assertIsNone(stats['serialize'])
+        self.assertEqual(stats['pid'], os.getpid())
+
+    def test_measure_serialize(self):
+        """Should measure the pickled size of the result only when requested."""
+        result, stats = measure(lambda: list(range(1000)), serialize=True)
+        self.assertEqual(stats['serialized_size'], serialized_size(result))
+        self.assertGreaterEqual(stats['serialize'], 0)
+
+    def test_measure_trace_memory(self):
+        """Should record the peak of memory allocated by the function."""
+        result, stats = measure(lambda: len(allocate(2 ** 20)), trace_memory=True)
+        self.assertEqual(result, 2 ** 20)
+        self.assertGreaterEqual(stats['memory_peak'], 2 ** 20)
+
+    def test_serialized_size_not_picklable(self):
+        """Should return None for objects that can't be pickled."""
+        self.assertIsNone(serialized_size(lambda: None))
@@ -0,0 +1,60 @@
+import os
+import json
+import logging
+import logging.handlers
+import tempfile
+import unittest
+
+from cd4ml import log
+from cd4ml.log import logger, configure, shutdown
+
+
+class TestLog(unittest.TestCase):
+    def setUp(self) -> None:
+        self.tmpdir = tempfile.TemporaryDirectory()
+
+    def tearDown(self) -> None:
+        shutdown()
+        logger.setLevel(logging.NOTSET)
+        self.tmpdir.cleanup()
+
+    def test_logger_silent(self):
+        """Should not add output handlers on import."""
+        self.assertEqual('cd4ml', logger.name)
+        self.assertTrue(all(isinstance(handler, logging.NullHandler) for handler in logger.handlers))
+
+    def test_configure_json(self):
+        """Should write structured records through a queue listener."""
+        filepath = os.path.join(self.tmpdir.name, 'log.jsonl')
+        configure(level='DEBUG', stream=False, json_path=filepath)
+        self.assertTrue(any(isinstance(handler, logging.handlers.QueueHandler) for handler in logger.handlers))
+        logger.debug("Task %s finished", 'load', extra={'task': 'load'})
+        shutdown()
+
+        with open(filepath) as fd:
+            records = [json.loads(line) for line in fd]
+        self.assertEqual(1, len(records))
+        self.assertEqual('Task load finished', records[0]['message'])
+        self.assertEqual('DEBUG', records[0]['level'])
+        self.assertEqual('load', records[0]['task'])
+        self.assertTrue(all(isinstance(handler, logging.NullHandler) for handler in logger.handlers))
+
+    def test_configure_level(self):
+        """Should filter records under the configured level."""
+        filepath = os.path.join(self.tmpdir.name, 'log.jsonl')
+        configure(level=logging.WARNING, stream=False, json_path=filepath, use_queue=False)
+        logger.info("Ignored")
+        logger.warning("Kept")
+        shutdown()
+        with open(filepath) as fd:
+            self.assertListEqual(['Kept'], [json.loads(line)['message'] for line in fd])
+
+    def test_configure_experiment(self):
+        """Should write the structured log on the experiment directory."""
+        from cd4ml.experiment import LocalExperimentProvider, Experiment
+
+        experiment = Experiment(provider=LocalExperimentProvider(repository_path=self.tmpdir.name))
+        configure(stream=False, experiment=experiment)
+        logger.info("Hello")
+        shutdown()
+        self.assertTrue(os.path.exists(os.path.join(self.tmpdir.name, log.LOG_FILE)))
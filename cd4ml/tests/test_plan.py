@@ -0,0 +1,84 @@
+import graphlib
+import unittest
+
+from cd4ml.plan import ExecutionPlan, PlanRun
+
+
+class TestExecutionPlan(unittest.TestCase):
+    def setUp(self) -> None:
+        self.graph = graphlib.TopologicalSorter()
+        self.graph.add('add2', 'add')
+        self.graph.add('add3', 'add')
+        self.graph.add('add4', 'add2', 'add3')
+
+    def tearDown(self) -> None:
+        pass
+
+    def test_plan_compile(self):
+        """Should compile nodes to integer ids with counters and adjacency."""
+        plan = ExecutionPlan.from_graph(self.graph)
+        self.assertEqual(len(plan), 4)
+        self.assertEqual(plan.npredecessors[plan.index['add4']], 2)
+        self.assertTupleEqual(plan.successors[plan.index['add']], (plan.index['add2'], plan.index['add3']))
+
+    def test_plan_immutable(self):
+        """Should not allow changing plan structure."""
+        plan = ExecutionPlan.from_graph(self.graph)
+        with self.assertRaises(TypeError):
+            plan.npredecessors[0] = 1
+        with self.assertRaises(AttributeError):
+            plan.other = 1
+
+    def test_plan_run(self):
+        """Should process nodes in topological order."""
+        state = ExecutionPlan.from_graph(self.graph).start()
+        self.assertIsInstance(state, PlanRun)
+        order = []
+        while state.is_active():
+            ready = state.get_ready()
+            order.append(ready)
+            state.done(*ready)
+        self.assertListEqual([('add', ), ('add2', 'add3'), ('add4', )], order)
+
+    def test_plan_independent_runs(self):
+        """Should keep state for every run apart."""
+        plan = ExecutionPlan.from_graph(self.graph)
+        state = plan.start()
+        state.done(*state.get_ready())
+        state2 = plan.start()
+        self.assertTupleEqual(state2.get_ready(), ('add', ))
+        self.assertTupleEqual(state.get_ready(), ('add2', 'add3'))
+
+    def test_plan_done_errors(self):
+        """Should fail to mark nodes not ready or already done."""
+        state = ExecutionPlan.from_graph(self.graph).start()
+        with self.assertRaises(ValueError):
+            state.done('add2')
+        state.done(*state.get_ready())
+        with self.assertRaises(ValueError):
+            state.done('add')
+        with self.assertRaises(ValueError):
+            state.done('missing')
+
+    def test_plan_run_add(self):
+        """Should add nodes to a single run without changing the plan."""
+        plan = ExecutionPlan.from_graph(self.graph)
+        state = plan.start()
+        self.assertTupleEqual(('add',), state.get_ready())
+        state.add('extra', 'add')
+        state.add('after', 'extra', 'add4')
+        state.done('add')
+        self.assertTupleEqual(('add2', 'add3', 'extra'), state.get_ready())
+        state.done('add2', 'add3', 'extra')
+        self.assertTupleEqual(('add4',), state.get_ready())
+        state.done('add4')
+        self.assertTupleEqual(('after',), state.get_ready())
+        state.done('after')
+        self.assertFalse(state.is_active())
+        self.assertEqual(len(plan), 4)
+        self.assertEqual(len(plan.start().names), 4)
+
+        with self.assertRaises(ValueError):
+            state.add('add')
+        with self.assertRaises(ValueError):
+            state.add('other', 'missing')
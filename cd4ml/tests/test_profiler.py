@@ -0,0 +1,50 @@
+import os
+import time
+import pstats
+import tempfile
+import unittest
+
+from cd4ml.profiler import CProfiler, SamplingProfiler, get_profiler
+
+
+def busy(seconds):
+    end = time.perf_counter() + seconds
+    total = 0
+    while time.perf_counter() < end:
+        total += 1
+    return total
+
+
+class TestProfiler(unittest.TestCase):
+    def setUp(self) -> None:
+        self.tmpdir = tempfile.TemporaryDirectory()
+
+    def tearDown(self) -> None:
+        self.tmpdir.cleanup()
+
+    def test_cprofiler(self):
+        """Should produce a .prof file readable by pstats."""
+        with CProfiler() as profiler:
+            busy(0.01)
+        filepath = os.path.join(self.tmpdir.name, 'busy.prof')
+        with open(filepath, 'wb') as fd:
+            fd.write(profiler.artifacts()['prof'])
+        stats = pstats.Stats(filepath)
+        self.assertIn('busy', [func for _, _, func in stats.stats])
+
+    def test_sampling_profiler(self):
+        """Should collapse sampled stacks below the profiled block."""
+        with SamplingProfiler(interval=0.001) as profiler:
+            busy(0.1)
+        folded = profiler.artifacts()['folded'].decode()
+        stack, count = folded.splitlines()[0].rsplit(' ', 1)
+        self.assertTrue(stack.startswith('busy '))
+        self.assertGreater(int(count), 0)
+        self.assertNotIn('test_sampling_profiler', folded)
+
+    def test_get_profiler(self):
+        """Should get profilers by name."""
+        self.assertIsInstance(get_profiler(True), CProfiler)
+        self.assertIsInstance(get_profiler('sample'), SamplingProfiler)
+        with self.assertRaises(ValueError):
+            get_profiler('other')
@@ -0,0 +1,35 @@
+import os
+import time
+import unittest
+
+from cd4ml.sampler import ResourceSampler, read_process, process_tree
+
+
+@unittest.skipUnless(os.path.isdir('/proc'), "Resource sampling requires /proc")
+class TestResourceSampler(unittest.TestCase):
+    def setUp(self) -> None:
+        pass
+
+    def tearDown(self) -> None:
+        pass
+
+    def test_read_process(self):
+        """Should read CPU time and RSS of this process."""
+        cpu, rss, read_bytes, write_bytes = read_process(os.getpid())
+        self.assertGreater(cpu, 0)
+        self.assertGreater(rss, 0)
+        self.assertIn(os.getpid(), process_tree(os.getpid()))
+
+    def test_sampler(self):
+        """Should sample resource usage tagged with running tasks."""
+        running = {'busy'}
+        with ResourceSampler(interval=0.01, tags=lambda: running) as sampler:
+            end = time.perf_counter() + 0.1
+            while time.perf_counter() < end:
+                pass
+            running.clear()
+        series = sampler.series()
+        self.assertGreater(len(series['time']), 2)
+        self.assertGreater(max(series['cpu']), 0)
+        self.assertIn(['busy'], series['tasks'])
+        self.assertListEqual([], series['tasks'][-1])
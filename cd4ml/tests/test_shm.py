@@ -0,0 +1,79 @@
+import gc
+import unittest
+from unittest import mock
+from multiprocessing import shared_memory, resource_tracker
+
+import numpy as np
+import pandas as pd
+
+from cd4ml.shm import SharedMemoryTransport, share, attach, detach
+
+
+class TestSharedMemory(unittest.TestCase):
+    def setUp(self) -> None:
+        self.transport = SharedMemoryTransport(min_bytes=0)
+
+    def tearDown(self) -> None:
+        self.transport.close()
+
+    def test_share_array(self):
+        """Should share an array and attach to it as a read only view."""
+        data = np.arange(1000, dtype='float64').reshape(100, 10)
+        block = self.transport.share('data', data)
+        view, shm = attach(block)
+        self.assertTrue(np.array_equal(view, data))
+        self.assertFalse(view.flags.writeable)
+        del view
+        detach(shm)
+
+    def test_share_frame(self):
+        """Should share numeric DataFrame columns and keep other columns inline."""
+        data = pd.DataFrame(data={'col1': range(100), 'col2': np.linspace(0, 1, 100),
+                                  'col3': [f'value{i}' for i in range(100)]}, index=range(100, 200))
+        block = self.transport.share('data', data)
+        self.assertListEqual(['col1', 'col2'], [spec[0] for spec in block.arrays])
+        frame, shm = attach(block)
+        self.assertTrue(data.equals(frame))
+        self.assertListEqual(list(data.columns), list(frame.columns))
+
+    def test_share_small(self):
+        """Should not share objects under the minimum size or not supported."""
+        transport = SharedMemoryTransport(min_bytes=1024)
+        self.assertIsNone(transport.share('data', np.zeros(10)))
+        self.assertIsNone(transport.share('data', {'a': 1}))
+        self.assertIsNone(share(np.array(['a', 'b'], dtype=object))[0])
+
+    def test_release(self):
+        """Should unlink segments when output is released, keeping existing views valid."""
+        block = self.transport.share('data', np.arange(100))
+        view = self.transport.adopt('data', block)
+        self.transport.release('data')
+        with self.assertRaises(FileNotFoundError):
+            shared_memory.SharedMemory(name=block.name)
+        self.assertEqual(view.sum(), 4950)
+
+    def test_untracked(self):
+        """Should share and attach segments without registering them on the resource tracker."""
+        with mock.patch.object(resource_tracker, 'register') as register, \
+                mock.patch.object(resource_tracker, 'unregister') as unregister:
+            block, shm = share(np.arange(100), track=False)
+            view, attached = attach(block, track=False)
+            self.assertEqual(view.sum(), 4950)
+            del view
+            detach(attached)
+            detach(shm)
+        register.assert_not_called()
+        unregister.assert_not_called()
+        self.transport.adopt('data', block)
+
+    def test_detach_views(self):
+        """Should keep attached segments open until the last view is garbage collected."""
+        block = self.transport.share('data', pd.DataFrame(data={'col1': range(100), 'col2': np.ones(100)}))
+        frame, shm = attach(block)
+        detach(shm)
+        gc.collect()
+        self.assertEqual(frame['col1'].sum(), 4950)
+        self.assertIsNotNone(shm.buf)
+        del frame
+        gc.collect()
+        self.assertIsNone(shm.buf)
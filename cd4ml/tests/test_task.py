@@ -1,7 +1,7 @@
 import unittest
 from collections import OrderedDict
 
-from cd4ml.task import Task
+from cd4ml.task import Task, FusedTask
 
 
 def add(a, b):
@@ -79,3 +79,12 @@ class TestTask(unittest.TestCase):
         result = t.run()
         self.assertEqual(result, 'Hello')
 
+    def test_fused_task(self):
+        """Should run a chain of tasks passing outputs and recording each task time."""
+        def increment(c):
+            return c + 1
+
+        t = FusedTask([(Task(name='sum', task=add), 'c'), (Task(name='increment', task=increment), 'increment')])
+        self.assertEqual(t.name, 'increment')
+        self.assertEqual(t.run(a=1, b=2), 4)
+        self.assertListEqual(['sum', 'increment'], list(t.timings))
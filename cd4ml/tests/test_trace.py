@@ -0,0 +1,50 @@
+import os
+import json
+import tempfile
+import unittest
+
+from cd4ml.trace import Tracer, span
+
+
+class TestTracer(unittest.TestCase):
+    def setUp(self) -> None:
+        self.tmpdir = tempfile.TemporaryDirectory()
+
+    def tearDown(self) -> None:
+        self.tmpdir.cleanup()
+
+    def test_tracer_span(self):
+        """Should add complete events for spans and instant events."""
+        tracer = Tracer()
+        with tracer.span('load', cat='io', args={'rows': 10}):
+            pass
+        tracer.instant('done')
+        self.assertListEqual(['X', 'i'], [event['ph'] for event in tracer.events])
+        self.assertEqual('io', tracer.events[0]['cat'])
+        self.assertDictEqual({'rows': 10}, tracer.events[0]['args'])
+        self.assertGreaterEqual(tracer.events[0]['dur'], 0)
+
+    def test_tracer_add_task(self):
+        """Should add execute and serialize spans on the task worker track."""
+        tracer = Tracer()
+        tracer.add_task('train', {'started': 1.0, 'wall': 2.0, 'serialize': 0.5, 'pid': 1, 'tid': 2})
+        self.assertListEqual(['execute train', 'serialize train'], [event['name'] for event in tracer.events])
+        self.assertEqual(3e6, tracer.events[1]['ts'])
+        self.assertEqual((1, 2), (tracer.events[0]['pid'], tracer.events[0]['tid']))
+        names = [event['args']['name'] for event in tracer.metadata()]
+        self.assertIn('worker 1', names)
+
+    def test_tracer_write(self):
+        """Should write a Chrome trace event JSON file."""
+        tracer = Tracer()
+        with span(tracer, 'get_ready'):
+            pass
+        filepath = tracer.write(os.path.join(self.tmpdir.name, 'run.json'))
+        with open(filepath) as fd:
+            trace = json.load(fd)
+        self.assertIn('scheduler', [event['args']['name'] for event in trace['traceEvents'] if event['ph'] == 'M'])
+
+    def test_span_without_tracer(self):
+        """Should do nothing without a tracer."""
+        with span(None, 'get_ready'):
+            pass
@@ -4,7 +4,7 @@ import unittest
 
 from graphlib import TopologicalSorter
 
-from cd4ml.utils import graph_to_dot
+from cd4ml.utils import graph_to_dot, iter_edges, write_dot, sizeof, is_frame
 
 
 @pytest.mark.usefixtures('get_dotfile')
@@ -32,3 +32,49 @@ class TestUtils(unittest.TestCase):
 
         dotfile = io.open(self.dotfile).read()
         self.assertListEqual(dot.split(), dotfile.split())
+
+    def test_parse_diamond_lattice(self):
+        """Should walk every edge of a diamond lattice only once."""
+        graph = TopologicalSorter()
+        depth = 40
+        graph.add('n0_0')
+        for level in range(1, depth):
+            for i in range(2):
+                graph.add(f'n{level}_{i}', *[f'n{level - 1}_{j}' for j in range(2 if level > 1 else 1)])
+
+        edges = list(iter_edges(graph))
+        self.assertEqual(len(edges), len(set(edges)))
+        self.assertEqual(len(edges), 1 + 2 + 4 * (depth - 2))
+
+    def test_parse_graph_quote(self):
+        """Should quote node names that are not valid DOT identifiers."""
+        graph = TopologicalSorter()
+        graph.add('load-data')
+        graph.add('node', 'load-data')
+        dot = graph_to_dot(graph)
+        self.assertIn('"load-data" -> "node";', dot)
+
+    def test_write_dot(self):
+        """Should stream dot lines to a file object."""
+        graph = TopologicalSorter()
+        graph.add('add2', 'add')
+        fd = write_dot(graph, io.StringIO())
+        self.assertListEqual(fd.getvalue().split(), graph_to_dot(graph).split())
+        self.assertIn('add -> add2;', fd.getvalue())
+
+    def test_sizeof(self):
+        """Should measure the approximate size of objects."""
+        import numpy as np
+        import pandas as pd
+
+        self.assertEqual(sizeof(np.zeros(100)), 800)
+        data = pd.DataFrame(data={'col1': range(100)})
+        self.assertEqual(sizeof(data), data.memory_usage(deep=True).sum())
+        self.assertGreater(sizeof('abc'), 0)
+
+    def test_is_frame(self):
+        """Should detect DataFrames."""
+        import pandas as pd
+
+        self.assertTrue(is_frame(pd.DataFrame(data={'col1': range(3)})))
+        self.assertFalse(is_frame({'col1': [0, 1, 2]}))
@@ -1,10 +1,12 @@
 import io
+import time
 import graphlib
+import functools
 import pytest
 from unittest import TestCase
 
-from cd4ml.workflow import Workflow
-from cd4ml.task import Task
+from cd4ml.workflow import Workflow, SubWorkflowTask, DependencyError
+from cd4ml.task import Task, FusedTask, Expansion
 from cd4ml.experiment import LocalExperimentProvider, Experiment
 
 
@@ -12,6 +14,30 @@ def add(a, b):
     return a + b
 
 
+def increment(c):
+    return c + 1
+
+
+def double(increment):
+    return increment * 2
+
+
+def discover(n):
+    tasks = [(Task(name=f'part-{i}', task=functools.partial(part, i=i)), 'discover') for i in range(n)]
+    tasks.append((Task(name='merge', task=merge), [f'part-{i}' for i in range(n)]))
+    run_config = {f'part-{i}': {'params': None, 'output': f'part{i}'} for i in range(n)}
+    run_config['merge'] = {'params': None, 'output': 'merge'}
+    return Expansion(tasks, run_config=run_config, output=list(range(n)))
+
+
+def part(items, i):
+    return items[i] * 10
+
+
+def merge(**parts):
+    return sum(parts.values())
+
+
 @pytest.mark.usefixtures('get_local_experiment_repository')
 class TestWorkflow(TestCase):
     def setUp(self) -> None:
@@ -304,3 +330,585 @@ class TestWorkflow(TestCase):
         }, executor='local')
         increment_var = self.experiment.load_output(name='increment')
         self.assertEqual(increment_var, 4)
+
+    def test_workflow_compile(self):
+        """Should compile the workflow once until a new task is added."""
+        w = Workflow()
+        w.add_task(Task(name='add', task=add))
+        plan = w.compile()
+        self.assertIs(plan, w.compile())
+        w.add_task(Task(name='add2', task=add), dependency='add')
+        self.assertIsNot(plan, w.compile())
+        self.assertEqual(len(w.compile()), 2)
+
+    def test_workflow_compile_cycle(self):
+        """Should raise an error when compiling a graph with cycles."""
+        w = Workflow()
+        w.add('a', 'b')
+        w.add('b', 'a')
+        with self.assertRaises(graphlib.CycleError):
+            w.compile()
+
+    def test_workflow_run_twice(self):
+        """Should run the same workflow multiple times."""
+        def increment(c):
+            return c + 1
+
+        w = Workflow()
+        w.add_task(Task(name='add', task=add))
+        w.add_task(Task(name='increment', task=increment), dependency='add')
+        run_config = {
+            'add': {'params': {'a': 1, 'b': 2}, 'output': 'c'},
+            'increment': {'params': None, 'output': 'increment'}
+        }
+        self.assertEqual(w.run(run_config=run_config)['increment'], 4)
+        self.assertEqual(w.run(run_config=run_config)['increment'], 4)
+
+    def test_workflow_concurrent_runs(self):
+        """Should run the same workflow concurrently in different threads."""
+        from concurrent.futures import ThreadPoolExecutor
+
+        def increment(c):
+            return c + 1
+
+        w = Workflow()
+        w.add_task(Task(name='add', task=add))
+        w.add_task(Task(name='increment', task=increment), dependency='add')
+
+        def run(i):
+            return w.run(run_config={
+                'add': {'params': {'a': i, 'b': 0}, 'output': 'c'},
+                'increment': {'params': None, 'output': 'increment'}
+            })['increment']
+
+        with ThreadPoolExecutor(max_workers=4) as pool:
+            self.assertListEqual([i + 1 for i in range(20)], list(pool.map(run, range(20))))
+
+    def test_workflow_run_once_per_task(self):
+        """Should execute every task only once per run."""
+        calls = []
+
+        def count(**kwargs):
+            calls.append(1)
+            return len(calls)
+
+        w = Workflow()
+        w.add_task(Task(name='a', task=count))
+        w.add_task(Task(name='b', task=count), dependency='a')
+        w.add_task(Task(name='c', task=count), dependency='b')
+        w.run(run_config={name: {'params': {}, 'output': name} for name in ['a', 'b', 'c']})
+        self.assertEqual(len(calls), 3)
+
+    def test_add_tasks(self):
+        """Should add many tasks at once with dependencies defined in any order."""
+        w = Workflow()
+        w.add_tasks([
+            Task(name='add', task=add),
+            (Task(name='add3', task=add), ['add2']),
+            (Task(name='add2', task=add), 'add')
+        ])
+        self.assertListEqual(['add', 'add2', 'add3'], w.tasks_order)
+        self.assertEqual(w.tasks['add3']['dependency'], ['add2'])
+
+    def test_add_tasks_missing(self):
+        """Should report every missing dependency at once and add nothing."""
+        w = Workflow()
+        w.add_task(Task(name='add', task=add))
+        with self.assertRaises(DependencyError) as e:
+            w.add_tasks([
+                (Task(name='add2', task=add), ['add', 'missing']),
+                (Task(name='add3', task=add), 'missing2')
+            ])
+        self.assertDictEqual({'add2': ['missing'], 'add3': ['missing2']}, e.exception.missing)
+        self.assertListEqual(['add'], list(w.tasks))
+
+    def test_add_tasks_cycle(self):
+        """Should report every node in cycles before adding tasks."""
+        w = Workflow()
+        with self.assertRaises(graphlib.CycleError) as e:
+            w.add_tasks([
+                Task(name='root', task=add),
+                (Task(name='a', task=add), ['root', 'b']),
+                (Task(name='b', task=add), 'a'),
+                (Task(name='c', task=add), 'd'),
+                (Task(name='d', task=add), 'c'),
+                (Task(name='leaf', task=add), 'a')
+            ])
+        self.assertListEqual(['a', 'b', 'c', 'd'], e.exception.args[1])
+        self.assertDictEqual({}, w.tasks)
+
+    def test_from_edges(self):
+        """Should build a workflow from tasks and edges."""
+        tasks = [Task(name=f't{i}', task=add) for i in range(1000)]
+        edges = [(f't{i // 2}', f't{i}') for i in range(1, 1000)]
+        w = Workflow.from_edges(tasks, edges)
+        order = w.tasks_order
+        self.assertEqual(len(order), 1000)
+        position = {name: i for i, name in enumerate(order)}
+        for dependency, name in edges:
+            self.assertLess(position[dependency], position[name])
+
+    def test_from_edges_unknown(self):
+        """Should report edges between tasks not supplied."""
+        tasks = [Task(name='a', task=add), Task(name='b', task=add)]
+        with self.assertRaises(DependencyError) as e:
+            Workflow.from_edges(tasks, [('a', 'b'), ('a', 'c'), ('missing', 'b')])
+        self.assertDictEqual({'b': ['missing']}, e.exception.missing)
+        self.assertListEqual(['c'], e.exception.unknown)
+
+    def test_add_tasks_repeated(self):
+        """Should reject tasks repeated or already in the workflow."""
+        w = Workflow()
+        w.add_tasks([Task(name='a', task=add), (Task(name='b', task=add), 'a')])
+        with self.assertRaises(ValueError):
+            w.add_tasks([(Task(name='a', task=add), 'b')])
+        with self.assertRaises(ValueError):
+            w.add_tasks([Task(name='c', task=add), Task(name='c', task=add)])
+        self.assertListEqual(['a', 'b'], list(w.tasks))
+        self.assertListEqual(['a', 'b'], w.tasks_order)
+
+    def test_run_targets(self):
+        """Should run only targets and their dependencies."""
+        calls = []
+
+        def count(**kwargs):
+            calls.append(1)
+            return len(calls)
+
+        w = Workflow()
+        w.add_tasks([
+            Task(name='a', task=count),
+            (Task(name='b', task=count), 'a'),
+            (Task(name='c', task=count), 'a'),
+            (Task(name='d', task=count), 'b'),
+            Task(name='e', task=count)
+        ])
+        run_config = {name: {'params': {}, 'output': name} for name in ['a', 'b', 'd']}
+        output = w.run(run_config=run_config, targets=['d'])
+        self.assertListEqual(['d'], sorted(output))
+        self.assertEqual(len(calls), 3)
+
+    def test_run_targets_invalid(self):
+        """Should fail for targets not found on workflow."""
+        w = Workflow()
+        w.add_task(Task(name='add', task=add))
+        with self.assertRaises(ValueError):
+            w.run(run_config={}, targets='missing')
+
+    def test_run_targets_reuse(self):
+        """Should reuse dependencies output stored on experiment."""
+        calls = []
+
+        def load():
+            calls.append('load')
+            return 1
+
+        def increment(c):
+            calls.append('increment')
+            return c + 1
+
+        w = Workflow(experiment=self.experiment)
+        w.add_task(Task(name='load', task=load))
+        w.add_task(Task(name='increment', task=increment), dependency='load')
+        run_config = {
+            'load': {'params': {}, 'output': 'c'},
+            'increment': {'params': None, 'output': 'increment'}
+        }
+        w.run(run_config=run_config)
+        output = w.run(run_config=run_config, targets='increment', reuse=True)
+        self.assertEqual(output['increment'], 2)
+        self.assertListEqual(['load', 'increment', 'increment'], calls)
+
+    def test_run_release_intermediate(self):
+        """Should release intermediate outputs once all consumers finish."""
+        executors = []
+        seen = []
+
+        def load():
+            return list(range(10))
+
+        def double(data):
+            return [elm * 2 for elm in data]
+
+        def total(data2):
+            seen.append(sorted(executors[0].output))
+            return sum(data2)
+
+        def count(data2):
+            return len(data2)
+
+        w = Workflow()
+        w.add_task(Task(name='load', task=load))
+        w.add_task(Task(name='double', task=double), dependency='load')
+        w.add_task(Task(name='total', task=total), dependency='double')
+        w.add_task(Task(name='count', task=count), dependency='double')
+
+        get_executor = w.get_executor
+        w.get_executor = lambda executor: executors.append(get_executor(executor)) or executors[-1]
+        output = w.run(run_config={
+            'load': {'params': {}, 'output': 'data'},
+            'double': {'params': None, 'output': 'data2'},
+            'total': {'params': None, 'output': 'total'},
+            'count': {'params': None, 'output': 'count'}
+        })
+        self.assertListEqual([['data2']], seen)
+        self.assertListEqual(['data', 'data2'], executors[0].released)
+        self.assertDictEqual({'total': 90, 'count': 10}, output)
+
+    def test_run_release_final(self):
+        """Should keep outputs marked as final."""
+        def increment(c):
+            return c + 1
+
+        w = Workflow()
+        w.add_task(Task(name='add', task=add))
+        w.add_task(Task(name='increment', task=increment), dependency='add')
+        run_config = {
+            'add': {'params': {'a': 1, 'b': 2}, 'output': 'c'},
+            'increment': {'params': None, 'output': 'increment'}
+        }
+        self.assertDictEqual({'increment': 4}, w.run(run_config=run_config))
+        self.assertDictEqual({'c': 3, 'increment': 4}, w.run(run_config=run_config, final=['c']))
+
+    def test_run_release_persisted(self):
+        """Should keep outputs persisted on experiment."""
+        def increment(c):
+            return c + 1
+
+        w = Workflow(experiment=self.experiment)
+        w.add_task(Task(name='add', task=add))
+        w.add_task(Task(name='increment', task=increment), dependency='add')
+        output = w.run(run_config={
+            'add': {'params': {'a': 1, 'b': 2}, 'output': 'c'},
+            'increment': {'params': None, 'output': 'increment'}
+        })
+        self.assertDictEqual({'c': 3, 'increment': 4}, output)
+
+    def test_run_executor_memory_budget(self):
+        """Should run with an executor instance spilling outputs over budget."""
+        from cd4ml.executor import LocalExecutor
+
+        def load():
+            return list(range(1000))
+
+        def total(data):
+            return sum(data)
+
+        w = Workflow()
+        w.add_task(Task(name='load', task=load))
+        w.add_task(Task(name='total', task=total), dependency='load')
+        w.add_task(Task(name='load2', task=load))
+        exe = LocalExecutor(memory_budget=10000)
+        output = w.run(run_config={
+            'load': {'params': {}, 'output': 'data'},
+            'load2': {'params': {}, 'output': 'data2'},
+            'total': {'params': None, 'output': 'total'}
+        }, executor=exe)
+        self.assertEqual(output['total'], 499500)
+        self.assertListEqual(list(range(1000)), output['data2'])
+
+    def test_run_process_executor(self):
+        """Should run workflow tasks on the process executor."""
+        w = Workflow()
+        w.add_task(Task(name='add', task=add))
+        w.add_task(Task(name='add2', task=add))
+        w.add_task(Task(name='increment', task=increment), dependency='add')
+        output = w.run(run_config={
+            'add': {'params': {'a': 1, 'b': 2}, 'output': 'c'},
+            'add2': {'params': {'a': 2, 'b': 3}, 'output': 'add2'},
+            'increment': {'params': None, 'output': 'increment'}
+        }, executor='process')
+        self.assertDictEqual({'add2': 5, 'increment': 4}, output)
+
+    def test_fuse(self):
+        """Should fuse linear chains keeping consumers and branches."""
+        w = Workflow()
+        w.add_task(Task(name='add', task=add))
+        w.add_task(Task(name='increment', task=increment), dependency='add')
+        w.add_task(Task(name='double', task=double), dependency='increment')
+        w.add_task(Task(name='add2', task=add))
+        w.add_task(Task(name='total', task=add), dependency=['double', 'add2'])
+        run_config = {
+            'add': {'params': {'a': 1, 'b': 2}, 'output': 'c'},
+            'increment': {'params': None, 'output': 'increment'},
+            'double': {'params': None, 'output': 'a'},
+            'add2': {'params': {'a': 2, 'b': 3}, 'output': 'b'},
+            'total': {'params': None, 'output': 'total'}
+        }
+        fused, fused_config = w.fuse(run_config)
+        self.assertSetEqual({'double', 'add2', 'total'}, set(fused.tasks))
+        self.assertIsInstance(fused.tasks['double']['task'], FusedTask)
+        self.assertEqual('add -> increment -> double', fused.tasks['double']['task'].description)
+        self.assertDictEqual({'params': {'a': 1, 'b': 2}, 'output': 'a'}, fused_config['double'])
+        self.assertListEqual(['double', 'add2'], fused.tasks['total']['dependency'])
+
+        fused, _ = w.fuse(run_config, keep=['increment'])
+        self.assertSetEqual({'increment', 'double', 'add2', 'total'}, set(fused.tasks))
+
+    def test_run_fuse(self):
+        """Should persist only the chain output and report every task time."""
+        import tempfile
+
+        tmpdir = tempfile.TemporaryDirectory()
+        self.addCleanup(tmpdir.cleanup)
+        experiment = Experiment(provider=LocalExperimentProvider(repository_path=tmpdir.name))
+        w = Workflow(experiment=experiment)
+        w.add_task(Task(name='add', task=add))
+        w.add_task(Task(name='increment', task=increment), dependency='add')
+        w.add_task(Task(name='double', task=double), dependency='increment')
+        output = w.run(run_config={
+            'add': {'params': {'a': 1, 'b': 2}, 'output': 'c'},
+            'increment': {'params': None, 'output': 'increment'},
+            'double': {'params': None, 'output': 'double'}
+        }, fuse=True)
+        self.assertDictEqual({'double': 8}, output)
+        self.assertListEqual(['double'], list(experiment.metadata['output']))
+        self.assertSetEqual({'add', 'increment', 'double'}, set(w.timings))
+
+    def test_run_fuse_no_params(self):
+        """Should run fused tasks taking no params like unfused ones."""
+        def constant():
+            return 5
+
+        w = Workflow()
+        w.add_task(Task(name='add', task=add))
+        w.add_task(Task(name='constant', task=constant), dependency='add')
+        w.add_task(Task(name='increment', task=increment), dependency='constant')
+        run_config = {
+            'add': {'params': {'a': 1, 'b': 2}, 'output': 'sum'},
+            'constant': {'params': None, 'output': 'c'},
+            'increment': {'params': None, 'output': 'k'}
+        }
+        self.assertDictEqual({'k': 6}, w.run(run_config))
+        self.assertDictEqual(w.run(run_config), w.run(run_config, fuse=True))
+
+    def test_run_fuse_process_executor(self):
+        """Should report every fused task time from worker processes."""
+        w = Workflow()
+        w.add_task(Task(name='add', task=add))
+        w.add_task(Task(name='increment', task=increment), dependency='add')
+        w.add_task(Task(name='double', task=double), dependency='increment')
+        output = w.run(run_config={
+            'add': {'params': {'a': 1, 'b': 2}, 'output': 'c'},
+            'increment': {'params': None, 'output': 'increment'},
+            'double': {'params': None, 'output': 'double'}
+        }, executor='process', fuse=True, targets='increment')
+        self.assertDictEqual({'increment': 4}, output)
+        self.assertSetEqual({'add', 'increment'}, set(w.timings))
+
+    def test_run_expansion(self):
+        """Should run tasks added by a task at runtime."""
+        w = Workflow()
+        w.add_task(Task(name='discover', task=discover))
+        run_config = {'discover': {'params': {'n': 4}, 'output': 'items'}}
+        output = w.run(run_config=run_config)
+        self.assertDictEqual({'merge': 60}, output)
+        self.assertListEqual(['discover'], list(w.tasks))
+        self.assertListEqual(['discover'], list(run_config))
+
+        # Every run expands again
+        self.assertDictEqual({'items': [0, 1, 2, 3], 'merge': 60}, w.run(run_config=run_config, final=['items']))
+
+    def test_run_expansion_process_executor(self):
+        """Should run tasks added at runtime on worker processes."""
+        w = Workflow()
+        w.add_task(Task(name='discover', task=discover))
+        output = w.run(run_config={'discover': {'params': {'n': 3}, 'output': 'items'}}, executor='process',
+                       final=['items'])
+        self.assertDictEqual({'items': [0, 1, 2], 'merge': 30}, output)
+
+    def test_run_expansion_existing(self):
+        """Should not add tasks already in the run."""
+        def emit():
+            return Expansion([Task(name='emit', task=emit)], run_config={'emit': {'params': {}, 'output': None}})
+
+        w = Workflow()
+        w.add_task(Task(name='emit', task=emit))
+        with self.assertRaises(ValueError):
+            w.run(run_config={'emit': {'params': {}, 'output': None}})
+
+    def get_sub_workflow(self, output=None):
+        inner = Workflow()
+        inner.add_task(Task(name='increment', task=increment))
+        inner.add_task(Task(name='double', task=double), dependency='increment')
+        inner.add_task(Task(name='double2', task=double), dependency='increment')
+        return SubWorkflowTask(name='sub', workflow=inner, run_config={
+            'increment': {'params': {'c': 0}, 'output': 'increment'},
+            'double': {'params': None, 'output': 'double'},
+            'double2': {'params': None, 'output': 'double2'}
+        }, output=output)
+
+    def test_sub_workflow_inline(self):
+        """Should inline sub workflow tasks with prefixed names and a join task."""
+        w = Workflow()
+        w.add_task(Task(name='add', task=add))
+        w.add_task(self.get_sub_workflow(), dependency='add')
+        inlined, inlined_config = w.inline({
+            'add': {'params': {'a': 1, 'b': 2}, 'output': 'c'},
+            'sub': {'params': None, 'output': 'sub'}
+        })
+        self.assertListEqual(['add', 'sub.increment', 'sub.double', 'sub.double2', 'sub'], list(inlined.tasks))
+        self.assertEqual('add', inlined.tasks['sub.increment']['dependency'])
+        self.assertListEqual(['sub.double', 'sub.double2'], inlined.tasks['sub']['dependency'])
+        self.assertDictEqual({'params': None, 'output': 'sub.double'}, inlined_config['sub.double'])
+
+    def test_run_sub_workflow(self):
+        """Should run sub workflow tasks on the outer executor."""
+        from cd4ml.executor import LocalExecutor
+
+        exe = LocalExecutor()
+        w = Workflow()
+        w.add_task(Task(name='add', task=add))
+        w.add_task(self.get_sub_workflow(), dependency='add')
+        w.add_task(Task(name='total', task=lambda sub: sum(sub.values())), dependency='sub')
+        output = w.run(run_config={
+            'add': {'params': {'a': 1, 'b': 2}, 'output': 'c'},
+            'sub': {'params': None, 'output': 'sub'},
+            'total': {'params': None, 'output': 'total'}
+        }, executor=exe, final=['sub'])
+        self.assertDictEqual({'sub': {'double': 8, 'double2': 8}, 'total': 16}, output)
+        self.assertIn('sub.increment', exe.tasks)
+        self.assertIn('sub.double', w.timings)
+
+    def test_run_sub_workflow_process_executor(self):
+        """Should run nested sub workflows on worker processes."""
+        outer = Workflow()
+        outer.add_task(self.get_sub_workflow(output='double'))
+        w = Workflow()
+        w.add_task(SubWorkflowTask(name='outer', workflow=outer, run_config={'sub': {'params': None, 'output': 'd'}},
+                                   output='d'))
+        output = w.run(run_config={'outer': {'params': None, 'output': 'outer'}}, executor='process')
+        self.assertDictEqual({'outer': 2}, output)
+
+    def test_run_task_sub_workflow(self):
+        """Should run a sub workflow task on its own."""
+        w = Workflow()
+        w.add_task(self.get_sub_workflow(output='double'))
+        self.assertEqual(8, w.run_task('sub', c=3))
+
+    def test_run_stats(self):
+        """Should record every task stats on experiment metadata."""
+        import tempfile
+
+        tmpdir = tempfile.TemporaryDirectory()
+        self.addCleanup(tmpdir.cleanup)
+        experiment = Experiment(provider=LocalExperimentProvider(repository_path=tmpdir.name))
+        w = Workflow(experiment=experiment)
+        w.add_task(Task(name='add', task=add))
+        w.add_task(Task(name='increment', task=increment), dependency='add')
+        run_config = {
+            'add': {'params': {'a': 1, 'b': 2}, 'output': 'c'},
+            'increment': {'params': None, 'output': 'increment'}
+        }
+        w.run(run_config=run_config)
+        w.run(run_config=run_config)
+        self.assertSetEqual({'add', 'increment'}, set(w.stats))
+        runs = experiment.load_runs()
+        self.assertListEqual(['add', 'increment', 'add', 'increment'], list(runs['task']))
+        self.assertListEqual(['LocalExecutor'] * 4, list(runs['run_executor']))
+        self.assertTrue((runs['wall'] >= 0).all())
+
+    def test_run_stats_process_executor(self):
+        """Should record stats measured on worker processes."""
+        import os
+        from cd4ml.executor import ProcessExecutor
+
+        w = Workflow()
+        w.add_task(Task(name='add', task=add))
+        w.run(run_config={'add': {'params': {'a': 1, 'b': 2}, 'output': 'c'}}, executor='process')
+        self.assertNotEqual(os.getpid(), w.stats['add']['pid'])
+        # Outputs are never pickled to measure them unless requested
+        self.assertIsNone(w.stats['add']['serialized_size'])
+
+        w.run(run_config={'add': {'params': {'a': 1, 'b': 2}, 'output': 'c'}},
+              executor=ProcessExecutor(measure_serialized=True))
+        self.assertGreater(w.stats['add']['serialized_size'], 0)
+
+    def test_run_trace(self):
+        """Should write a trace with worker tracks, task phases and scheduler events."""
+        import os
+        import json
+        import tempfile
+        from cd4ml.executor import ProcessExecutor
+
+        tmpdir = tempfile.TemporaryDirectory()
+        self.addCleanup(tmpdir.cleanup)
+        filepath = os.path.join(tmpdir.name, 'run.json')
+        w = Workflow(experiment=self.experiment)
+        w.add_task(Task(name='add', task=add))
+        w.add_task(Task(name='increment', task=increment), dependency='add')
+        w.run(run_config={
+            'add': {'params': {'a': 1, 'b': 2}, 'output': 'c'},
+            'increment': {'params': None, 'output': 'increment'}
+        }, executor=ProcessExecutor(measure_serialized=True), trace=filepath)
+        with open(filepath) as fd:
+            events = json.load(fd)['traceEvents']
+
+        names = {event['name'] for event in events}
+        self.assertTrue({'execute add', 'serialize add', 'save c', 'load c', 'get_ready', 'done'} <= names)
+        execute = [event for event in events if event['name'] == 'execute add'][0]
+        self.assertNotEqual(os.getpid(), execute['pid'])
+        tracks = [event['args']['name'] for event in events if event['name'] == 'process_name']
+        self.assertIn(f"worker {execute['pid']}", tracks)
+
+    def test_run_profile(self):
+        """Should save profiler artifacts of selected tasks next to their outputs."""
+        import os
+
+        w = Workflow(experiment=self.experiment)
+        w.add_task(Task(name='add', task=add))
+        w.add_task(Task(name='increment', task=increment, profile='sample'), dependency='add')
+        w.add_task(Task(name='add2', task=add))
+        w.run(run_config={
+            'add': {'params': {'a': 1, 'b': 2}, 'output': 'c'},
+            'increment': {'params': None, 'output': 'increment'},
+            'add2': {'params': {'a': 1, 'b': 2}, 'output': 'add2'}
+        }, executor='process', profile=['add'])
+        self.assertSetEqual({'add', 'increment'}, set(w.profiles))
+        paths = self.experiment.metadata['profiles']
+        self.assertTrue(paths['add']['prof'].endswith(os.path.join('output', 'c.prof')))
+        self.assertTrue(os.path.exists(paths['add']['prof']))
+        self.assertTrue(os.path.exists(paths['increment']['folded']))
+
+    def test_run_monitor(self):
+        """Should save resource samples of the run as an experiment output."""
+        w = Workflow(experiment=self.experiment)
+        w.add_task(Task(name='add', task=add))
+        w.run(run_config={'add': {'params': {'a': 1, 'b': 2}, 'output': 'c'}}, executor='process', monitor=0.01)
+        resources = self.experiment.load_output(name='run_resources')
+        self.assertDictEqual(w.resources, resources)
+        self.assertGreaterEqual(len(resources['time']), 2)
+
+    def test_run_monitor_running_tasks(self):
+        """Should tag samples only with tasks running, not with tasks submitted."""
+        def wait(**kwargs):
+            time.sleep(0.05)
+
+        w = Workflow()
+        w.add_tasks([Task(name=f'wait{i}', task=wait) for i in range(3)])
+        w.run(run_config={f'wait{i}': {'params': {}, 'output': None} for i in range(3)}, monitor=0.005)
+        self.assertTrue(all(len(tasks) <= 1 for tasks in w.resources['tasks']))
+        self.assertSetEqual({'wait0', 'wait1', 'wait2'}, {elm for tasks in w.resources['tasks'] for elm in tasks})
+
+    def test_run_events(self):
+        """Should publish run events with timing and size data."""
+        from cd4ml.prometheus import PrometheusExporter
+
+        received = []
+        w = Workflow(experiment=self.experiment)
+        w.add_task(Task(name='add', task=add))
+        w.add_task(Task(name='increment', task=increment), dependency='add')
+        w.events.subscribe(received.append)
+        exporter = PrometheusExporter(w.events)
+        w.run(run_config={
+            'add': {'params': {'a': 1, 'b': 2}, 'output': 'c'},
+            'increment': {'params': None, 'output': 'increment'}
+        }, fuse=True)
+        w.events.flush()
+        self.assertListEqual(['task_submitted', 'task_started', 'task_finished', 'output_saved', 'run_finished'],
+                             [event.name for event in received])
+        self.assertGreater(received[3].data['size'], 0)
+        self.assertEqual(w.stats['increment']['saved_size'], received[3].data['size'])
+        self.assertFalse(received[-1].data['failed'])
+        self.assertIn('cd4ml_outputs_saved_total 1\n', exporter.render())
+        self.assertIn(f"cd4ml_output_bytes_total {received[3].data['size']}\n", exporter.render())
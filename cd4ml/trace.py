@@ -0,0 +1,153 @@
+import os
+import json
+import time
+import threading
+from contextlib import contextmanager, nullcontext
+
+
+class Tracer:
+    """
+    Collect workflow run events in the Chrome trace event format.
+
+    Traces can be opened on ``chrome://tracing`` or `Perfetto <https://ui.perfetto.dev>`_. Every process and thread
+    running tasks has its own track. Timestamps are taken from the system clock, so events from worker processes line
+    up with the scheduler ones.
+
+    :example:
+
+    >>> tracer = Tracer()
+    >>> with tracer.span('load', cat='io'):
+    >>>     data = load()
+    >>> tracer.write('run.json')
+    """
+
+    def __init__(self):
+        self.events = list()
+        self.pid = os.getpid()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def now():
+        """
+        :return float: Current timestamp in microseconds
+        """
+        return time.time() * 1e6
+
+    def complete(self, name, start, duration, cat='task', pid=None, tid=None, args=None):
+        """
+        Add a span with known start and duration.
+
+        :param str name: Span name
+        :param float start: Start timestamp in microseconds
+        :param float duration: Duration in microseconds
+        :param str cat: Event category
+        :param int pid: Process id. Defaults to this process
+        :param int tid: Thread id. Defaults to this thread
+        :param dict args: Extra data shown with the event
+        """
+        event = {
+            'name': name,
+            'cat': cat,
+            'ph': 'X',
+            'ts': start,
+            'dur': duration,
+            'pid': self.pid if pid is None else pid,
+            'tid': threading.get_ident() if tid is None else tid,
+            'args': args or {}
+        }
+        with self._lock:
+            self.events.append(event)
+
+    def instant(self, name, cat='scheduler', args=None):
+        """
+        Add an instant event on this thread track.
+
+        :param str name: Event name
+        :param str cat: Event category
+        :param dict args: Extra data shown with the event
+        """
+        event = {
+            'name': name,
+            'cat': cat,
+            'ph': 'i',
+            's': 't',
+            'ts': self.now(),
+            'pid': self.pid,
+            'tid': threading.get_ident(),
+            'args': args or {}
+        }
+        with self._lock:
+            self.events.append(event)
+
+    @contextmanager
+    def span(self, name, cat='scheduler', args=None):
+        """
+        Add a span for the code run in the context.
+
+        :param str name: Span name
+        :param str cat: Event category
+        :param dict args: Extra data shown with the event
+        """
+        start = self.now()
+        try:
+            yield
+        finally:
+            self.complete(name, start, self.now() - start, cat=cat, args=args)
+
+    def add_task(self, name, stats):
+        """
+        Add execute and serialize spans of a task on the track of the process and thread that ran it.
+
+        :param str name: Task name
+        :param dict stats: Task stats. See :func:`cd4ml.instrument.measure`
+        """
+        start = stats['started'] * 1e6
+        duration = stats['wall'] * 1e6
+        pid, tid = stats.get('pid'), stats.get('tid')
+        args = {key: stats.get(key) for key in ('cpu', 'rss_peak_delta', 'memory_peak', 'output_size')}
+        self.complete(f'execute {name}', start, duration, cat='execute', pid=pid, tid=tid, args=dict(args, task=name))
+        if stats.get('serialize') is not None:
+            self.complete(f'serialize {name}', start + duration, stats['serialize'] * 1e6, cat='serialize', pid=pid,
+                          tid=tid, args={'task': name, 'serialized_size': stats.get('serialized_size')})
+
+    def metadata(self):
+        """
+        Name process and thread tracks. This process is the scheduler and other processes are workers.
+
+        :return list: Metadata events
+        """
+        events = []
+        tracks = sorted({(event['pid'], event['tid']) for event in self.events})
+        for pid in sorted({pid for pid, _ in tracks}):
+            name = 'scheduler' if pid == self.pid else f'worker {pid}'
+            events.append({'name': 'process_name', 'ph': 'M', 'pid': pid, 'tid': 0, 'args': {'name': name}})
+        for pid, tid in tracks:
+            name = 'main' if tid == threading.main_thread().ident and pid == self.pid else f'thread {tid}'
+            events.append({'name': 'thread_name', 'ph': 'M', 'pid': pid, 'tid': tid, 'args': {'name': name}})
+        return events
+
+    def write(self, filepath):
+        """
+        Write trace to a JSON file.
+
+        :param str filepath: Trace file path
+        :return str: Trace file path
+        """
+        with open(filepath, 'w+') as fd:
+            json.dump({'traceEvents': self.metadata() + self.events, 'displayTimeUnit': 'ms'}, fd)
+        return filepath
+
+
+def span(tracer: Tracer, name, cat='scheduler', args=None):
+    """
+    Trace a span if there is a tracer.
+
+    :param Tracer tracer: Tracer or None
+    :param str name: Span name
+    :param str cat: Event category
+    :param dict args: Extra data shown with the event
+    :return: Context manager
+    """
+    if tracer is None:
+        return nullcontext()
+    return tracer.span(name, cat=cat, args=args)
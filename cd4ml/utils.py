@@ -1,22 +1,92 @@
-import copy
+import os
+import re
+import sys
 
 from graphlib import TopologicalSorter
 
+DOT_ID = re.compile(r'^([A-Za-z_\u0080-\uffff][A-Za-z_0-9\u0080-\uffff]*|-?(\.[0-9]+|[0-9]+(\.[0-9]*)?))$')
+DOT_KEYWORDS = {'node', 'edge', 'graph', 'digraph', 'subgraph', 'strict'}
+
+
+def iter_edges(graph: TopologicalSorter, root='start'):
+    """
+    Walk graph edges from a virtual root node. Every node and every edge is visited exactly once, in depth first
+    order, and the graph state is not changed, so it is safe to call it on a prepared or running graph.
+
+    :param TopologicalSorter graph: Graph to be walked
+    :param str root: Name of the virtual node connected to every node without predecessors
+    :return: Generator of ``(parent, node)`` tuples grouped by parent
+    """
+    node2info = graph._node2info
+    targets = set()
+    for info in node2info.values():
+        targets.update(info.successors)
+
+    # Nodes without predecessors hang from the root node
+    successors = {root: [node for node in node2info if node not in targets]}
+
+    visited = set()
+    stack = [root]
+    while stack:
+        node = stack.pop()
+        if node in visited:
+            continue
+        visited.add(node)
+
+        children = successors[node] if node == root else node2info[node].successors
+        for child in children:
+            yield node, child
+
+        # Reversed, so the first child is the next one to be visited
+        stack.extend(child for child in reversed(children) if child not in visited)
+
+
+def quote(name):
+    """
+    Quote a node name to be used as a DOT identifier if needed.
+
+    :param str name: Node name
+    :return str: DOT identifier
+    """
+    name = str(name)
+    if DOT_ID.match(name) and name.lower() not in DOT_KEYWORDS:
+        return name
+    return '"' + name.replace('\\', '\\\\').replace('"', '\\"') + '"'
+
+
+def iter_dot(graph: TopologicalSorter):
+    """
+    Generate DOT representation for the graph line by line without building it in memory.
+
+    :param TopologicalSorter graph:
+    :return: Generator of DOT lines
+    """
+    yield 'strict digraph "" {\n'
+    yield '    start [shape=doublecircle];\n'
+    for parent, node in iter_edges(graph):
+        yield f'    {quote(parent)} -> {quote(node)};\n'
+    yield '}\n'
+
+
+def write_dot(graph: TopologicalSorter, fd):
+    """
+    Stream DOT representation for the graph to a file object.
+
+    :param TopologicalSorter graph:
+    :param fd: File object opened for writing text
+    :return: File object
+    """
+    fd.writelines(iter_dot(graph))
+    return fd
+
 
 def get_graph(graph: TopologicalSorter):
     import pygraphviz as pgv
     g = pgv.AGraph(directed=True)
     g.add_node("start", shape="doublecircle")
 
-    # Copy all objects to avoid closing the graph
-    tmpgraph = copy.copy(graph)
-
-    # Add all elements to the graph
-    tmpgraph.prepare()
-
-    # Start with first element
-    for elm in tmpgraph.get_ready():
-        g = parse_node(ts=tmpgraph, parent='start', node=elm, agraph=g)
+    for parent, node in iter_edges(graph):
+        g.add_edge(parent, node)
 
     return g
 
@@ -28,13 +98,10 @@ def graph_to_dot(graph: TopologicalSorter):
     :param TopologicalSorter graph:
     :return:
     """
-    g = get_graph(graph)
+    return ''.join(iter_dot(graph))
 
-    # Generate dotfile in tmp dir
-    return g.to_string()
 
-
-def parse_node(ts: TopologicalSorter, parent, node, agraph):
+def parse_node(ts: TopologicalSorter, parent, node, agraph, visited=None):
     """
     Generate a graph from the node.
 
@@ -42,6 +109,7 @@ def parse_node(ts: TopologicalSorter, parent, node, agraph):
     :param str parent:
     :param str node:
     :param AGraph agraph:
+    :param set visited: Nodes already added with their successors. Shared subgraphs are walked only once
     :return:
     """
     import pygraphviz as pgv
@@ -49,10 +117,17 @@ def parse_node(ts: TopologicalSorter, parent, node, agraph):
     # Type checking here to avoid breaking without graphviz
     assert isinstance(agraph, pgv.AGraph)
 
+    if visited is None:
+        visited = set()
+
     agraph.add_edge(parent, node)
+    if node in visited:
+        return agraph
+    visited.add(node)
+
     for elm in ts._get_nodeinfo(node).successors:
         # Add new edge for every sucessor
-        parse_node(ts, node, elm, agraph)
+        parse_node(ts, node, elm, agraph, visited)
 
     return agraph
 
@@ -71,3 +146,54 @@ def draw_graph(graph: TopologicalSorter, filepath: str = None):
     if filepath is not None:
         g.draw(filepath)
     return g
+
+
+def sizeof(obj):
+    """
+    Approximate memory size of an object in bytes.
+
+    Uses ``memory_usage(deep=True)`` for pandas objects, ``nbytes`` for NumPy arrays and ``sys.getsizeof`` as
+    fallback. Pandas is never imported here.
+
+    :param obj: Any python object
+    :return int: Size in bytes
+    """
+    memory_usage = getattr(obj, 'memory_usage', None)
+    if callable(memory_usage):
+        try:
+            size = memory_usage(deep=True)
+            return int(size.sum()) if hasattr(size, 'sum') else int(size)
+        except TypeError:
+            pass
+
+    nbytes = getattr(obj, 'nbytes', None)
+    if isinstance(nbytes, int):
+        return nbytes
+
+    return sys.getsizeof(obj)
+
+
+def is_frame(obj):
+    """
+    Check if an object is a pandas DataFrame without importing pandas. If pandas was never imported, no object can
+    be a DataFrame.
+
+    :param obj: Any python object
+    :return bool: True for DataFrames
+    """
+    return 'pandas' in sys.modules and isinstance(obj, sys.modules['pandas'].DataFrame)
+
+
+def path_size(path):
+    """
+    Size of a local file or of all files in a directory.
+
+    :param str path: File or directory path
+    :return int: Size in bytes, or None if the path is not a local file or directory
+    """
+    if not isinstance(path, str) or not os.path.exists(path):
+        return None
+    if os.path.isfile(path):
+        return os.path.getsize(path)
+    return sum(os.path.getsize(os.path.join(root, filename))
+               for root, _, filenames in os.walk(path) for filename in filenames)
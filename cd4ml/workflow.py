@@ -1,13 +1,17 @@
-import copy
+import time
+import functools
 import graphlib
+from collections import ChainMap
 
-from cd4ml.task import Task
-from cd4ml.utils import graph_to_dot, draw_graph
+from cd4ml.task import Task, FusedTask, Expansion
+from cd4ml.plan import ExecutionPlan
+from cd4ml.trace import Tracer, span
+from cd4ml.sampler import ResourceSampler
+from cd4ml.events import EventBus
+from cd4ml.utils import write_dot, draw_graph
 from cd4ml.experiment import Experiment
 from cd4ml.log import logger
 
-tmpgraph = None
-
 
 class Workflow(graphlib.TopologicalSorter):
     """Basic workflow class"""
@@ -15,10 +19,18 @@ class Workflow(graphlib.TopologicalSorter):
     def __init__(self, experiment: Experiment = None, *args, **kwargs):
         self.tasks = dict()
         self.valid_executors = [
-            'local'
+            'local',
+            'process'
         ]
         self.running_task = None
         self.experiment = experiment
+        self.timings = dict()
+        self.stats = dict()
+        self.profiles = dict()
+        self.resources = None
+        # Run events. See :class:`cd4ml.events.EventBus`
+        self.events = EventBus()
+        self._plan = None
         super().__init__(*args, **kwargs)
 
     @property
@@ -48,6 +60,263 @@ class Workflow(graphlib.TopologicalSorter):
         else:
             self.add(func.name)
 
+    def add_tasks(self, tasks):
+        """
+        Add many tasks to the workflow at once.
+
+        Dependencies are validated for all tasks in a single pass and may refer to tasks defined later in the same
+        iterable. Cycles are detected in linear time before anything is added, and every offending node is reported.
+
+        :param tasks: Iterable of :class:`Task` instances or ``(Task, dependency)`` tuples
+        :raises ValueError: if task names are repeated or already in the workflow
+        :raises DependencyError: if there are dependencies not found on the workflow
+        :raises graphlib.CycleError: if new tasks create cycles. Second argument lists all nodes in cycles
+        :example:
+
+        >>> w = Workflow()
+        >>> w.add_tasks([
+        >>>     Task(name='load', task=load),
+        >>>     (Task(name='train', task=train), 'clean'),
+        >>>     (Task(name='clean', task=clean), ['load'])
+        >>> ])
+        """
+        entries, depends = self._parse_tasks(tasks, self.tasks)
+        for name, (func, dependency) in entries.items():
+            self.tasks[name] = {
+                'task': func,
+                'dependency': dependency
+            }
+            self.add(name, *depends[name])
+
+    @staticmethod
+    def _parse_tasks(tasks, existing):
+        """
+        Validate new tasks and their dependencies.
+
+        :param tasks: Iterable of :class:`Task` instances or ``(Task, dependency)`` tuples
+        :param existing: Tasks already added, by name
+        :return: New ``(Task, dependency)`` entries and their dependency name lists, by task name
+        :rtype: tuple
+        :raises ValueError: if task names are repeated or already exist
+        :raises DependencyError: if there are dependencies not found
+        :raises graphlib.CycleError: if new tasks create cycles
+        """
+        entries = dict()
+        repeated = []
+        for elm in tasks:
+            func, dependency = elm if isinstance(elm, tuple) else (elm, None)
+            if not isinstance(func, Task):
+                raise TypeError(f"We only accept Task instances. You supplied '{type(func)}' for {func}")
+            if func.name in entries or func.name in existing:
+                repeated.append(func.name)
+            entries[func.name] = (func, dependency)
+        if repeated:
+            raise ValueError(f"Tasks are repeated or already in the workflow: {repeated}")
+
+        # Validate all dependencies in a single pass
+        depends = dict()
+        missing = dict()
+        for name, (func, dependency) in entries.items():
+            if dependency is None:
+                depends[name] = []
+            else:
+                depends[name] = dependency if isinstance(dependency, list) else [dependency]
+            not_found = [elm for elm in depends[name] if elm not in entries and elm not in existing]
+            if not_found:
+                missing[name] = not_found
+        if missing:
+            raise DependencyError(missing)
+
+        # Existing tasks can't depend on new ones, so cycles can only happen among new tasks
+        cycle = find_cycle_nodes({name: [elm for elm in deps if elm in entries] for name, deps in depends.items()})
+        if cycle:
+            raise graphlib.CycleError("nodes are in a cycle", cycle)
+
+        return entries, depends
+
+    @classmethod
+    def from_edges(cls, tasks, edges, experiment: Experiment = None):
+        """
+        Build a workflow from tasks and dependency edges.
+
+        :param tasks: Iterable of :class:`Task` instances
+        :param edges: Iterable of ``(dependency, task)`` name tuples
+        :param Experiment experiment: Experiment for the workflow
+        :return: New workflow
+        :rtype: Workflow
+        :raises DependencyError: if edges refer to tasks not supplied
+        """
+        tasks = list(tasks)
+        names = {func.name for func in tasks}
+        depends = dict()
+        missing = dict()
+        unknown = []
+        for dependency, name in edges:
+            depends.setdefault(name, []).append(dependency)
+            if name not in names and name not in unknown:
+                unknown.append(name)
+            if dependency not in names:
+                missing.setdefault(name, []).append(dependency)
+        if missing or unknown:
+            raise DependencyError(missing, unknown=unknown)
+
+        w = cls(experiment=experiment)
+        w.add_tasks((func, depends.get(func.name)) for func in tasks)
+        return w
+
+    def add(self, node, *predecessors):
+        """Add a new node to the graph, invalidating the compiled plan"""
+        self._plan = None
+        super().add(node, *predecessors)
+
+    def compile(self, nodes=None):
+        """
+        Compile the workflow graph in an immutable execution plan. The plan for the whole graph is cached until a new
+        node is added.
+
+        :param set nodes: Compile only the subgraph with these nodes. Defaults to all nodes
+        :return: Execution plan
+        :rtype: ExecutionPlan
+        :raises graphlib.CycleError: if the graph has cycles
+        """
+        if self._plan is None:
+            cycle = self._find_cycle()
+            if cycle:
+                raise graphlib.CycleError("nodes are in a cycle", cycle)
+            self._plan = ExecutionPlan.from_graph(self)
+        if nodes is not None:
+            return ExecutionPlan.from_graph(self, nodes=nodes)
+        return self._plan
+
+    def ancestors(self, targets, stored=None):
+        """
+        Get targets and all the tasks they depend on.
+
+        :param str, List[str] targets: Target task names
+        :param set stored: Tasks with output already available. They are not included and their own dependencies are
+            not walked
+        :return set: Task names
+        """
+        if isinstance(targets, str):
+            targets = [targets]
+        unknown = [elm for elm in targets if elm not in self.tasks]
+        if unknown:
+            raise ValueError(f"Invalid targets {unknown}. Available tasks: {list(self.tasks)}")
+
+        stored = stored or set()
+        selected = set()
+        stack = list(targets)
+        while stack:
+            name = stack.pop()
+            if name in selected:
+                continue
+            selected.add(name)
+
+            for elm in self._dependencies(name):
+                if elm not in selected and elm not in stored:
+                    stack.append(elm)
+
+        return selected
+
+    def fuse(self, run_config: dict, keep=None):
+        """
+        Fuse linear chains of tasks in single tasks.
+
+        A task is fused with its consumer when it is the only dependency of the consumer and the consumer is its only
+        successor. Fused chains are replaced by a :class:`FusedTask` named after the last task, which keeps its
+        output, so consumers of the chain are not changed. Intermediate outputs are passed in memory and are never
+        persisted on experiment.
+
+        :param dict run_config: Tasks input and output format
+        :param List[str] keep: Output names to be kept. Chains are split after tasks with these outputs
+        :return: New workflow and its run config
+        :rtype: tuple
+        """
+        keep = set(keep or [])
+
+        def fusable(name):
+            # Output is passed to the only consumer, which has no other dependency
+            successors = self._node2info[name].successors
+            if len(successors) != 1 or successors[0] not in run_config:
+                return None
+            output = run_config.get(name, {}).get('output')
+            if output is None or output in keep or self._dependencies(successors[0]) != [name]:
+                return None
+            return successors[0]
+
+        fused_from = {fusable(name) for name in self.tasks} - {None}
+        tasks = []
+        fused_config = dict()
+        for name in self.tasks:
+            if name in fused_from:
+                continue
+
+            chain = [name]
+            while fusable(chain[-1]) is not None:
+                chain.append(fusable(chain[-1]))
+
+            dependency = self.tasks[name]['dependency']
+            if len(chain) == 1:
+                tasks.append((self.tasks[name]['task'], dependency))
+                if name in run_config:
+                    fused_config[name] = run_config[name]
+                continue
+
+            logger.debug("Fusing tasks %s", chain)
+            steps = [(self.tasks[elm]['task'], run_config[elm].get('output')) for elm in chain]
+            tasks.append((FusedTask(steps), dependency))
+            fused_config[chain[-1]] = dict(run_config[chain[-1]], params=run_config[name].get('params'))
+
+        w = Workflow(experiment=self.experiment)
+        w.add_tasks(tasks)
+        return w, fused_config
+
+    def inline(self, run_config: dict):
+        """
+        Replace sub workflow tasks by their inner tasks.
+
+        Inner task names and output names are prefixed with the sub workflow task name and a dot. Inner tasks without
+        dependencies depend on the sub workflow task dependencies, and a join task named after the sub workflow task
+        depends on inner tasks without consumers, so outer consumers are not changed. Nested sub workflows are inlined
+        too.
+
+        :param dict run_config: Tasks input and output format
+        :return: New workflow and its run config
+        :rtype: tuple
+        """
+        tasks = []
+        inlined_config = dict()
+        for name, entry in self.tasks.items():
+            func = entry['task']
+            if not isinstance(func, SubWorkflowTask):
+                tasks.append((func, entry['dependency']))
+                if name in run_config:
+                    inlined_config[name] = run_config[name]
+                continue
+
+            inner, inner_config = func.workflow.inline(func.run_config)
+            prefix = f'{name}.'
+            for inner_name, inner_entry in inner.tasks.items():
+                depends = inner._dependencies(inner_name)
+                output = inner_config[inner_name].get('output')
+                inlined_config[prefix + inner_name] = dict(inner_config[inner_name],
+                                                           output=None if output is None else prefix + output)
+
+                # Inner tasks receive dependencies output with their original names
+                outputs = {prefix + inner_config[elm]['output']: inner_config[elm]['output'] for elm in depends}
+                dependency = [prefix + elm for elm in depends] if depends else entry['dependency']
+                tasks.append((_InnerTask(prefix + inner_name, inner_entry['task'], outputs), dependency))
+
+            outputs = {prefix + output: output for output in func.outputs(inner_config)}
+            join = Task(name, description=func.description, task=functools.partial(_join, func.output))
+            tasks.append((_InnerTask(name, join, outputs), [prefix + elm for elm in func.leaves(inner_config)]))
+            if name in run_config:
+                inlined_config[name] = run_config[name]
+
+        w = Workflow(experiment=self.experiment)
+        w.add_tasks(tasks)
+        return w, inlined_config
+
     def run_task(self, name, *args, **kwargs):
         """
         Run task in Workflow
@@ -60,22 +329,57 @@ class Workflow(graphlib.TopologicalSorter):
         return self.tasks[name]['task'].run(*args, **kwargs)
 
     def get_executor(self, executor):
+        from cd4ml.executor import Executor
+        if isinstance(executor, Executor):
+            if executor.experiment is None:
+                executor.experiment = self.experiment
+            return executor
+
         if executor not in self.valid_executors:
             raise ValueError(f"Invalid executor {executor}. Available executors: {self.valid_executors}")
 
         if executor == 'local':
             from cd4ml.executor import LocalExecutor
             return LocalExecutor(experiment=self.experiment)
+        if executor == 'process':
+            from cd4ml.executor import ProcessExecutor
+            return ProcessExecutor(experiment=self.experiment)
 
-    def run(self, run_config: dict, executor='local'):
+    def run(self, run_config: dict, executor='local', targets=None, reuse=False, final=None, fuse=False, trace=None,
+            profile=None, monitor=None):
         """
         Run workflow tasks.
 
-        :param dict run_config: Tasks input and output format.
-        :param str executor: Type of job executor. Can be one of the following:
+        :param dict run_config: Tasks input and output format. When ``targets`` are supplied, only selected tasks are
+            required, plus the ``output`` of reused dependencies
+        :param str, Executor executor: Type of job executor or an executor instance. Can be one of the following:
 
             * ``'local'``: runs in local executor
-        :return: Output JSON with run results
+            * ``'process'``: runs in a pool of worker processes, passing arrays through shared memory
+        :param str, List[str] targets: Run only these tasks and their dependencies. Defaults to all tasks
+        :param bool reuse: Don't run dependencies of the targets with output already stored on experiment
+        :param List[str] final: Output names kept until the end of the run. Outputs of tasks without consumers and of
+            targets are always kept. Other outputs are released as soon as all their consumers finish, unless they are
+            persisted on experiment
+        :param bool fuse: Run linear chains of tasks as single tasks. See :meth:`fuse`. Final and target outputs are
+            never fused away. Running time of the original tasks is still recorded on :attr:`timings`
+        :param str trace: Write a Chrome trace event JSON file to this path, with a track for every worker, spans
+            for tasks execute, save and load phases and scheduler events. Serialize phases are added by executors
+            measuring serialized sizes. Can be opened on Perfetto
+        :param List[str], dict profile: Task names to be profiled with ``cProfile``, or profiler names by task name.
+            See :func:`cd4ml.profiler.get_profiler`. Tasks created with ``profile=True`` are always profiled. Profiler
+            artifacts are saved on experiment next to task outputs and kept on :attr:`profiles`
+        :param float monitor: Sample CPU, memory and I/O of the process tree every ``monitor`` seconds, tagged with the
+            tasks running on the executor at the time. See :class:`cd4ml.sampler.ResourceSampler`. Samples are kept on
+            :attr:`resources` and saved on experiment as the ``run_resources`` output
+
+        Resource usage of every task is kept on :attr:`stats` and recorded on experiment metadata. See
+        :meth:`Experiment.load_runs`. Run events are published on :attr:`events`.
+
+        Tasks may return an :class:`~cd4ml.task.Expansion` to add new tasks to the run. Their outputs are returned
+        too.
+
+        :return: Output JSON with run results. Outputs spilled by executors with a memory budget are loaded back
         :rtype: dict
         :example:
 
@@ -99,65 +403,246 @@ class Workflow(graphlib.TopologicalSorter):
             'add2': 3
         }
         """
-        self.prepare()
+        if any(isinstance(entry['task'], SubWorkflowTask) for entry in self.tasks.values()):
+            inlined, inlined_config = self.inline(run_config)
+            inlined.events = self.events
+            logger.info("Inlined sub workflows in %d tasks", len(inlined.tasks))
+            try:
+                return inlined.run(inlined_config, executor=executor, targets=targets, reuse=reuse, final=final,
+                                   fuse=fuse, trace=trace, profile=profile, monitor=monitor)
+            finally:
+                self.timings = inlined.timings
+                self.stats = inlined.stats
+                self.profiles = inlined.profiles
+                self.resources = inlined.resources
+
+        keep = self._keep_outputs(run_config, final=final, targets=targets)
+        if fuse:
+            fused, fused_config = self.fuse(run_config, keep=keep)
+            fused.events = self.events
+            logger.info("Fused %d tasks in %d", len(self.tasks), len(fused.tasks))
+            try:
+                return fused.run(fused_config, executor=executor, targets=targets, reuse=reuse, final=final,
+                                 trace=trace, profile=profile, monitor=monitor)
+            finally:
+                self.timings = fused.timings
+                self.stats = fused.stats
+                self.profiles = fused.profiles
+                self.resources = fused.resources
+
+        plan = self.compile()
+        if targets is not None:
+            stored = None
+            if reuse:
+                if self.experiment is None:
+                    raise ValueError("An experiment is needed to reuse stored outputs")
+                stored = {name for name in self.tasks
+                          if run_config.get(name, {}).get('output') in self.experiment.metadata['output']}
+            plan = self.compile(nodes=self.ancestors(targets, stored=stored))
+            logger.info("Running %d of %d tasks for targets %s", len(plan), len(self.tasks), targets)
+
+        # Every run has its own state, so the workflow graph is never changed. Tasks added at runtime are local too
+        started = time.time()
+        state = plan.start()
+        tasks = ChainMap(dict(), self.tasks)
+        run_config = dict(run_config)
         exe = self.get_executor(executor=executor)
-        # Run all nodes
-        while self.is_active():
-            # Run any tasks when they are ready
-            for task in self.get_ready():
-                if self.tasks[task].get('dependency') is not None:
-                    run_config[task]['params'] = dict()
-
-                    if isinstance(self.tasks[task]['dependency'], list):
-                        for elm in self.tasks[task]['dependency']:
-                            # Get output name from task workflow configuration
-                            output_var = run_config[elm]['output']
-
-                            # Get parameters from experiment provider, if it exists
-                            if self.experiment is not None:
-                                # TODO: support pandas as input
-                                run_config[task]['params'][output_var] = self.experiment.load_output(
-                                    name=output_var)
-                            else:
-                                run_config[task]['params'][output_var] = exe.output[output_var]
-                    else:
-                        output_var = run_config[self.tasks[task]['dependency']]['output']
-                        if self.experiment is not None:
-                            run_config[task]['params'][output_var] = self.experiment.load_output(name=output_var)
-                        else:
-                            run_config[task]['params'][output_var] = exe.output[output_var]
-
-                logger.info(f"Submitting task {task} to executor {executor}")
-                exe.submit(self.tasks[task]['task'], params=run_config[task]['params'],
-                           output=run_config[task].get('output'))
-
-            # Run tasks
-            logger.info("Running workflow...")
-            exe.run()
-
-            for elm in exe.done:
-                logger.info(f"Marking task {elm} as done...")
-                try:
-                    self.done(elm)
-                except ValueError as e:
-                    # This node was already marked as done
-                    print(e)
-                    pass
-
-        return exe.output
+        exe.tracer = Tracer() if trace is not None else None
+        exe.events = self.events
+        if profile is not None and not isinstance(profile, dict):
+            profile = {name: 'cprofile' for name in profile}
+        consumers = self._count_consumers(plan, run_config, keep)
+        sampler = ResourceSampler(interval=monitor, tags=exe.running_tasks).start() if monitor else None
+        failed = True
+        try:
+            # Run all nodes
+            while state.is_active():
+                # Run any tasks when they are ready
+                with span(exe.tracer, 'get_ready'):
+                    ready = state.get_ready()
+                for task in ready:
+                    logger.debug("Submitting task %s to executor %s", task, executor, extra={'task': task})
+                    self.events.publish('task_submitted', task=task)
+                    with span(exe.tracer, f'submit {task}'):
+                        exe.submit(tasks[task]['task'], params=self._get_params(task, run_config, exe, tasks),
+                                   output=run_config[task].get('output'), profile=(profile or {}).get(task))
+
+                # Run tasks
+                logger.debug("Running workflow...")
+                ndone = len(exe.done)
+                with span(exe.tracer, 'wait'):
+                    exe.run()
+
+                for elm in exe.done[ndone:]:
+                    if elm in exe.expansions:
+                        self._expand(elm, exe.expansions.pop(elm), tasks, run_config, state, consumers, keep)
+                    logger.debug("Marking task %s as done...", elm, extra={'task': elm})
+                    with span(exe.tracer, 'done', args={'task': elm}):
+                        state.done(elm)
+                        self._release_dependencies(elm, consumers, run_config, exe, tasks)
+            # Spilled outputs are removed when the executor is closed, so they are loaded before
+            from cd4ml.executor import OutputStore
+            output = exe.output.to_dict() if isinstance(exe.output, OutputStore) else exe.output
+            failed = False
+        finally:
+            if sampler is not None:
+                sampler.stop()
+                self.resources = sampler.series()
+            exe.close()
+            self.timings = dict(exe.timings)
+            self.stats = dict(exe.stats)
+            self.profiles = dict(exe.profiles)
+            if exe.tracer is not None:
+                exe.tracer.write(trace)
+                logger.info("Trace written to %s", trace)
+            self.events.publish('run_finished', tasks=len(exe.done), wall=time.time() - started, failed=failed)
+
+        if self.experiment is not None:
+            if sampler is not None:
+                self.experiment.save_output(name='run_resources', data=self.resources)
+            self.experiment.save_run(exe.stats, started=started, wall=time.time() - started,
+                                     executor=type(exe).__name__)
+        return output
+
+    def _dependencies(self, task, tasks=None):
+        dependency = (self.tasks if tasks is None else tasks)[task].get('dependency')
+        if dependency is None:
+            return []
+        return dependency if isinstance(dependency, list) else [dependency]
+
+    @staticmethod
+    def _keep_outputs(run_config, final=None, targets=None):
+        """
+        Get output names kept until the end of the run.
+
+        :param dict run_config: Tasks input and output format
+        :param List[str] final: Output names to be kept
+        :param str, List[str] targets: Target task names
+        :return set: Output names
+        """
+        keep = set(final or [])
+        if targets is not None:
+            targets = [targets] if isinstance(targets, str) else targets
+            keep.update(run_config.get(elm, {}).get('output') for elm in targets)
+        return keep
+
+    def _count_consumers(self, plan, run_config, keep):
+        """
+        Count pending consumers of every task output that may be released during the run.
+
+        :param ExecutionPlan plan: Plan to be run
+        :param dict run_config: Tasks input and output format
+        :param set keep: Output names to be kept
+        :return dict: Number of consumers for every task name
+        """
+        # Outputs persisted on experiment are kept
+        if self.experiment is not None:
+            return dict()
+
+        consumers = dict()
+        for task in plan.names:
+            for elm in self._dependencies(task):
+                if elm in plan.index and run_config[elm].get('output') not in keep:
+                    consumers[elm] = consumers.get(elm, 0) + 1
+        return consumers
+
+    def _expand(self, task, expansion: Expansion, tasks, run_config, state, consumers, keep):
+        """
+        Add tasks emitted by a finished task to the run. Must be called before the task is marked as done.
+
+        :param str task: Emitting task name
+        :param Expansion expansion: Emitted tasks
+        :param ChainMap tasks: Tasks in the run. New tasks are added to it
+        :param dict run_config: Tasks input and output format. New tasks format is added to it
+        :param PlanRun state: Run state
+        :param dict consumers: Pending consumers for every task name
+        :param set keep: Output names to be kept
+        """
+        entries, depends = self._parse_tasks(expansion.tasks, tasks)
+        existing = [name for name in entries if name in tasks]
+        if existing:
+            raise ValueError(f"Tasks {existing} added by task {task} already exist")
+        run_config.update(expansion.run_config)
+        missing = [name for name in entries if name not in run_config]
+        if missing:
+            raise ValueError(f"Run config not found for tasks {missing} added by task {task}")
+
+        for name in graphlib.TopologicalSorter({name: depends[name] for name in entries}).static_order():
+            if name not in entries:
+                continue
+
+            for elm in depends[name]:
+                if consumers.get(elm) == 0:
+                    raise ValueError(f"Output of task {elm} was already released. Add it to final outputs")
+                # The emitting task and new tasks may have had no consumers before
+                if elm in consumers or ((elm in entries or elm == task) and self.experiment is None and
+                                        run_config[elm].get('output') not in keep):
+                    consumers[elm] = consumers.get(elm, 0) + 1
+
+            func, dependency = entries[name]
+            tasks[name] = {
+                'task': func,
+                'dependency': dependency
+            }
+            state.add(name, *depends[name])
+
+        logger.info("Task %s added %d tasks to the run", task, len(entries), extra={'task': task})
+
+    def _release_dependencies(self, task, consumers, run_config, exe, tasks=None):
+        """
+        Release dependencies output when the task is their last pending consumer.
+
+        :param str task: Finished task name
+        :param dict consumers: Pending consumers for every task name
+        :param dict run_config: Tasks input and output format
+        :param Executor exe: Executor holding outputs
+        :param tasks: Tasks in the run, by name. Defaults to workflow tasks
+        """
+        for elm in self._dependencies(task, tasks):
+            if elm not in consumers:
+                continue
+            consumers[elm] -= 1
+            if consumers[elm] == 0:
+                exe.release(run_config[elm]['output'])
+
+    def _get_params(self, task, run_config, exe, tasks=None):
+        """
+        Get task params. Tasks with dependencies receive their dependencies output as params.
+
+        :param str task: Task name
+        :param dict run_config: Tasks input and output format
+        :param Executor exe: Executor holding previous outputs
+        :param tasks: Tasks in the run, by name. Defaults to workflow tasks
+        :return dict: params in kwargs format
+        """
+        tasks = self.tasks if tasks is None else tasks
+        if tasks[task].get('dependency') is None:
+            return run_config[task]['params']
+
+        params = dict()
+        for elm in self._dependencies(task, tasks):
+            # Get output name from task workflow configuration
+            output_var = run_config[elm]['output']
+
+            # Get parameters from experiment provider, if it exists
+            if self.experiment is not None:
+                # TODO: support pandas as input
+                with span(exe.tracer, f'load {output_var}', cat='load', args={'task': task}):
+                    params[output_var] = self.experiment.load_output(name=output_var)
+            else:
+                params[output_var] = exe.output[output_var]
+
+        return params
 
     def dotfile(self, filepath: str):
         """
-        Generate a dotfile from graph.
+        Generate a dotfile from graph. The file is streamed, so it doesn't require pygraphviz.
 
         :param str filepath: Filepath to save the dotfile
         :return str: Filepath with the file saved
         """
-        dotstring = graph_to_dot(self)
-
-        # Generate dotfile in tmp dir
         with open(filepath, 'w+') as fd:
-            fd.write(dotstring)
+            write_dot(self, fd)
 
         return filepath
 
@@ -171,15 +656,172 @@ class Workflow(graphlib.TopologicalSorter):
         """
         return draw_graph(self, filepath=filepath)
 
-    def prepare(self) -> None:
-        """Just copy object before it starts processing the graph, so we can run it multiple times"""
-        global tmpgraph
-        tmpgraph = graphlib.TopologicalSorter()
-        tmpgraph._node2info = copy.deepcopy(self._node2info)
-        tmpgraph._ready_nodes = copy.deepcopy(self._ready_nodes)
-        super().prepare()
-
     def reset(self):
-        """Restore previous objects so we can run the workflow again"""
-        self._ready_nodes = tmpgraph._ready_nodes
-        self._node2info = tmpgraph._node2info
+        """Restore graph state so it can be prepared and processed again. Counters are restored from the plan"""
+        plan = self.compile()
+        for name, count in zip(plan.names, plan.npredecessors):
+            self._node2info[name].npredecessors = count
+        self._ready_nodes = None
+        self._npassedout = 0
+        self._nfinished = 0
+
+
+class SubWorkflowTask(Task):
+    """
+    Workflow run as a task of another workflow.
+
+    The outer workflow inlines inner tasks on its own graph before running, so they are scheduled on the same executor
+    and compete for the same workers as outer tasks. See :meth:`Workflow.inline`. Outputs of the sub workflow
+    dependencies are passed to inner tasks without dependencies. Task output is a dict with the outputs of inner
+    tasks without consumers, or only one of them when ``output`` is set. Inner outputs are persisted on the outer
+    workflow experiment.
+
+    :example:
+
+    >>> clean = Workflow()
+    >>> clean.add_task(Task(name='dedup', task=dedup))
+    >>> clean.add_task(Task(name='fill', task=fill), dependency='dedup')
+    >>> w = Workflow()
+    >>> w.add_task(Task(name='load', task=load))
+    >>> w.add_task(SubWorkflowTask(name='clean', workflow=clean, run_config={
+    >>>     'dedup': {'params': None, 'output': 'deduped'},
+    >>>     'fill': {'params': None, 'output': 'filled'}
+    >>> }, output='filled'), dependency='load')
+    """
+
+    def __init__(self, name, workflow: Workflow, run_config: dict, output=None, description=None):
+        """
+        :param str name: Task name
+        :param Workflow workflow: Inner workflow
+        :param dict run_config: Inner tasks input and output format
+        :param str output: Inner output name returned as task output. Defaults to a dict of all outputs of inner tasks
+            without consumers
+        :param str description: Task human description
+        """
+        super(SubWorkflowTask, self).__init__(name, description=description)
+        self.workflow = workflow
+        self.run_config = run_config
+        self.output = output
+
+    def leaves(self, run_config=None):
+        """
+        Get inner tasks collected by the task output: tasks without consumers and the task with ``output``.
+
+        :param dict run_config: Inner tasks input and output format. Defaults to the task run config
+        :return list: Inner task names
+        """
+        run_config = self.run_config if run_config is None else run_config
+        leaves = [name for name, info in self.workflow._node2info.items() if not info.successors]
+        no_output = [name for name in leaves if run_config[name].get('output') is None]
+        if no_output:
+            raise ValueError(f"Tasks {no_output} without consumers on sub workflow {self.name} must have an output")
+
+        if self.output is not None:
+            found = [name for name in self.workflow.tasks if run_config[name].get('output') == self.output]
+            if not found:
+                raise ValueError(f"Output {self.output} not found on sub workflow {self.name}")
+            leaves.extend(name for name in found if name not in leaves)
+        return leaves
+
+    def outputs(self, run_config=None):
+        """
+        Get inner output names collected as task output.
+
+        :param dict run_config: Inner tasks input and output format. Defaults to the task run config
+        :return list: Output names
+        """
+        run_config = self.run_config if run_config is None else run_config
+        return [run_config[name]['output'] for name in self.leaves(run_config)]
+
+    def run(self, **params):
+        """
+        Run the inner workflow on its own local executor. Params are passed to inner tasks without dependencies.
+
+        :return: Task output
+        """
+        run_config = {name: dict(config) for name, config in self.run_config.items()}
+        if params:
+            for name in self.workflow.tasks:
+                if self.workflow.tasks[name].get('dependency') is None:
+                    run_config[name]['params'] = params
+
+        output = self.workflow.run(run_config, final=self.outputs())
+        return _join(self.output, **{elm: output[elm] for elm in self.outputs()})
+
+
+class _InnerTask(Task):
+    """Inlined task receiving prefixed outputs with their original names"""
+
+    def __init__(self, name, task: Task, outputs):
+        super(_InnerTask, self).__init__(name, description=task.description, profile=task.profile)
+        self.inner = task
+        self.outputs = outputs
+
+    def run(self, *args, **kwargs):
+        return self.inner.run(*args, **{self.outputs.get(key, key): value for key, value in kwargs.items()})
+
+
+def _join(output, /, **outputs):
+    """Sub workflow task output from the output of its inner tasks"""
+    if output is not None:
+        return outputs[output]
+    return outputs
+
+
+class DependencyError(ValueError):
+    """Should be raised when task dependencies are not found on workflow"""
+
+    def __init__(self, missing, unknown=None):
+        """
+        :param dict missing: Missing dependency names for every task
+        :param List[str] unknown: Tasks not found with dependencies defined
+        """
+        self.missing = missing
+        self.unknown = unknown or []
+        message = f"Dependencies not found for {len(missing)} tasks: {missing}"
+        if self.unknown:
+            message += f". Dependencies defined for tasks not found: {self.unknown}"
+        super().__init__(message)
+
+
+def find_cycle_nodes(depends):
+    """
+    Find all nodes in cycles in linear time.
+
+    Nodes are removed from the graph while they have no pending dependency and, after that, while they have no
+    pending dependents. Remaining nodes are in cycles or connect two cycles.
+
+    :param dict depends: Dependency names for every node
+    :return list: Nodes in cycles, in the original order
+    """
+    dependents = {name: [] for name in depends}
+    npredecessors = dict()
+    for name, deps in depends.items():
+        npredecessors[name] = len(deps)
+        for elm in deps:
+            dependents[elm].append(name)
+
+    # Remove nodes with all dependencies satisfied
+    stack = [name for name, count in npredecessors.items() if count == 0]
+    remaining = set(depends)
+    while stack:
+        name = stack.pop()
+        remaining.discard(name)
+        for elm in dependents[name]:
+            npredecessors[elm] -= 1
+            if npredecessors[elm] == 0:
+                stack.append(elm)
+
+    # Remove nodes only reachable from cycles
+    nsuccessors = {name: sum(1 for elm in dependents[name] if elm in remaining) for name in remaining}
+    stack = [name for name, count in nsuccessors.items() if count == 0]
+    while stack:
+        name = stack.pop()
+        remaining.discard(name)
+        for elm in depends[name]:
+            if elm in remaining:
+                nsuccessors[elm] -= 1
+                if nsuccessors[elm] == 0:
+                    stack.append(elm)
+
+    return [name for name in depends if name in remaining]
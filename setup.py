@@ -26,6 +26,10 @@ graphs_require = [
     'pygraphviz'
 ]
 
+parquet_require = [
+    'pyarrow'
+]
+
 docs_require = [
     'sphinx'
 ]
@@ -52,6 +56,7 @@ setup(
     extras_require={
         'testing': tests_require,
         'graphs': graphs_require,
+        'parquet': parquet_require,
         'docs': docs_require
     },
     install_requires=requires,